@@ -0,0 +1,85 @@
+# benchmarks/bench_extractor.py
+"""Mede a vazão (MB/s) do extrator de IPs em streaming sobre logs sintéticos.
+
+Uso:
+    python -m benchmarks.bench_extractor --size-mb 64
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from ip_tracker.ip_extractor import iter_ips
+
+_LINE_TEMPLATES = [
+    '{ip} - - [10/Oct/2025:13:55:36 -0300] "GET /index.html HTTP/1.1" 200 2326 "-" "Mozilla/5.0"\n',
+    'Oct 10 13:55:36 srv sshd[4242]: Failed password for root from {ip} port 52413 ssh2\n',
+    '2025-10-10T13:55:36.123Z INFO request_id=7f3a2c9e user=42 latency_ms=12 status=ok\n',
+    '2025-10-10T13:55:36.456Z WARN upstream {ip6} timed out after 30000ms, retrying\n',
+]
+
+def generate_log(path: str, size_mb: float, unique_ips: int = 5000, seed: int = 42) -> int:
+    """Escreve um log sintético de ~size_mb MB em `path`. Retorna o tamanho em bytes."""
+    rng = random.Random(seed)
+    ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+           for _ in range(unique_ips)]
+    ip6s = [f"2001:db8:{rng.randint(0, 0xffff):x}::{rng.randint(1, 0xffff):x}" for _ in range(unique_ips // 10 or 1)]
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, "w", encoding="ascii") as f:
+        while written < target:
+            block = "".join(
+                rng.choice(_LINE_TEMPLATES).format(ip=rng.choice(ips), ip6=rng.choice(ip6s))
+                for _ in range(1000)
+            )
+            f.write(block)
+            written += len(block)
+    return written
+
+def _legacy_find_all(path: str) -> int:
+    """Caminho antigo: re.findall com o padrão sem validação, linha a linha."""
+    found = 0
+    with open(path, encoding="ascii") as f:
+        for line in f:
+            found += len(re.findall(r'\b(?:\d{1,3}\.){3}\d{1,3}\b', line))
+    return found
+
+def run(size_mb: float = 16, repeat: int = 3) -> dict:
+    """Executa o benchmark e devolve um dict com os resultados (MB/s)."""
+    fd, path = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    try:
+        size = generate_log(path, size_mb)
+        mb = size / (1024 * 1024)
+
+        best_stream, unique = float("inf"), 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            unique = sum(1 for _ in iter_ips(path))
+            best_stream = min(best_stream, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        _legacy_find_all(path)
+        legacy = time.perf_counter() - start
+
+        return {
+            "size_mb": round(mb, 2),
+            "unique_ips": unique,
+            "stream_mb_s": round(mb / best_stream, 2),
+            "legacy_findall_mb_s": round(mb / legacy, 2),
+        }
+    finally:
+        os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for key, value in run(args.size_mb, args.repeat).items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_inet_schema.py
+"""Compara o esquema antigo (ip_address VARCHAR(45)) com o novo (INET).
+
+Cria duas tabelas temporárias no banco do .env (esquema `bench_inet`,
+removido ao final) com os mesmos IPs e mede: tamanho da tabela e do índice
+UNIQUE, latência da busca exata e de consultas por sub-rede (/16) e faixa.
+No VARCHAR a sub-rede só é possível convertendo cada linha (varredura
+completa); no INET o próprio índice btree é usado.
+
+Uso:
+    python -m benchmarks.bench_inet_schema --rows 500000
+"""
+import argparse
+import ipaddress
+import random
+import statistics
+import time
+
+from ip_tracker.database import get_db_connection
+
+_SCHEMA = "bench_inet"
+
+_SETUP_SQL = f"""
+    DROP SCHEMA IF EXISTS {_SCHEMA} CASCADE;
+    CREATE SCHEMA {_SCHEMA};
+    CREATE TABLE {_SCHEMA}.ips_inet (
+        id SERIAL PRIMARY KEY,
+        ip_address INET NOT NULL UNIQUE,
+        country VARCHAR(100)
+    );
+    CREATE TABLE {_SCHEMA}.ips_varchar (
+        id SERIAL PRIMARY KEY,
+        ip_address VARCHAR(45) NOT NULL UNIQUE,
+        country VARCHAR(100)
+    );
+    -- Multiplicar por um número ímpar módulo 2^32 espalha os IPs sem repetir
+    INSERT INTO {_SCHEMA}.ips_inet (ip_address, country)
+        SELECT '0.0.0.0'::inet + ((g::bigint * 2654435761) %% 4294967296), 'Brasil'
+        FROM generate_series(1, %(rows)s) AS g;
+    INSERT INTO {_SCHEMA}.ips_varchar (ip_address, country)
+        SELECT host(ip_address), country FROM {_SCHEMA}.ips_inet;
+    ANALYZE {_SCHEMA}.ips_inet;
+    ANALYZE {_SCHEMA}.ips_varchar;
+"""
+
+_QUERIES = {
+    "inet": {
+        "exact": f"SELECT * FROM {_SCHEMA}.ips_inet WHERE ip_address = %s::inet",
+        "cidr": f"SELECT * FROM {_SCHEMA}.ips_inet WHERE ip_address <<= %s::inet",
+        "range": f"SELECT * FROM {_SCHEMA}.ips_inet WHERE ip_address BETWEEN %s::inet AND %s::inet",
+    },
+    "varchar": {
+        "exact": f"SELECT * FROM {_SCHEMA}.ips_varchar WHERE ip_address = %s",
+        "cidr": f"SELECT * FROM {_SCHEMA}.ips_varchar WHERE ip_address::inet <<= %s::inet",
+        "range": f"SELECT * FROM {_SCHEMA}.ips_varchar WHERE ip_address::inet BETWEEN %s::inet AND %s::inet",
+    },
+}
+
+def _timed(cur, sql, params_list) -> float:
+    """Mediana (ms) das execuções de `sql` com cada conjunto de parâmetros."""
+    latencies = []
+    for params in params_list:
+        start = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        latencies.append(time.perf_counter() - start)
+    return round(statistics.median(latencies) * 1000, 3)
+
+def _sizes(cur, table: str) -> dict:
+    cur.execute(
+        f"SELECT pg_relation_size('{_SCHEMA}.{table}'), "
+        f"pg_relation_size('{_SCHEMA}.{table}_ip_address_key')"
+    )
+    table_bytes, index_bytes = cur.fetchone()
+    return {"table_mb": round(table_bytes / 1_048_576, 2), "index_mb": round(index_bytes / 1_048_576, 2)}
+
+def run(rows: int = 200_000, lookups: int = 500, scans: int = 5, seed: int = 3) -> dict:
+    """Popula as duas tabelas e devolve tamanhos (MB) e latências (ms) de cada uma."""
+    rng = random.Random(seed)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_SETUP_SQL, {"rows": rows})
+            conn.commit()
+            cur.execute(f"SELECT host(ip_address) FROM {_SCHEMA}.ips_inet")
+            existing = [r[0] for r in cur.fetchall()]
+            exact = [(ip,) for ip in rng.sample(existing, min(lookups, len(existing)))]
+            nets = [(str(ipaddress.ip_network(f"{ip}/16", strict=False)),) for (ip,) in exact[:scans]]
+            ranges = []
+            for (ip,) in exact[:scans]:
+                first = ipaddress.ip_address(ip)
+                last = ipaddress.ip_address(min(int(first) + 65_535, 2 ** 32 - 1))
+                ranges.append((str(first), str(last)))
+
+            result = {"rows": len(existing)}
+            for kind, queries in _QUERIES.items():
+                result[kind] = {
+                    **_sizes(cur, f"ips_{kind}"),
+                    "exact_ms": _timed(cur, queries["exact"], exact),
+                    "cidr16_ms": _timed(cur, queries["cidr"], nets),
+                    "range64k_ms": _timed(cur, queries["range"], ranges),
+                }
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {_SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--scans", type=int, default=5)
+    args = parser.parse_args()
+    result = run(args.rows, args.lookups, args.scans)
+    print(f"rows: {result.pop('rows')}")
+    for kind, values in result.items():
+        print(f"{kind}: " + ", ".join(f"{k}={v}" for k, v in values.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# benchmarks/bench_ocr.py
+"""Compara latência e acerto do OCR com e sem pré-processamento.
+
+Gera capturas de tela sintéticas (tema claro/escuro, alta resolução, blocos
+de interface e texto de ruído) com um IP conhecido em cada uma, e mede o
+caminho antigo (imagem inteira, configuração padrão do Tesseract) contra o
+novo (ocr_preprocess + whitelist de dígitos). Com `--multi`, mede também o
+modo de vários IPs: capturas com vários IPs cada, lidas uma a uma
+(ocr_image_to_candidates) e em lote (ocr_images_to_candidates), com a
+vazão em imagens/s e a fração dos IPs esperados que foi encontrada.
+Exige o binário `tesseract`.
+
+Uso:
+    python -m benchmarks.bench_ocr --images 20
+    python -m benchmarks.bench_ocr --images 20 --multi 4
+"""
+import argparse
+import random
+import statistics
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+from ip_tracker.ip_extractor import ocr_image_to_ip, find_ip_in_text, ocr_image_to_candidates, \
+    ocr_images_to_candidates
+from ip_tracker.ocr_preprocess import preprocess_for_ocr
+
+_SIZES = [(1440, 900), (2560, 1600), (2880, 1800)]
+# Só ASCII: a fonte padrão do PIL não tem glifos acentuados
+_NOISE = ["Conexao estabelecida", "Usuario: admin", "Status: online", "Ultimo acesso ontem",
+          "Porta 22 aberta", "Sessao #4821", "Latencia 32 ms", "Versao 5.2.2"]
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow sem FreeType
+        return ImageFont.load_default()
+
+def generate_screenshot(rng: random.Random) -> tuple[Image.Image, str]:
+    """Cria uma captura sintética e retorna (imagem, ip_esperado)."""
+    width, height = rng.choice(_SIZES)
+    dark = rng.random() < 0.5
+    bg, fg = ((32, 33, 36), (232, 234, 237)) if dark else ((250, 250, 250), (20, 20, 20))
+    image = Image.new("RGB", (width, height), bg)
+    draw = ImageDraw.Draw(image)
+
+    # Barra de título, painel lateral e um "ícone"/foto sólido
+    draw.rectangle((0, 0, width, height // 20), fill=(60, 60, 70) if dark else (225, 225, 230))
+    draw.rectangle((0, 0, width // 6, height), fill=(45, 45, 50) if dark else (240, 240, 245))
+    x0, y0 = rng.randint(width // 5, width // 2), rng.randint(height // 8, height // 2)
+    draw.rectangle((x0, y0, x0 + width // 8, y0 + height // 6), fill=(rng.randint(0, 255), 90, 160))
+
+    font_size = max(height // 60, 14)
+    font = _font(font_size)
+    ip = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+    lines = rng.sample(_NOISE, 4)
+    lines.insert(rng.randint(0, 4), f"Endereco IP: {ip}")
+    x, y = rng.randint(width // 2, int(width * 0.65)), rng.randint(height // 4, height // 2)
+    for line in lines:
+        draw.text((x, y), line, font=font, fill=fg)
+        y += int(font_size * 1.6)
+    return image, ip
+
+def _random_ip(rng: random.Random) -> str:
+    return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+def generate_multi_screenshot(rng: random.Random, count: int = 4) -> tuple[Image.Image, list[str]]:
+    """Captura sintética com `count` IPs (uma "tabela" de conexões); retorna (imagem, ips)."""
+    width, height = rng.choice(_SIZES)
+    dark = rng.random() < 0.5
+    bg, fg = ((32, 33, 36), (232, 234, 237)) if dark else ((250, 250, 250), (20, 20, 20))
+    image = Image.new("RGB", (width, height), bg)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width, height // 20), fill=(60, 60, 70) if dark else (225, 225, 230))
+
+    font_size = max(height // 60, 14)
+    font = _font(font_size)
+    ips = [_random_ip(rng) for _ in range(count)]
+    x, y = rng.randint(width // 6, width // 3), rng.randint(height // 8, height // 4)
+    for ip in ips:
+        draw.text((x, y), f"{rng.choice(_NOISE)}    {ip}", font=font, fill=fg)
+        y += int(font_size * rng.uniform(1.6, 3.0))
+    return image, ips
+
+def _measure_multi(func, samples) -> dict:
+    """func(imagens) -> lista de candidatos por imagem."""
+    start = time.perf_counter()
+    results = func([image for image, _ in samples])
+    elapsed = time.perf_counter() - start
+    expected = sum(len(ips) for _, ips in samples)
+    found = sum(len(set(ips) & {c["ip"] for c in candidates})
+                for (_, ips), candidates in zip(samples, results))
+    return {
+        "images_per_s": round(len(samples) / elapsed, 2),
+        "recall": round(found / expected, 3),
+    }
+
+def run_multi(images: int = 10, ips_per_image: int = 4, seed: int = 11) -> dict:
+    """Modo de vários IPs: uma chamada por imagem contra imagens compostas em lote."""
+    rng = random.Random(seed)
+    samples = [generate_multi_screenshot(rng, ips_per_image) for _ in range(images)]
+    return {
+        "per_image": _measure_multi(lambda ims: [ocr_image_to_candidates(im) for im in ims], samples),
+        "batched": _measure_multi(ocr_images_to_candidates, samples),
+    }
+
+def _legacy(image: Image.Image) -> str | None:
+    """Caminho antigo: imagem inteira, configuração padrão."""
+    import pytesseract
+    return find_ip_in_text(pytesseract.image_to_string(image, lang="eng"))
+
+def _measure(func, samples) -> dict:
+    latencies, correct = [], 0
+    for image, expected in samples:
+        start = time.perf_counter()
+        found = func(image)
+        latencies.append(time.perf_counter() - start)
+        correct += found == expected
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+        "accuracy": round(correct / len(samples), 3),
+    }
+
+def run(images: int = 10, seed: int = 7, include_legacy: bool = True) -> dict:
+    """Executa o benchmark e devolve um dict com latências (ms) e acerto."""
+    rng = random.Random(seed)
+    samples = [generate_screenshot(rng) for _ in range(images)]
+
+    start = time.perf_counter()
+    for image, _ in samples:
+        preprocess_for_ocr(image)
+    results = {
+        "images": images,
+        "preprocess_avg_ms": round((time.perf_counter() - start) / images * 1000, 1),
+        "preprocessed": _measure(lambda im: ocr_image_to_ip(im, preprocess=True), samples),
+    }
+    if include_legacy:
+        results["legacy"] = _measure(_legacy, samples)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-legacy", action="store_true", help="não mede o caminho antigo")
+    parser.add_argument("--multi", type=int, default=0, metavar="N",
+                        help="mede também o modo de vários IPs, com N IPs por imagem")
+    args = parser.parse_args()
+    for key, value in run(args.images, args.seed, not args.no_legacy).items():
+        print(f"{key}: {value}")
+    if args.multi:
+        for key, value in run_multi(args.images, args.multi).items():
+            print(f"multi_{key}: {value}")
+
+if __name__ == "__main__":
+    main()
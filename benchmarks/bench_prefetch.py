@@ -0,0 +1,124 @@
+# benchmarks/bench_prefetch.py
+"""Latência percebida no registro, com e sem a consulta antecipada do país.
+
+Simula o uso do app contra o stub local do ip-api (com latência artificial):
+o IP chega ao campo, o usuário leva `think` segundos até clicar em
+Registrar, e mede-se só a espera depois do clique até o país estar pronto:
+
+    direct    consulta feita no clique (o comportamento antigo);
+    prefetch  IP colado: GeoPrefetcher.schedule sem debounce quando o IP
+              chega ao campo, result no clique.
+
+Também digita IPs tecla a tecla (`typing`), com o debounce, e mede a espera
+depois do clique e quantas consultas à API foram feitas por IP digitado.
+Cada IP é novo, para o cache de geolocalização não mascarar a medida.
+
+Uso:
+    python -m benchmarks.bench_prefetch
+    python -m benchmarks.bench_prefetch --latency 0.15 --samples 30
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from ip_tracker.config import GEO_PREFETCH_DELAY_MS
+from ip_tracker.geo_cache import create_geo_cache, lookup_cached
+from ip_tracker.geo_prefetch import GeoPrefetcher
+from ip_tracker.utils import get_ip_info
+
+from .geo_stub import GeoStubServer
+
+# Tempo (s) entre o IP aparecer no campo e o clique: colar e clicar na hora,
+# preencher o código mobile, revisar com calma
+THINK_TIMES = (0.05, 0.2, 0.5)
+KEYSTROKE_INTERVAL = 0.04
+
+def _public_ips(rng: random.Random, count: int) -> list[str]:
+    # Primeiro octeto 11-99: sempre global, nunca barrado por is_non_routable
+    return [f"{rng.randint(11, 99)}.{rng.randint(0, 255)}."
+            f"{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(count)]
+
+class _CountingLookup:
+    """Consulta pelo cache (como IPService.get_ip_details) contando as idas ao stub."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.cache = create_geo_cache(path="")
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, ip: str) -> dict:
+        with self._lock:
+            self.calls += 1
+        return get_ip_info(ip, base_url=self.base_url)
+
+    def __call__(self, ip: str) -> dict:
+        return lookup_cached(self.cache, ip, self.fetch)
+
+def _wait_ms(samples: list[float]) -> float:
+    return round(statistics.median(samples) * 1000, 2)
+
+def run(samples: int = 10, latency: float = 0.08, delay: float = GEO_PREFETCH_DELAY_MS / 1000,
+        seed: int = 3) -> dict:
+    """{'think_<s>': {'direct_p50_ms', 'prefetch_p50_ms', 'reduction'},
+    'typing': {'prefetch_p50_ms', 'api_calls_per_ip'}}."""
+    rng = random.Random(seed)
+    results = {}
+    with GeoStubServer(latency=latency) as stub:
+        lookup = _CountingLookup(stub.url)
+        lookup(_public_ips(rng, 1)[0])  # abre a conexão keep-alive
+        prefetcher = GeoPrefetcher(lookup, delay=delay)
+        for think in THINK_TIMES:
+            direct, prefetched = [], []
+            for ip in _public_ips(rng, samples):
+                time.sleep(think)
+                start = time.perf_counter()
+                lookup(ip)
+                direct.append(time.perf_counter() - start)
+            for ip in _public_ips(rng, samples):
+                prefetcher.schedule(ip, delay=0)
+                time.sleep(think)
+                start = time.perf_counter()
+                prefetcher.result(ip)
+                prefetched.append(time.perf_counter() - start)
+            direct_ms, prefetch_ms = _wait_ms(direct), _wait_ms(prefetched)
+            results[f"think_{think:g}s"] = {
+                "direct_p50_ms": direct_ms,
+                "prefetch_p50_ms": prefetch_ms,
+                "reduction": round(1 - prefetch_ms / direct_ms, 3) if direct_ms else 0.0,
+            }
+
+        # Digitação: cada prefixo que já é um IP válido ('1.2.3.4' antes de '1.2.3.45')
+        # agenda uma consulta; o debounce deve deixar passar só a do IP final
+        typed = _public_ips(rng, samples)
+        calls_before = lookup.calls
+        waits = []
+        for ip in typed:
+            for end in range(1, len(ip) + 1):
+                prefetcher.schedule(ip[:end])
+                time.sleep(KEYSTROKE_INTERVAL)
+            time.sleep(THINK_TIMES[-1])
+            start = time.perf_counter()
+            prefetcher.result(ip)
+            waits.append(time.perf_counter() - start)
+        results["typing"] = {
+            "prefetch_p50_ms": _wait_ms(waits),
+            "api_calls_per_ip": round((lookup.calls - calls_before) / len(typed), 2),
+        }
+        prefetcher.cancel()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10, help="registros simulados por cenário")
+    parser.add_argument("--latency", type=float, default=0.08, help="latência (s) do stub do ip-api")
+    parser.add_argument("--delay", type=float, default=GEO_PREFETCH_DELAY_MS / 1000,
+                        help="debounce (s) da consulta antecipada na digitação")
+    args = parser.parse_args()
+    for key, value in run(args.samples, args.latency, args.delay).items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
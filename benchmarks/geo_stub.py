@@ -0,0 +1,144 @@
+# benchmarks/geo_stub.py
+"""Servidor local que imita o ip-api (GET /json/{ip} e POST /batch).
+
+Responde sempre o mesmo país, com uma latência artificial opcional, para
+medir o cliente de geolocalização sem depender da rede nem do limite de
+taxa do serviço real. Opcionalmente imita também esse limite: cabeçalhos
+X-Rl/X-Ttl com a cota de `rate_limit` requisições por janela de `window` s,
+429 para quem passar dela, e as primeiras `fail_first` respostas com 429
+(usado pelos testes em tests/). Também pode ser usado à mão, apontando o
+app para ele:
+
+    python -m benchmarks.geo_stub --port 8081
+    GEO_API_URL=http://127.0.0.1:8081 python main.py
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _StubState:
+    """Contadores e cota compartilhados entre as threads do servidor."""
+
+    def __init__(self, rate_limit: int | None, window: float, fail_first: int):
+        self.rate_limit = rate_limit
+        self.window = window
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self._window_start = time.monotonic()
+        self._used = 0
+
+    def admit(self) -> tuple[int, dict]:
+        """(status, cabeçalhos de limite) da próxima resposta."""
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start, self._used = now, 0
+            ttl = math.ceil(self.window - (now - self._window_start))
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                self.throttled += 1
+                return 429, {"X-Rl": "0", "X-Ttl": str(ttl)}
+            if self.rate_limit is None:
+                return 200, {}
+            if self._used >= self.rate_limit:
+                self.throttled += 1
+                return 429, {"X-Rl": "0", "X-Ttl": str(ttl)}
+            self._used += 1
+            return 200, {"X-Rl": str(self.rate_limit - self._used), "X-Ttl": str(ttl)}
+
+class _GeoStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    country = "Brasil"
+    latency = 0.0
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload):
+        if self.latency:
+            time.sleep(self.latency)
+        status, headers = self.state.admit()
+        body = json.dumps(payload if status == 200 else {"message": "too many requests"}).encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.path.startswith("/json/"):
+            self.send_error(404)
+            return
+        self._send({"country": self.country})
+
+    def do_POST(self):
+        if not self.path.startswith("/batch"):
+            self.send_error(404)
+            return
+        queries = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"[]")
+        self._send([{"status": "success", "country": self.country, "query": q.get("query")} for q in queries])
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+class GeoStubServer:
+    """O stub rodando numa thread; `url` é o valor para GEO_API_URL/base_url.
+
+        with GeoStubServer(latency=0.005) as stub:
+            get_ip_info("8.8.8.8", base_url=stub.url)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, country: str = "Brasil", latency: float = 0.0,
+                 rate_limit: int | None = None, window: float = 60.0, fail_first: int = 0):
+        self.state = _StubState(rate_limit, window, fail_first)
+        handler = type("GeoStubHandler", (_GeoStubHandler,),
+                       {"country": country, "latency": latency, "state": self.state})
+        self._server = _Server((host, port), handler)
+        self.url = f"http://{host}:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="geo-stub", daemon=True)
+
+    def start(self) -> "GeoStubServer":
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Atende na thread atual (uso pela linha de comando)."""
+        self._server.serve_forever()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--country", default="Brasil")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    stub = GeoStubServer(args.host, args.port, args.country, args.latency_ms / 1000)
+    print(f"Stub do ip-api em {stub.url}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
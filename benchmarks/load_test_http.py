@@ -0,0 +1,163 @@
+# benchmarks/load_test_http.py
+"""Teste de carga do servidor HTTP (ip_tracker.http_server).
+
+Sobe o servidor no próprio processo e dispara `--clients` conexões keep-alive
+fazendo GET /ip/{ip} (e POST /ip na fração `--write-ratio`) durante
+`--seconds`. Mede QPS, latências e quantas idas ao "banco" foram feitas.
+
+Por padrão usa um substituto em memória do IPService, com `--db-latency-ms`
+de atraso por consulta (simula a ida e volta ao PostgreSQL). Com `--postgres`
+usa o IPService real e o banco do .env; com `--url` ataca um servidor já no ar.
+
+Uso:
+    python -m benchmarks.load_test_http --clients 64 --seconds 10
+    python -m benchmarks.load_test_http --window-ms 0      # sem janela de agrupamento
+    python -m benchmarks.load_test_http --postgres
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from ip_tracker.http_server import IPHTTPApp, make_server
+
+class InMemoryService:
+    """Substituto do IPService: mesmas assinaturas usadas pelo servidor."""
+
+    def __init__(self, db_latency: float = 0.001):
+        self.db_latency = db_latency
+        self.queries = 0
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def _roundtrip(self):
+        with self._lock:
+            self.queries += 1
+        time.sleep(self.db_latency)
+
+    def search_many(self, ips):
+        self._roundtrip()
+        with self._lock:
+            return {ip: self._rows[ip] for ip in ips if ip in self._rows}
+
+    def register_many(self, rows, chunk_size=None):
+        self._roundtrip()
+        report = []
+        with self._lock:
+            for row in rows:
+                if isinstance(row, dict):
+                    row = (row.get("ip_address"), row.get("mobile_code"), row.get("country"), row.get("record_type"))
+                ip, mobile_code, country, record_type = row
+                status = "updated" if ip in self._rows else "inserted"
+                self._rows[ip] = {"ip_address": ip, "mobile_code": mobile_code, "country": country,
+                                  "record_type": record_type, "registration_date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+                report.append({"ip_address": ip, "status": status, "reason": None})
+        return report
+
+    def get_ip_details(self, ip):
+        return {"country": "Brasil"}
+
+def _client(host, port, ips, deadline, write_ratio, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    local = []
+    while time.perf_counter() < deadline:
+        ip = rng.choice(ips)
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                body = json.dumps({"ip_address": ip, "mobile_code": "123", "country": "Brasil"})
+                conn.request("POST", "/ip", body, {"Content-Type": "application/json"})
+            else:
+                conn.request("GET", f"/ip/{ip}")
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        local.append(time.perf_counter() - start)
+    conn.close()
+    latencies.extend(local)
+
+def run(seconds: float = 5, clients: int = 32, write_ratio: float = 0.1, window_ms: float = 2,
+        db_latency_ms: float = 1.0, n_ips: int = 5000, postgres: bool = False, url: str | None = None) -> dict:
+    """Executa a carga e devolve um dict com QPS, latências (ms) e lotes."""
+    rng = random.Random(1)
+    ips = [f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(n_ips)]
+
+    server = app = service = None
+    if url:
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        if postgres:
+            from ip_tracker.ip_extractor import IPExtractor
+            from ip_tracker.ip_service import IPService
+            service = IPService(IPExtractor())
+        else:
+            service = InMemoryService(db_latency_ms / 1000)
+        app = IPHTTPApp(service, window=window_ms / 1000)
+        server = make_server(app, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = "127.0.0.1", server.server_port
+        # Metade dos IPs já existe; a outra metade gera 404
+        service.register_many([(ip, "123", "Brasil", None) for ip in ips[: n_ips // 2]])
+        if isinstance(service, InMemoryService):
+            service.queries = 0
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=_client, args=(host, port, ips, deadline, write_ratio, i, latencies, errors))
+               for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "requests": len(latencies),
+        "qps": round(len(latencies) / elapsed),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 2) if latencies else None,
+        "errors": len(errors),
+    }
+    if app is not None:
+        stats = app.stats()
+        result["avg_lookup_batch"] = round(stats["lookups"]["avg_batch"], 1)
+        result["avg_write_batch"] = round(stats["writes"]["avg_batch"], 1)
+        if isinstance(service, InMemoryService):
+            result["db_queries"] = service.queries
+        server.shutdown()
+        server.server_close()
+        app.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--window-ms", type=float, default=2)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0)
+    parser.add_argument("--ips", type=int, default=5000)
+    parser.add_argument("--postgres", action="store_true", help="usa o IPService real (banco do .env)")
+    parser.add_argument("--url", default=None, help="ataca um servidor já em execução (ex.: http://127.0.0.1:8080)")
+    args = parser.parse_args()
+    result = run(args.seconds, args.clients, args.write_ratio, args.window_ms, args.db_latency_ms,
+                 args.ips, args.postgres, args.url)
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# benchmarks/run.py
+"""Suíte de benchmarks reproduzível, com comparação contra uma linha de base.
+
+Mede, com dados sintéticos e semente fixa:
+    extractor  find_ip_in_text em textos de 1 KB a 1 MB e o extrator em streaming
+    ocr        pré-processamento e ocr_image_to_ip em capturas geradas
+               (a parte do Tesseract é pulada se o binário não estiver instalado)
+    geo        get_ip_info e a consulta em lote contra um stub local do ip-api
+    prefetch   espera após o clique em Registrar, com e sem a consulta antecipada
+               do país (stub do ip-api com 80 ms de latência)
+    db         registro/busca/lote no backend SQLite (arquivo temporário, padrão)
+               ou num esquema descartável do PostgreSQL do .env (--db postgres)
+    startup    tempo de importação dos pontos de entrada (-X importtime); falha
+               se algum carregar dependências pesadas que deveriam ser adiadas
+
+Os resultados saem em JSON (--output) e são comparados com
+benchmarks/baseline.json: métricas terminadas em `_ms` pioram quando sobem,
+as demais (vazão, acerto) quando descem. Uma variação além do limite
+configurado no arquivo é regressão, e o processo termina com código 1.
+Métricas de cauda (p99, ruidosas em poucas amostras) são só informativas:
+aparecem como 'slower' sem derrubar o código de saída, a menos que se use
+--strict. Os padrões ficam em "informative" no arquivo da linha de base.
+
+Uso:
+    python -m benchmarks.run                          # tudo, compara com a linha de base
+    python -m benchmarks.run --suite extractor --quick
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --strict                 # p99 além do limite também é regressão
+    python -m benchmarks.run --save-baseline          # regrava a linha de base com esta máquina
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from ip_tracker.ip_extractor import find_ip_in_text, ocr_image_to_ip, warmup_tesseract
+from ip_tracker.ocr_preprocess import preprocess_for_ocr
+from ip_tracker.geo_batch import BatchGeoLookup
+from ip_tracker.utils import get_ip_info
+from ip_tracker.storage import PostgresBackend
+from ip_tracker.sqlite_backend import SQLiteBackend
+
+from . import bench_extractor, bench_ocr, bench_prefetch, startup_budget
+from .geo_stub import GeoStubServer
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.3  # 30% de piora tolerada quando o arquivo não define outro valor
+DEFAULT_INFORMATIVE = ("*_p99_ms",)  # fora do código de saída quando o arquivo não define outra lista
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 4)
+
+def _latency(func, args_list) -> dict:
+    """Executa `func(*args)` para cada item e devolve p50/p99 (ms)."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {"p50_ms": _ms(statistics.median(samples)),
+            "p99_ms": _ms(samples[min(int(0.99 * len(samples)), len(samples) - 1)])}
+
+def _random_ips(rng: random.Random, count: int) -> list[str]:
+    return [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            for _ in range(count)]
+
+# --- Suítes ---
+
+def _synthetic_text(rng: random.Random, size: int) -> str:
+    """Log sem IPs até o fim e um IP na última linha (pior caso de find_ip_in_text)."""
+    noise = [t for t in bench_extractor._LINE_TEMPLATES if "{ip}" not in t]
+    lines, total = [], 0
+    while total < size:
+        line = rng.choice(noise).format(ip6="2001:db8::1")
+        lines.append(line)
+        total += len(line)
+    lines.append(f"client {_random_ips(rng, 1)[0]} connected\n")
+    return "".join(lines)
+
+def suite_extractor(quick: bool = False) -> dict:
+    rng = random.Random(11)
+    repeat = 5 if quick else 20
+    results = {}
+    for label, size in (("1kb", 1024), ("64kb", 64 * 1024), ("1mb", 1024 * 1024)):
+        text = _synthetic_text(rng, size)
+        results[f"find_{label}_ms"] = _latency(find_ip_in_text, [(text,)] * repeat)["p50_ms"]
+    stream = bench_extractor.run(size_mb=2 if quick else 16, repeat=3)
+    results["stream_mb_s"] = stream["stream_mb_s"]
+    return results
+
+def _tesseract_available() -> bool:
+    try:
+        warmup_tesseract()
+        return True
+    except Exception:
+        return False
+
+def suite_ocr(quick: bool = False) -> dict:
+    rng = random.Random(7)
+    samples = [bench_ocr.generate_screenshot(rng) for _ in range(3 if quick else 10)]
+    results = {"preprocess_p50_ms": _latency(preprocess_for_ocr, [(image,) for image, _ in samples])["p50_ms"]}
+    if not _tesseract_available():
+        results["skipped"] = "tesseract não encontrado: só o pré-processamento foi medido"
+        return results
+    latency = _latency(ocr_image_to_ip, [(image,) for image, _ in samples])
+    results["image_p50_ms"] = latency["p50_ms"]
+    results["image_p99_ms"] = latency["p99_ms"]
+    results["accuracy"] = round(sum(ocr_image_to_ip(image) == ip for image, ip in samples) / len(samples), 3)
+    multi = bench_ocr.run_multi(images=3 if quick else 10)
+    results["multi_per_image_images_per_s"] = multi["per_image"]["images_per_s"]
+    results["multi_batched_images_per_s"] = multi["batched"]["images_per_s"]
+    results["multi_batched_recall"] = multi["batched"]["recall"]
+    return results
+
+def suite_geo(quick: bool = False) -> dict:
+    rng = random.Random(5)
+    ips = _random_ips(rng, 50 if quick else 300)
+    batch_ips = _random_ips(rng, 1000 if quick else 5000)
+    with GeoStubServer() as stub:
+        get_ip_info(ips[0], base_url=stub.url)  # abre a conexão keep-alive
+        latency = _latency(get_ip_info, [(ip, stub.url) for ip in ips])
+        lookup = BatchGeoLookup(base_url=stub.url)
+        start = time.perf_counter()
+        found = lookup.lookup(batch_ips)
+        elapsed = time.perf_counter() - start
+    return {
+        "single_p50_ms": latency["p50_ms"],
+        "single_p99_ms": latency["p99_ms"],
+        "batch_ips_per_s": round(len(found) / elapsed, 1),
+    }
+
+def suite_prefetch(quick: bool = False) -> dict:
+    result = bench_prefetch.run(samples=3 if quick else 10)
+    paste = result["think_0.2s"]
+    return {
+        "direct_wait_p50_ms": paste["direct_p50_ms"],
+        "paste_wait_p50_ms": paste["prefetch_p50_ms"],
+        "typing_wait_p50_ms": result["typing"]["prefetch_p50_ms"],
+    }
+
+def _postgres_backend():
+    """PostgresBackend apontado para um esquema descartável no PostgreSQL do .env."""
+    import psycopg2
+    from psycopg2.extras import DictCursor
+    from ip_tracker import database
+    from ip_tracker.config import DB_SETTINGS
+
+    schema = "bench_run"
+    admin = database.get_db_connection()
+    with admin.cursor() as cur:
+        cur.execute(f"""
+            DROP SCHEMA IF EXISTS {schema} CASCADE;
+            CREATE SCHEMA {schema};
+            CREATE TABLE {schema}.registered_ips (
+                id SERIAL PRIMARY KEY,
+                ip_address INET NOT NULL UNIQUE,
+                mobile_code VARCHAR(10),
+                country VARCHAR(100),
+                registration_date TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                record_type VARCHAR(20) NOT NULL DEFAULT 'Publicação'
+            );
+        """)
+    admin.commit()
+
+    def connect():
+        return psycopg2.connect(**DB_SETTINGS, cursor_factory=DictCursor, options=f"-c search_path={schema}")
+
+    previous = database.set_pool(database.ConnectionPool(connect_func=connect))
+
+    class Backend(PostgresBackend):
+        def close(self):
+            database.set_pool(previous).close()
+            with admin.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+            admin.commit()
+            admin.close()
+
+    return Backend()
+
+class _SQLiteBackend(SQLiteBackend):
+    """SQLiteBackend num diretório temporário, apagado no close()."""
+
+    def __init__(self):
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="ip_tracker_bench_")
+        super().__init__(os.path.join(self._tmpdir.name, "bench.db"))
+
+    def close(self):
+        super().close()
+        self._tmpdir.cleanup()
+
+def suite_db(quick: bool = False, backend: str = "sqlite") -> dict:
+    rng = random.Random(3)
+    ips = _random_ips(rng, 100 if quick else 1000)
+    rows = [(ip, "123", "Brasil", "Publicação") for ip in _random_ips(rng, 2000 if quick else 20000)]
+    db = _postgres_backend() if backend == "postgres" else _SQLiteBackend()
+    try:
+        register = _latency(db.register_ip, [(ip, "123", "Brasil", "Publicação") for ip in ips])
+        search = _latency(db.search_ip, [(ip,) for ip in ips])
+        start = time.perf_counter()
+        db.register_ips(rows)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    return {
+        "register_p50_ms": register["p50_ms"],
+        "register_p99_ms": register["p99_ms"],
+        "search_p50_ms": search["p50_ms"],
+        "search_p99_ms": search["p99_ms"],
+        "bulk_rows_per_s": round(len(rows) / elapsed, 1),
+    }
+
+def suite_startup(quick: bool = False) -> dict:
+    measured = startup_budget.run(repeat=1 if quick else 3)
+    eager = {module: result["loaded"] for module, result in measured.items() if result["loaded"]}
+    if eager:
+        raise RuntimeError(f"dependências carregadas na importação: {eager}")
+    return {f"{module.rsplit('.', 1)[-1]}_import_ms": result["import_ms"] for module, result in measured.items()}
+
+SUITES = {
+    "extractor": suite_extractor,
+    "ocr": suite_ocr,
+    "geo": suite_geo,
+    "prefetch": suite_prefetch,
+    "db": suite_db,
+    "startup": suite_startup,
+}
+
+def run(suites=tuple(SUITES), quick: bool = False, db_backend: str = "sqlite") -> dict:
+    """Executa as suítes e devolve {'meta': ..., 'results': {suíte: {métrica: valor}}}."""
+    results = {}
+    for name in suites:
+        kwargs, key = {}, name
+        if name == "db":
+            # Cada banco tem a sua linha de base (db.* = SQLite, db_postgres.* = PostgreSQL)
+            kwargs = {"backend": db_backend}
+            key = "db" if db_backend == "sqlite" else f"db_{db_backend}"
+        try:
+            results[key] = SUITES[name](quick=quick, **kwargs)
+        except Exception as e:
+            results[key] = {"error": f"{type(e).__name__}: {e}"}
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+    }
+    return {"meta": meta, "results": results}
+
+# --- Comparação com a linha de base ---
+
+def flatten(results: dict) -> dict[str, float]:
+    """{'suíte.métrica': valor} só com os valores numéricos."""
+    return {f"{suite}.{metric}": value
+            for suite, values in results.items() for metric, value in values.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)}
+
+def _threshold(metric: str, thresholds: dict) -> float:
+    best = None
+    for pattern, value in thresholds.items():
+        if pattern != "default" and fnmatch.fnmatch(metric, pattern):
+            # O padrão mais específico (mais longo) vence
+            if best is None or len(pattern) > len(best[0]):
+                best = (pattern, value)
+    return best[1] if best else thresholds.get("default", DEFAULT_THRESHOLD)
+
+def compare(current: dict[str, float], baseline: dict, strict: bool = False) -> list[dict]:
+    """Compara métricas atuais com `baseline` ({'thresholds': ..., 'metrics': ...}).
+
+    Cada item: metric, baseline, current, change (fração, positiva = pior) e
+    status ('ok', 'improved', 'regressed', 'slower' ou 'missing'). Métricas
+    informativas (padrões em baseline['informative']) que passam do limite
+    ficam como 'slower', não 'regressed', salvo com `strict`.
+    """
+    thresholds = baseline.get("thresholds", {})
+    informative = baseline.get("informative", DEFAULT_INFORMATIVE)
+    report = []
+    for metric, expected in sorted(baseline.get("metrics", {}).items()):
+        value = current.get(metric)
+        if value is None:
+            report.append({"metric": metric, "baseline": expected, "current": None, "change": None,
+                           "status": "missing"})
+            continue
+        lower_is_better = metric.endswith("_ms")
+        if expected == 0:
+            change = 0.0
+        else:
+            change = (value - expected) / expected if lower_is_better else (expected - value) / expected
+        limit = _threshold(metric, thresholds)
+        status = "regressed" if change > limit else "improved" if change < -limit else "ok"
+        if status == "regressed" and not strict and any(fnmatch.fnmatch(metric, p) for p in informative):
+            status = "slower"
+        report.append({"metric": metric, "baseline": expected, "current": value,
+                       "change": round(change, 4), "status": status})
+    return report
+
+def load_baseline(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_baseline(path: str, current: dict[str, float], meta: dict):
+    """Grava as métricas atuais como linha de base, preservando os limites já configurados."""
+    previous = load_baseline(path) or {}
+    baseline = {
+        "meta": meta,
+        "thresholds": previous.get("thresholds", {"default": DEFAULT_THRESHOLD}),
+        "informative": previous.get("informative", list(DEFAULT_INFORMATIVE)),
+        "metrics": current,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+def _print_report(report: list[dict], out):
+    for item in report:
+        change = "" if item["change"] is None else f"{item['change']:+.1%}"
+        print(f"{item['status']:>9}  {item['metric']:<32} baseline={item['baseline']} "
+              f"atual={item['current']} {change}", file=out)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=list(SUITES),
+                        help="suíte a executar (pode repetir; padrão: todas)")
+    parser.add_argument("--quick", action="store_true", help="menos repetições e dados menores")
+    parser.add_argument("--db", choices=("sqlite", "postgres"), default="sqlite",
+                        help="banco da suíte db (postgres usa um esquema descartável no banco do .env)")
+    parser.add_argument("--output", help="grava os resultados em JSON neste arquivo ('-' = stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="arquivo da linha de base")
+    parser.add_argument("--strict", action="store_true",
+                        help="métricas informativas (p99) além do limite também dão código 1")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como nova linha de base")
+    args = parser.parse_args(argv)
+
+    result = run(args.suite or tuple(SUITES), quick=args.quick, db_backend=args.db)
+    current = flatten(result["results"])
+    for suite, values in result["results"].items():
+        for key in ("skipped", "error"):
+            if key in values:
+                print(f"[{suite}] {key}: {values[key]}", file=sys.stderr)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, current, result["meta"])
+        print(f"Linha de base gravada em {args.baseline} ({len(current)} métricas).", file=sys.stderr)
+        report = []
+    else:
+        baseline = load_baseline(args.baseline)
+        report = compare(current, baseline, strict=args.strict) if baseline else []
+        if baseline is None:
+            print(f"Sem linha de base em {args.baseline}; use --save-baseline.", file=sys.stderr)
+        elif baseline.get("meta", {}).get("quick", False) != args.quick:
+            print("Aviso: a linha de base foi gravada com outro valor de --quick; "
+                  "os tamanhos dos dados diferem.", file=sys.stderr)
+        # Métricas de suítes que não foram executadas não contam como ausentes
+        report = [item for item in report if item["metric"].split(".")[0] in result["results"]]
+        _print_report(report, sys.stderr)
+    result["comparison"] = report
+
+    if args.output == "-":
+        json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    else:
+        for metric, value in current.items():
+            print(f"{metric}: {value}")
+
+    failed = any(item["status"] == "regressed" for item in report)
+    failed |= any("error" in values for values in result["results"].values())
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
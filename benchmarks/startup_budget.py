@@ -0,0 +1,95 @@
+# benchmarks/startup_budget.py
+"""Orçamento de inicialização dos pontos de entrada, medido com `python -X importtime`.
+
+Cada módulo é importado num processo novo (`--repeat` vezes, vale o menor
+tempo) e confere-se:
+- o tempo acumulado da importação do módulo, contra o orçamento em ms;
+- que nenhuma dependência pesada adiada (psycopg2, pytesseract, PIL,
+  requests) foi carregada só por importar o módulo — elas devem vir no
+  primeiro uso (ver ip_tracker/lazy.py).
+
+Sai com código 1 se algum orçamento for estourado. A suíte `startup` de
+benchmarks/run.py usa as mesmas medidas para comparar com a linha de base.
+
+Uso:
+    python -m benchmarks.startup_budget
+    python -m benchmarks.startup_budget --repeat 5 --verbose
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+_DEFERRED = ("psycopg2", "pytesseract", "PIL", "requests")
+
+# módulo: (orçamento em ms, dependências que não podem ser carregadas na importação).
+# A janela precisa do customtkinter, que por sua vez importa o PIL.
+BUDGETS = {
+    "ip_tracker.ip_extractor": (60, _DEFERRED),
+    "ip_tracker.ip_service": (80, _DEFERRED),
+    "ip_tracker.ingest": (100, _DEFERRED),
+    "ip_tracker.export": (80, _DEFERRED),
+    "ip_tracker.http_server": (100, _DEFERRED),
+    "ip_tracker.app_gui": (250, ("psycopg2", "pytesseract", "requests")),
+}
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_import(module: str) -> tuple[float, set[str]]:
+    """(ms acumulados na importação de `module`, nomes de todos os módulos carregados)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"falha ao importar {module}: {proc.stderr.strip().splitlines()[-1:]}")
+    total_us, loaded = None, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # cabeçalho
+        loaded.add(name.strip())
+        if name.strip() == module and name[1:2] != " ":
+            total_us = int(cumulative)
+    if total_us is None:
+        raise RuntimeError(f"{module} não aparece na saída de -X importtime")
+    return total_us / 1000, loaded
+
+def _top_level(names: set[str]) -> set[str]:
+    return {name.split(".", 1)[0] for name in names}
+
+def run(repeat: int = 3, budgets: dict | None = None) -> dict:
+    """{módulo: {'import_ms', 'budget_ms', 'loaded': [adiadas carregadas], 'ok'}}."""
+    results = {}
+    for module, (budget_ms, deferred) in (budgets or BUDGETS).items():
+        best, loaded = float("inf"), set()
+        for _ in range(repeat):
+            elapsed, loaded = measure_import(module)
+            best = min(best, elapsed)
+        eager = sorted(set(deferred) & _top_level(loaded))
+        results[module] = {
+            "import_ms": round(best, 1),
+            "budget_ms": budget_ms,
+            "loaded": eager,
+            "ok": best <= budget_ms and not eager,
+        }
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--verbose", action="store_true", help="mostra também os módulos dentro do orçamento")
+    args = parser.parse_args()
+    results = run(args.repeat)
+    for module, result in results.items():
+        if result["ok"] and not args.verbose:
+            continue
+        status = "ok" if result["ok"] else "ESTOUROU"
+        extra = f"  carregou: {', '.join(result['loaded'])}" if result["loaded"] else ""
+        print(f"{status:>8}  {module:<28} {result['import_ms']:>7.1f} ms / {result['budget_ms']} ms{extra}")
+    failed = [module for module, result in results.items() if not result["ok"]]
+    print(f"{len(results) - len(failed)}/{len(results)} pontos de entrada dentro do orçamento.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
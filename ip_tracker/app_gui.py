@@ -1,33 +1,96 @@
 # ip_tracker/app_gui.py
+import logging
 import customtkinter
 import tkinter as tk
 from tkinter import messagebox
 import threading
-from PIL import Image, ImageGrab # Importar ImageGrab aqui
+from concurrent.futures import CancelledError
 
 # Importações de serviço e extrator
 from .ip_service import IPService
 from .ip_extractor import IPExtractor
 from .database import DatabaseError
+from .config import WRITE_BEHIND
+from .write_behind import WriteBehindQueue
+from .ui_components import ResultsWindow, Image, ImageGrab
+from .log import configure_logging
+from .metrics import start_metrics_dump
 
 # Constantes de UI (movidas do serviço, já que a UI é quem as usa)
 OCR_SUCCESS_TITLE = "Sucesso OCR"
 OCR_SUCCESS_MSG = "IP {ip} extraído da imagem!"
 
+logger = logging.getLogger(__name__)
+
 customtkinter.set_appearance_mode("dark")
 customtkinter.set_default_color_theme("blue")
 
 class App(customtkinter.CTk):
     def __init__(self):
         super().__init__()
+        configure_logging()
+        start_metrics_dump()
 
         self.title("Registrador de IP")
-        self.geometry("400x250")
-
-        self.ip_service = IPService(IPExtractor())
+        self.geometry("400x300")
 
+        # A janela aparece já; serviço, workers de OCR e fila de registros são
+        # iniciados numa thread, com os controles desativados até terminar
+        self.ip_service = None
+        self._closing = False
         self._create_widgets()
         self._bind_events()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._set_ui_state(False)
+        self.list_button.configure(state="disabled")
+        threading.Thread(target=self._init_backends, name="app-init", daemon=True).start()
+
+    def _init_backends(self):
+        """Executa fora da thread da interface; avisa a janela ao terminar."""
+        try:
+            service = IPService(IPExtractor())
+            # Workers de OCR prontos antes da primeira colagem
+            service.extractor.start_ocr_pool()
+            service.write_behind = self._start_write_behind(service) if WRITE_BEHIND else None
+        except Exception as e:
+            logger.error("Falha ao iniciar o serviço", extra={"error": str(e)})
+            # `e` deixa de existir ao sair do except: o callback recebe a mensagem já pronta
+            msg = f"Não foi possível iniciar o serviço: {e}"
+            self.after(0, lambda msg=msg: messagebox.showerror("Erro ao Iniciar", msg))
+            return
+        if self._closing:
+            self._shutdown_service(service)  # janela fechada durante a inicialização
+            return
+        self.after(0, lambda: self._on_backends_ready(service))
+
+    def _on_backends_ready(self, service):
+        self.ip_service = service
+        self._set_ui_state(True)
+        self.list_button.configure(state="normal")
+
+    def _start_write_behind(self, service):
+        """Inicia a fila de registros (e reenvia o que ficou pendente). None se não for possível."""
+        try:
+            return WriteBehindQueue(service.register_many).start()
+        except (OSError, RuntimeError) as e:
+            logger.warning("Fila de registros desativada; os registros irão direto para o banco",
+                           extra={"error": str(e)})
+            return None
+
+    @staticmethod
+    def _shutdown_service(service):
+        if service.geo_prefetch is not None:
+            service.geo_prefetch.cancel()
+        if service.write_behind is not None:
+            # O que não der tempo de enviar fica no diário para a próxima execução
+            service.write_behind.close(timeout=3)
+        service.extractor.shutdown()
+
+    def _on_close(self):
+        self._closing = True
+        if self.ip_service is not None:
+            self._shutdown_service(self.ip_service)
+        self.destroy()
 
     def _create_widgets(self):
         # (Seu código _create_widgets... está perfeito, sem alterações)
@@ -52,10 +115,15 @@ class App(customtkinter.CTk):
         self.register_button.grid(row=3, column=1, sticky="ew", pady=20, padx=5)
         self.search_button = customtkinter.CTkButton(frame, text="Consultar IP", command=self._on_search_clicked)
         self.search_button.grid(row=3, column=2, sticky="ew", pady=20, padx=5)
+        self.list_button = customtkinter.CTkButton(frame, text="Listar IPs", command=self._on_list_clicked)
+        self.list_button.grid(row=4, column=1, columnspan=2, sticky="ew", padx=5)
+        self.results_window = None
 
     def _bind_events(self):
         # Bind apenas para Mac
         self.bind("<Command-v>", self._handle_paste)
+        # IP digitado: consulta o país antes do clique em Registrar
+        self.ip_entry.bind("<KeyRelease>", self._on_ip_typed)
 
     # --- LÓGICA DE PASTE CORRIGIDA ---
 
@@ -64,7 +132,9 @@ class App(customtkinter.CTk):
         Lida com o 'colar' de forma segura para threads.
         Executa no *Thread Principal*.
         """
-        
+        if self.ip_service is None:
+            return  # serviço ainda iniciando
+
         # 1. Tenta colar TEXTO (rápido, sem thread)
         try:
             clipboard_text = self.clipboard_get()
@@ -76,7 +146,7 @@ class App(customtkinter.CTk):
             # Não é texto, normal. Prossiga para tentar imagem.
             pass
         except Exception as e:
-            print(f"Erro ao colar texto: {e}")
+            logger.warning("Erro ao colar texto", extra={"error": str(e)})
             return
 
         # 2. Tenta pegar IMAGEM (ainda no Thread Principal)
@@ -86,42 +156,42 @@ class App(customtkinter.CTk):
                 # Não é texto e nem imagem. Fim.
                 return
         except Exception as e:
-            print(f"Erro ao pegar imagem do clipboard: {e}")
+            logger.warning("Erro ao pegar imagem do clipboard", extra={"error": str(e)})
             messagebox.showerror("Erro de Clipboard", f"Não foi possível ler a imagem do clipboard: {e}")
             return
 
-        # 3. TEMOS UMA IMAGEM. Agora, desabilite a UI e inicie o thread de OCR.
+        # 3. TEMOS UMA IMAGEM. Agora, desabilite a UI e envie para o pool de OCR.
         self._set_ui_state(False)
-        
-        # Inicia o thread SOMENTE para a tarefa lenta (OCR)
-        # Passa o objeto 'image' para o thread.
-        threading.Thread(target=self._run_ocr_task, args=(image,), daemon=True).start()
 
-    def _run_ocr_task(self, image_object: Image.Image):
+        # Uma colagem nova substitui a anterior que ainda não terminou
+        future = self.ip_service.extractor.extract_from_image_async(image, key="main")
+        future.add_done_callback(lambda f: self.after(0, lambda: self._on_ocr_done(f)))
+
+    def _on_ocr_done(self, future):
         """
-        Executa a tarefa lenta de OCR no *Thread Secundário*.
+        Recebe o resultado do OCR no *Thread Principal*.
         """
-        extracted_ip = None
+        if future.cancelled():
+            return # Substituído por uma colagem mais nova, que cuidará da UI
         try:
-            # A única coisa no thread: processar a imagem (lento)
-            extracted_ip = self.ip_service.extractor.extract_from_image(image_object)
+            extracted_ip = future.result()
+        except CancelledError:
+            return
         except Exception as e:
-            print(f"Erro na thread de OCR: {e}")
-            self.after(0, lambda: messagebox.showerror("Erro de OCR", f"Falha ao processar a imagem: {e}"))
-
-        # 4. A tarefa lenta acabou. Agende as atualizações da UI no Thread Principal.
-        def ui_updates():
-            # 4a. REABILITA A UI (PRIMEIRO!)
+            logger.error("Erro no OCR", extra={"error": str(e)})
             self._set_ui_state(True)
-            
-            # 4b. MOSTRA O POP-UP E COLA O IP (DEPOIS!)
-            if extracted_ip:
-                messagebox.showinfo(OCR_SUCCESS_TITLE, OCR_SUCCESS_MSG.format(ip=extracted_ip))
-                self._update_ip_entry(extracted_ip)
-            else:
-                messagebox.showwarning("Falha no OCR", "Não foi possível encontrar um IP na imagem.")
-        
-        self.after(0, ui_updates)
+            messagebox.showerror("Erro de OCR", f"Falha ao processar a imagem: {e}")
+            return
+
+        # 4a. REABILITA A UI (PRIMEIRO!)
+        self._set_ui_state(True)
+
+        # 4b. MOSTRA O POP-UP E COLA O IP (DEPOIS!)
+        if extracted_ip:
+            messagebox.showinfo(OCR_SUCCESS_TITLE, OCR_SUCCESS_MSG.format(ip=extracted_ip))
+            self._update_ip_entry(extracted_ip)
+        else:
+            messagebox.showwarning("Falha no OCR", "Não foi possível encontrar um IP na imagem.")
 
     # --- FIM DA LÓGICA DE PASTE ---
 
@@ -131,6 +201,13 @@ class App(customtkinter.CTk):
             self.ip_entry.delete(0, "end")
             self.ip_entry.insert(0, ip)
         self.after(0, update)
+        if self.ip_service is not None:
+            self.ip_service.prefetch_ip_details(ip, debounce=False)
+
+    def _on_ip_typed(self, event=None):
+        """A cada tecla: agenda a consulta se o campo tiver um IP válido (com debounce)."""
+        if self.ip_service is not None:
+            self.ip_service.prefetch_ip_details(self.ip_entry.get())
 
     def _set_ui_state(self, enabled: bool):
         """Ativa ou desativa os widgets da UI na thread principal."""
@@ -164,9 +241,9 @@ class App(customtkinter.CTk):
                     show_error_func=lambda title, msg: self.after(0, lambda: messagebox.showerror(title, msg))
                 )
             except DatabaseError as e:
-                self.after(0, lambda: messagebox.showerror("Erro de Banco", str(e)))
+                self.after(0, lambda msg=str(e): messagebox.showerror("Erro de Banco", msg))
             except Exception as e:
-                self.after(0, lambda: messagebox.showerror("Erro Inesperado", str(e)))
+                self.after(0, lambda msg=str(e): messagebox.showerror("Erro Inesperado", msg))
             finally:
                 self._set_ui_state(True)
 
@@ -182,10 +259,17 @@ class App(customtkinter.CTk):
                     show_error_func=lambda title, msg: self.after(0, lambda: messagebox.showerror(title, msg))
                 )
             except DatabaseError as e:
-                self.after(0, lambda: messagebox.showerror("Erro de Banco", str(e)))
+                self.after(0, lambda msg=str(e): messagebox.showerror("Erro de Banco", msg))
             except Exception as e:
-                self.after(0, lambda: messagebox.showerror("Erro Inesperado", str(e)))
+                self.after(0, lambda msg=str(e): messagebox.showerror("Erro Inesperado", msg))
             finally:
                 self._set_ui_state(True)
 
-        threading.Thread(target=search_task, daemon=True).start()
\ No newline at end of file
+        threading.Thread(target=search_task, daemon=True).start()
+
+    def _on_list_clicked(self):
+        # Uma janela de listagem por vez; clicar de novo só a traz para frente
+        if self.results_window is not None and self.results_window.winfo_exists():
+            self.results_window.focus()
+            return
+        self.results_window = ResultsWindow(self, ip_service=self.ip_service)
@@ -0,0 +1,414 @@
+# ip_tracker/async_service.py
+"""Variante assíncrona do IPService, para muitas operações simultâneas num único event loop.
+
+Uso:
+    async with AsyncIPService() as service:
+        results = await asyncio.gather(*(service.register(ip, "123", "Publicação") for ip in ips))
+
+Com os drivers de requirements-async.txt instalados, o caminho é nativo:
+aiohttp para a API de geolocalização e, com o backend PostgreSQL, um pool
+do asyncpg (AsyncPostgresBackend) para registro, busca e lote — milhares
+de operações simultâneas sem uma thread por operação. Regras de negócio
+não são duplicadas: as mesmas consultas e a mesma validação de
+database.py, e o mesmo cache de registros, fila write-behind e cache de
+geolocalização do IPService síncrono que acompanha o serviço.
+
+Continuam num executor (no máximo `max_db_concurrency` operações por vez):
+o backend SQLite, que não tem driver assíncrono; o registro com a fila
+write-behind, cujo custo é o fsync do diário local; e tudo quando os
+drivers não estão instalados ou `use_native=False`.
+
+O IPService síncrono continua sendo a base (interface gráfica, ingestão e
+servidor HTTP usam threads); esta classe é a interface para quem já roda
+num event loop.
+"""
+import asyncio
+import ipaddress
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import DB_SETTINGS, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, \
+    GEO_API_URL, GEO_API_TIMEOUT, GEO_MAX_IN_FLIGHT, BULK_CHUNK_SIZE
+from .database import DatabaseError, SELECT_COLUMNS_SQL, UPSERT_CONFLICT_SQL, CREATE_STAGING_SQL, \
+    UPSERT_FROM_STAGING_SQL, prepare_bulk_rows, latest_per_ip, finish_bulk_report
+from .geo_cache import FAILED_LOOKUP, is_failed_lookup, is_non_routable, normalize_ip
+from .cache import MISSING
+from .ip_service import IPService
+from .ip_extractor import IPExtractor
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+# As consultas de database.py, com os parâmetros no formato do asyncpg ($1, $2...)
+_REGISTER_SQL = f"""
+    INSERT INTO registered_ips (ip_address, mobile_code, country, record_type)
+    VALUES ($1::inet, $2, $3, $4)
+    {UPSERT_CONFLICT_SQL};
+"""
+_SEARCH_SQL = f"{SELECT_COLUMNS_SQL} WHERE ip_address = $1::inet;"
+_SEARCH_MANY_SQL = f"{SELECT_COLUMNS_SQL} WHERE ip_address = ANY($1::inet[]);"
+_STAGING_COLUMNS = ("ip_address", "mobile_code", "country", "record_type")
+
+def _record_to_dict(record) -> dict:
+    # O asyncpg devolve inet como objeto ipaddress; o psycopg2, como texto
+    row = dict(record)
+    row["ip_address"] = str(row["ip_address"])
+    return row
+
+class AsyncPostgresBackend:
+    """As operações de registro e busca de storage.PostgresBackend sobre um pool do asyncpg.
+
+    Mesmos resultados e erros (DatabaseError em falha de banco) das funções
+    de database.py. O pool é criado na primeira operação, dentro do loop;
+    `pool` permite passar um já pronto.
+    """
+
+    name = "postgres"
+
+    def __init__(self, max_size: int = DB_POOL_MAX, pool=None):
+        self.max_size = max_size
+        self._pool = pool
+        self._init_lock = asyncio.Lock()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._init_lock:
+                if self._pool is None:
+                    port = DB_SETTINGS.get("port")
+                    try:
+                        self._pool = await asyncpg.create_pool(
+                            database=DB_SETTINGS.get("dbname"),
+                            user=DB_SETTINGS.get("user"),
+                            password=DB_SETTINGS.get("password"),
+                            host=DB_SETTINGS.get("host"),
+                            port=int(port) if port else None,
+                            min_size=min(DB_POOL_MIN, self.max_size),
+                            max_size=self.max_size,
+                            timeout=DB_POOL_TIMEOUT,
+                        )
+                    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+                        raise DatabaseError(f"Não foi possível conectar ao banco: {e}") from e
+        return self._pool
+
+    async def register_ip(self, ip_address, mobile_code, country, record_type) -> bool:
+        """database.register_ip_in_db."""
+        pool = await self._get_pool()
+        try:
+            with metrics.timed("db_query_seconds", op="register_ip"):
+                await pool.execute(_REGISTER_SQL, ip_address, mobile_code, country, record_type)
+            return True
+        except (OSError, ValueError, asyncio.TimeoutError, asyncpg.PostgresError,
+                asyncpg.InterfaceError) as e:
+            raise DatabaseError(f"Erro ao registrar/atualizar o IP: {e}") from e
+
+    async def register_ips(self, rows, chunk_size: int = BULK_CHUNK_SIZE) -> list[dict]:
+        """database.register_ips_in_db: mesmo relatório, COPY para a tabela temporária e upsert por lote."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size deve ser >= 1")
+        report, pending = prepare_bulk_rows(rows)
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        if not chunks:
+            return finish_bulk_report(report)
+        failure, retryable = None, True
+        try:
+            pool = await self._get_pool()
+            with metrics.timed("db_query_seconds", op="register_ips"):
+                async with pool.acquire() as conn:
+                    await conn.execute(CREATE_STAGING_SQL)
+                    for chunk in chunks:
+                        latest = latest_per_ip(report, chunk)
+                        try:
+                            async with conn.transaction():
+                                await conn.copy_records_to_table(
+                                    "staging_registered_ips", columns=_STAGING_COLUMNS,
+                                    records=[(ip, *report[idx]["_values"][1:]) for ip, idx in latest.items()])
+                                outcome = {ipaddress.ip_address(row["ip_address"]):
+                                           "inserted" if row["inserted"] else "updated"
+                                           for row in await conn.fetch(UPSERT_FROM_STAGING_SQL)}
+                        except asyncpg.PostgresError as e:
+                            failure = f"falha no lote: {e}"
+                            retryable = not isinstance(e, (asyncpg.DataError,
+                                                           asyncpg.IntegrityConstraintViolationError))
+                            break
+                        for ip, idx in latest.items():
+                            report[idx]["status"] = outcome.get(ip, "rejected")
+        except DatabaseError as e:
+            failure = str(e)
+        except (OSError, asyncio.TimeoutError, asyncpg.InterfaceError) as e:
+            failure = f"Erro de conexão no registro em lote: {e}"
+        return finish_bulk_report(report, failure, retryable)
+
+    async def search_ip(self, ip_address) -> dict | None:
+        """database.search_ip_in_db."""
+        try:
+            ip = ipaddress.ip_address(str(ip_address).strip())
+        except ValueError:
+            return None  # a coluna é inet: um texto que não é IP nunca está na tabela
+        pool = await self._get_pool()
+        try:
+            with metrics.timed("db_query_seconds", op="search_ip"):
+                record = await pool.fetchrow(_SEARCH_SQL, ip)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            raise DatabaseError(f"Erro ao buscar o IP: {e}") from e
+        return _record_to_dict(record) if record is not None else None
+
+    async def search_ips(self, ip_addresses) -> dict[str, dict]:
+        """database.search_ips_in_db: {texto recebido: registro} só dos encontrados."""
+        parsed = {}
+        for value in dict.fromkeys(ip_addresses):
+            try:
+                parsed.setdefault(ipaddress.ip_address(str(value).strip()), []).append(value)
+            except ValueError:
+                continue
+        if not parsed:
+            return {}
+        pool = await self._get_pool()
+        try:
+            with metrics.timed("db_query_seconds", op="search_ips"):
+                records = await pool.fetch(_SEARCH_MANY_SQL, list(parsed))
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            raise DatabaseError(f"Erro ao buscar os IPs: {e}") from e
+        found = {}
+        for record in records:
+            row = _record_to_dict(record)
+            for value in parsed.get(ipaddress.ip_address(row["ip_address"]), ()):
+                found[value] = row
+        return found
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+class AsyncIPService:
+    """Registro e busca de IPs com corrotinas.
+
+    Compartilha o cache de geolocalização, a base GeoIP local e o extrator
+    de OCR de um IPService síncrono (criado se não for passado), então as
+    duas interfaces enxergam os mesmos dados em cache.
+
+    - `max_db_concurrency`: conexões do pool do asyncpg, ou operações de
+      banco simultâneas no executor (padrão DB_POOL_MAX).
+    - `max_geo_concurrency`: requisições simultâneas à API (padrão GEO_MAX_IN_FLIGHT).
+    - `use_native`: False força o caminho via executor mesmo com aiohttp/asyncpg instalados.
+    - `db`: backend assíncrono já criado (padrão: AsyncPostgresBackend, se
+      o asyncpg estiver instalado e o backend do serviço for o PostgreSQL).
+    """
+
+    def __init__(self, service: IPService | None = None, max_db_concurrency: int = DB_POOL_MAX,
+                 max_geo_concurrency: int = GEO_MAX_IN_FLIGHT, use_native: bool = True, db=None):
+        if max_db_concurrency < 1 or max_geo_concurrency < 1:
+            raise ValueError("max_db_concurrency e max_geo_concurrency devem ser >= 1")
+        self.service = service if service is not None else IPService(IPExtractor())
+        self.max_db_concurrency = max_db_concurrency
+        self.use_aiohttp = use_native and aiohttp is not None
+        if db is None and use_native and asyncpg is not None and self.service.storage.name == "postgres":
+            db = AsyncPostgresBackend(max_size=max_db_concurrency)
+        # None: banco pelo executor (SQLite, sem asyncpg ou use_native=False)
+        self.db = db
+        self._db_sem = asyncio.Semaphore(max_db_concurrency)
+        self._geo_sem = asyncio.Semaphore(max_geo_concurrency)
+        self._init_lock = asyncio.Lock()
+        self._executor = None
+        self._http = None
+        # Consultas em andamento por IP: chamadas simultâneas para o mesmo IP esperam a mesma
+        self._geo_inflight: dict[str, asyncio.Future] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # --- Recursos (criados sob demanda, dentro do loop) ---
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_db_concurrency,
+                                                thread_name_prefix="async-ip")
+        return self._executor
+
+    async def _run_sync(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+
+    async def _get_http(self):
+        if self._http is None:
+            async with self._init_lock:
+                if self._http is None:
+                    self._http = aiohttp.ClientSession(
+                        timeout=aiohttp.ClientTimeout(total=GEO_API_TIMEOUT),
+                        connector=aiohttp.TCPConnector(limit=max(GEO_MAX_IN_FLIGHT, 1)),
+                    )
+        return self._http
+
+    async def close(self):
+        """Fecha a sessão HTTP, o pool do asyncpg e o executor (se criados)."""
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+        if self.db is not None:
+            await self.db.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # --- Geolocalização ---
+
+    async def get_ip_details(self, ip: str) -> dict:
+        """Mesmo resultado de IPService.get_ip_details (e o mesmo cache), sem bloquear o loop."""
+        service = self.service
+        if service.local_geo is not None:
+            info = service.local_geo.lookup(ip)
+            if not is_failed_lookup(info):
+                return info
+        if not self.use_aiohttp:
+            return await self._run_sync(service.get_ip_details, ip)
+        # Mesma chave de geo_cache.lookup_cached: a forma canônica do IP
+        key = normalize_ip(ip)
+        if key is None or is_non_routable(key):
+            return dict(FAILED_LOOKUP)
+        info = service.geo_cache.get(key, MISSING)
+        if info is not MISSING:
+            return dict(info)
+
+        pending = self._geo_inflight.get(key)
+        if pending is not None:
+            return dict(await asyncio.shield(pending))
+        pending = self._geo_inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            async with self._geo_sem:
+                info = await self._fetch_ip_info(key)
+            service.geo_cache.set(key, info)
+            pending.set_result(info)
+            return dict(info)
+        except BaseException as e:
+            pending.set_exception(e)
+            # Evita o aviso de "exceção nunca recuperada" quando ninguém mais esperava
+            pending.exception()
+            raise
+        finally:
+            del self._geo_inflight[key]
+
+    async def _fetch_ip_info(self, ip: str) -> dict:
+        http = await self._get_http()
+        try:
+            with metrics.timed("geo_api_seconds", endpoint="single"):
+                async with http.get(f"{GEO_API_URL}/json/{ip}", params={"fields": "country"}) as response:
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning("Erro ao consultar API de IP", extra={"ip": ip, "error": str(e)})
+            return dict(FAILED_LOOKUP)
+
+    async def get_ip_details_many(self, ips) -> dict[str, dict]:
+        """Vários IPs de uma vez (API /batch em lote, fora do loop)."""
+        return await self._run_sync(self.service.get_ip_details_many, list(ips))
+
+    # --- Banco de dados ---
+    # Mesma lógica dos métodos de IPService, com `self.db` no lugar de service.storage
+
+    async def register_ip(self, ip: str, mobile_code: str, country: str, record_type: str) -> bool:
+        """Como IPService.register_ip: True/False, e a fila write-behind se houver."""
+        service = self.service
+        if self.db is None or service.write_behind is not None:
+            # Sem driver assíncrono, ou o registro só vai ao diário local (fsync)
+            async with self._db_sem:
+                return await self._run_sync(service.register_ip, ip, mobile_code, country, record_type)
+        ip = ip.strip() if isinstance(ip, str) else ip
+        try:
+            return await self.db.register_ip(ip, mobile_code, country, record_type)
+        except DatabaseError as e:
+            logger.error("Erro ao registrar IP no serviço", extra={"error": str(e)})
+            return False
+        finally:
+            service.record_cache.invalidate([ip] if ip else [])
+
+    async def register_many(self, rows, chunk_size: int = BULK_CHUNK_SIZE) -> list[dict] | None:
+        """Como IPService.register_many: relatório por linha, ou None em erro."""
+        service = self.service
+        if self.db is None:
+            async with self._db_sem:
+                return await self._run_sync(service.register_many, list(rows), chunk_size)
+        try:
+            report = await self.db.register_ips(rows, chunk_size=chunk_size)
+        except DatabaseError as e:
+            logger.error("Erro ao registrar IPs em lote no serviço", extra={"error": str(e)})
+            service.record_cache.clear()
+            return None
+        service.record_cache.invalidate(
+            [entry["ip_address"] for entry in report if entry["status"] != "rejected"])
+        return report
+
+    async def search_ip(self, ip: str) -> dict | None:
+        """Como IPService.search_ip: registros ainda na fila, depois o cache de registros."""
+        service = self.service
+        if self.db is None:
+            async with self._db_sem:
+                result = await self._run_sync(service.search_ip, ip)
+            return dict(result) if result is not None else None
+        if service.write_behind is not None:
+            pending = service.write_behind.pending_record(ip)
+            if pending is not None:
+                return pending
+        try:
+            return await service.record_cache.search_async(ip.strip(), self.db.search_ip)
+        except DatabaseError as e:
+            logger.error("Erro ao buscar IP no serviço", extra={"error": str(e)})
+            return None
+
+    async def search_many(self, ips) -> dict[str, dict] | None:
+        """Como IPService.search_many: {ip: registro} com uma consulta, ou None em erro."""
+        service = self.service
+        ips = list(ips)
+        if self.db is None:
+            async with self._db_sem:
+                return await self._run_sync(service.search_many, ips)
+        try:
+            results = await service.record_cache.search_many_async(ips, self.db.search_ips)
+        except DatabaseError as e:
+            logger.error("Erro ao buscar IPs em lote no serviço", extra={"error": str(e)})
+            return None
+        if service.write_behind is not None:
+            for ip in ips:
+                pending = service.write_behind.pending_record(ip)
+                if pending is not None:
+                    results[ip] = pending
+        return results
+
+    # --- OCR ---
+
+    async def extract_from_image(self, image, key=None) -> str | None:
+        """OCR no pool de workers do extrator; pedidos com a mesma `key` se substituem."""
+        future = self.service.extractor.extract_from_image_async(image, key=key)
+        return await asyncio.wrap_future(future)
+
+    # --- Fluxos (sem interface gráfica) ---
+
+    async def register(self, ip: str, mobile_code: str, record_type: str,
+                       country: str | None = None) -> dict:
+        """Fluxo de registro: descobre o país (se não informado) e grava.
+
+        Retorna {'ip', 'country', 'registered'}; sem país, nada é gravado.
+        """
+        ip = (ip or "").strip()
+        if not ip:
+            return {"ip": ip, "country": None, "registered": False}
+        if not country:
+            country = (await self.get_ip_details(ip)).get("country")
+        registered = bool(country) and await self.register_ip(ip, mobile_code, country, record_type)
+        return {"ip": ip, "country": country, "registered": registered}
+
+    async def search(self, ip: str) -> dict | None:
+        """Fluxo de busca: normaliza a entrada e consulta o banco."""
+        ip = (ip or "").strip()
+        return await self.search_ip(ip) if ip else None
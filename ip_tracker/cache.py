@@ -0,0 +1,207 @@
+# ip_tracker/cache.py
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics
+
+# Sentinela para diferenciar "não está no cache" de um valor None armazenado
+MISSING = object()
+
+class SQLiteStore:
+    """Armazenamento chave/valor persistente em SQLite (valores em JSON)."""
+
+    def __init__(self, path: str, table: str = "cache"):
+        if not table.isidentifier():
+            raise ValueError(f"Nome de tabela inválido: {table!r}")
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("PRAGMA synchronous=NORMAL;")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Retorna (valor, expires_at) ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def purge_expired(self, now: float | None = None) -> int:
+        """Apaga entradas vencidas e retorna quantas foram removidas."""
+        now = time.time() if now is None else now
+        with self._lock:
+            cur = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class LRUCache:
+    """Cache LRU em memória, thread-safe, com TTL por entrada.
+
+    - `max_entries`: ao estourar, a entrada menos usada recentemente é removida.
+    - `ttl` / `negative_ttl`: validade (s) das entradas; valores para os quais
+      `is_negative(value)` é verdadeiro usam `negative_ttl`.
+    - `store`: um SQLiteStore opcional. Escritas vão para ele também, e faltas
+      na memória são buscadas nele (sobrevive a reinícios).
+    - `max_bytes` / `sizeof`: limite opcional pelo tamanho total das entradas,
+      medido por `sizeof(key, value)`.
+    - `name`: se informado, acertos e faltas também vão para a métrica
+      `cache_requests_total{cache=name}`.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float | None = None,
+                 is_negative=None, store: SQLiteStore | None = None,
+                 max_bytes: int | None = None, sizeof=None, name: str | None = None):
+        if max_entries < 1:
+            raise ValueError("max_entries deve ser >= 1")
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("max_bytes exige uma função sizeof")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.name = name
+        self._bytes = 0
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.is_negative = is_negative
+        self.store = store
+        self._data = OrderedDict()  # chave -> (valor, expires_at, tamanho)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "disk_hits": 0}
+
+    def _ttl_for(self, value) -> float:
+        if self.is_negative is not None and self.is_negative(value):
+            return self.negative_ttl
+        return self.ttl
+
+    def _put(self, key, value, expires_at: float):
+        """Insere na memória (com o lock já adquirido) e aplica os limites de tamanho."""
+        size = self.sizeof(key, value) if self.sizeof is not None else 0
+        self._remove(key)
+        self._data[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._data) > 1 and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats["evictions"] += 1
+
+    def _remove(self, key):
+        """Remove da memória (com o lock já adquirido), mantendo a contagem de bytes."""
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def get(self, key, default=None):
+        """Retorna o valor armazenado (mesmo que seja None) ou `default`."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._record("hit")
+                    return value
+                self._remove(key)
+                self._stats["expirations"] += 1
+
+        if self.store is not None:
+            stored = self.store.get(key)
+            if stored is not None:
+                value, expires_at = stored
+                if expires_at > now:
+                    with self._lock:
+                        self._put(key, value, expires_at)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                    self._record("disk_hit")
+                    return value
+                self.store.delete(key)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        self._record("miss")
+        return default
+
+    def _record(self, result: str):
+        if self.name is not None:
+            metrics.inc("cache_requests_total", cache=self.name, result=result)
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.time() + (self._ttl_for(value) if ttl is None else ttl)
+        with self._lock:
+            self._put(key, value, expires_at)
+        if self.store is not None:
+            self.store.set(key, value, expires_at)
+
+    def get_or_load(self, key, loader):
+        """Leitura "read-through": em caso de falta, chama `loader(key)` e armazena."""
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = loader(key)
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Contadores de acertos, faltas, despejos e expirações."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._data)
+            if self.sizeof is not None:
+                stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -1,8 +1,24 @@
 import os
-from dotenv import load_dotenv
 
-# Carrega as variáveis do arquivo .env
-load_dotenv()
+def _find_dotenv(start: str) -> str | None:
+    """Primeiro .env de `start` para cima (a mesma busca do load_dotenv() sem argumentos)."""
+    path = os.path.abspath(start)
+    while True:
+        candidate = os.path.join(path, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+# Carrega as variáveis do arquivo .env. O python-dotenv só é importado se
+# houver um .env: em servidores configurados por variáveis de ambiente, a
+# importação (alguns ms em cada processo) é evitada.
+_DOTENV_PATH = _find_dotenv(os.path.dirname(__file__))
+if _DOTENV_PATH:
+    from dotenv import load_dotenv
+    load_dotenv(_DOTENV_PATH)
 
 # Cria o dicionário de configuração
 DB_SETTINGS = {
@@ -11,4 +27,112 @@ DB_SETTINGS = {
     "password": os.getenv("DB_PASSWORD"),
     "host": os.getenv("DB_HOST"),
     "port": os.getenv("DB_PORT")
-}
\ No newline at end of file
+}
+
+# Armazenamento dos registros (ver storage.py): "postgres" ou "sqlite" (arquivo local, sem servidor)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres").strip().lower()
+SQLITE_PATH = os.path.expanduser(os.getenv("SQLITE_PATH", os.path.join("~", ".ip_tracker", "ip_tracker.db")))
+# Espera (s) por um lock de escrita de outro processo antes de desistir
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))
+# Máximo de conexões abertas ao arquivo; cada operação empresta uma e devolve ao terminar
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+
+# Pool de conexões (ver database.ConnectionPool)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Tempo máximo (s) esperando uma conexão livre antes de desistir
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Conexões paradas há mais tempo que isso (s) são testadas com 'SELECT 1' no checkout
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
+
+# Registro em lote: linhas por COPY/upsert (ver database.register_ips_in_db)
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "5000"))
+
+# Cache das buscas em registered_ips (ver record_cache.py)
+RECORD_CACHE_MAX_ENTRIES = int(os.getenv("RECORD_CACHE_MAX_ENTRIES", "10000"))
+RECORD_CACHE_TTL = float(os.getenv("RECORD_CACHE_TTL", "300"))
+# Validade dos "IP não encontrado" (curta: outro processo pode registrá-lo)
+RECORD_CACHE_NEGATIVE_TTL = float(os.getenv("RECORD_CACHE_NEGATIVE_TTL", "10"))
+# Canal LISTEN/NOTIFY para invalidar o cache entre processos (vazio = desativado)
+RECORD_CACHE_NOTIFY_CHANNEL = os.getenv("RECORD_CACHE_NOTIFY_CHANNEL", "")
+
+# Listagem paginada e exportação (ver database.list_ips_in_db e export.py)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "100"))
+# Linhas trazidas do servidor por ida ao banco durante a exportação
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "2000"))
+
+# Registro "write-behind" do app (ver write_behind.py): diário local + gravação em segundo plano
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "1") not in ("0", "false", "False")
+WRITE_BEHIND_JOURNAL = os.getenv(
+    "WRITE_BEHIND_JOURNAL", os.path.join(os.path.expanduser("~"), ".ip_tracker", "journal.jsonl"))
+# Registros por upsert e janela (ms) que junta vários registros em um único fsync
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "500"))
+WRITE_BEHIND_FSYNC_MS = float(os.getenv("WRITE_BEHIND_FSYNC_MS", "5"))
+# Espera máxima (s) entre novas tentativas quando o banco está fora
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "60"))
+
+# API de geolocalização (ip-api.com)
+GEO_API_URL = os.getenv("GEO_API_URL", "http://ip-api.com").rstrip("/")
+# Timeout (s) de cada requisição HTTP à API
+GEO_API_TIMEOUT = float(os.getenv("GEO_API_TIMEOUT", "5"))
+# Máximo de IPs por requisição ao endpoint /batch (limite do provedor: 100)
+GEO_BATCH_SIZE = int(os.getenv("GEO_BATCH_SIZE", "100"))
+# Máximo de requisições simultâneas em voo
+GEO_MAX_IN_FLIGHT = int(os.getenv("GEO_MAX_IN_FLIGHT", "4"))
+
+# Consulta antecipada do país no app (ver geo_prefetch.py): começa quando um IP
+# válido chega ao campo, após este intervalo (ms) sem mudanças
+GEO_PREFETCH = os.getenv("GEO_PREFETCH", "1") not in ("0", "false", "False")
+GEO_PREFETCH_DELAY_MS = float(os.getenv("GEO_PREFETCH_DELAY_MS", "250"))
+
+# Cache de geolocalização (ver geo_cache.py)
+GEO_CACHE_MAX_ENTRIES = int(os.getenv("GEO_CACHE_MAX_ENTRIES", "10000"))
+GEO_CACHE_TTL = float(os.getenv("GEO_CACHE_TTL", "86400"))
+# Validade das consultas que falharam (IP sem país, erro de rede)
+GEO_CACHE_NEGATIVE_TTL = float(os.getenv("GEO_CACHE_NEGATIVE_TTL", "300"))
+# Caminho do arquivo SQLite para persistir o cache (vazio = só memória)
+GEO_CACHE_PATH = os.getenv("GEO_CACHE_PATH", "")
+
+# Provedor de geolocalização: "api" (ip-api.com) ou "local" (base offline, com a API como fallback)
+GEO_PROVIDER = os.getenv("GEO_PROVIDER", "api").lower()
+# CSV (rede_cidr,país ou ip_inicial,ip_final,país) ou índice .idx já compilado
+GEOIP_DB_PATH = os.getenv("GEOIP_DB_PATH", "")
+
+# OCR (ver ocr_preprocess.py)
+# Pré-processa a imagem (cinza, escala, binarização, recorte) antes do Tesseract
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "1") not in ("0", "false", "False")
+# Configuração do Tesseract no caminho pré-processado: bloco único, só dígitos e pontos
+OCR_TESSERACT_CONFIG = os.getenv("OCR_TESSERACT_CONFIG", "--psm 6 -c tessedit_char_whitelist=0123456789.")
+# Se o caminho rápido não achar IP, tenta de novo com a imagem original
+OCR_FALLBACK_FULL = os.getenv("OCR_FALLBACK_FULL", "1") not in ("0", "false", "False")
+# Workers de OCR mantidos prontos e tamanho máximo da fila de pedidos
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "8"))
+# Modo de vários IPs (ver ip_extractor.ocr_image_to_candidates): peso da distância
+# ao cursor/centro na pontuação (0 = só a confiança) e imagens por chamada em lote
+OCR_PROXIMITY_WEIGHT = float(os.getenv("OCR_PROXIMITY_WEIGHT", "0.5"))
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "16"))
+
+# Cache de resultados de OCR por conteúdo da imagem (ver ocr_cache.py)
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "512"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(256 * 1024)))
+OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", str(7 * 86400)))
+# Caminho do arquivo SQLite para persistir o cache (vazio = só memória)
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "")
+
+# Servidor HTTP (ver http_server.py)
+HTTP_HOST = os.getenv("HTTP_HOST", "127.0.0.1")
+HTTP_PORT = int(os.getenv("HTTP_PORT", "8080"))
+# Janela (ms) para juntar consultas/gravações simultâneas em uma única ida ao banco
+HTTP_BATCH_WINDOW_MS = float(os.getenv("HTTP_BATCH_WINDOW_MS", "2"))
+# Máximo de itens por lote e threads que executam os lotes
+HTTP_MAX_BATCH = int(os.getenv("HTTP_MAX_BATCH", "500"))
+HTTP_BATCH_WORKERS = int(os.getenv("HTTP_BATCH_WORKERS", "2"))
+
+# Logs estruturados (ver log.py): nível e formato ("json" ou "text")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Métricas (ver metrics.py): arquivo regravado a cada METRICS_DUMP_INTERVAL s ("" = desativado).
+# Extensão .prom/.txt grava no formato do Prometheus; qualquer outra, JSON.
+METRICS_DUMP_PATH = os.getenv("METRICS_DUMP_PATH", "")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "15"))
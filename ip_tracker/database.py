@@ -1,62 +1,688 @@
 # ip_tracker/database.py
-import psycopg2
-from psycopg2.extras import DictCursor # <-- IMPORTANTE
-from .config import DB_SETTINGS
+import atexit
+import io
+import ipaddress
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .config import (
+    DB_SETTINGS,
+    DB_POOL_MIN,
+    DB_POOL_MAX,
+    DB_POOL_TIMEOUT,
+    DB_POOL_HEALTHCHECK_IDLE,
+    BULK_CHUNK_SIZE,
+    LIST_PAGE_SIZE,
+    EXPORT_ITERSIZE,
+)
+from .lazy import lazy_import
+from . import metrics
+
+# Carregados só na primeira conexão (o backend SQLite nunca precisa deles)
+psycopg2 = lazy_import("psycopg2", extra="postgres")
+extensions = lazy_import("psycopg2.extensions", extra="postgres")
+extras = lazy_import("psycopg2.extras", extra="postgres")
 
 class DatabaseError(Exception):
     """Exceção customizada para erros de banco."""
     pass
 
+@metrics.timed("db_connect_seconds")
 def get_db_connection():
     """Cria e retorna uma conexão com o banco de dados."""
     try:
         # Usa DictCursor para que os resultados sejam como dicionários
-        conn = psycopg2.connect(**DB_SETTINGS, cursor_factory=DictCursor)
+        conn = psycopg2.connect(**DB_SETTINGS, cursor_factory=extras.DictCursor)
         return conn
     except psycopg2.OperationalError as e:
         # Levanta um erro que a GUI pode capturar
         raise DatabaseError(f"Não foi possível conectar ao PostgreSQL: {e}") from e
 
+# --- Pool de Conexões ---
+
+class ConnectionPool:
+    """Pool de conexões reutilizáveis com o PostgreSQL.
+
+    Mantém entre `minconn` e `maxconn` conexões abertas. No checkout, conexões
+    que ficaram ociosas por mais de `healthcheck_idle` segundos são testadas
+    (e reabertas se estiverem quebradas). Se todas estiverem em uso, o checkout
+    espera até `timeout` segundos antes de levantar DatabaseError.
+    """
+
+    def __init__(self, minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX,
+                 timeout: float = DB_POOL_TIMEOUT,
+                 healthcheck_idle: float = DB_POOL_HEALTHCHECK_IDLE,
+                 connect_func=get_db_connection):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Tamanho de pool inválido: exige 0 <= minconn <= maxconn e maxconn >= 1.")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self._connect = connect_func
+
+        self._idle = deque()  # pares (conexão, instante em que foi devolvida)
+        self._size = 0        # conexões abertas (ociosas + em uso)
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._stats = {
+            "checkouts": 0,
+            "connects": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+        for _ in range(minconn):
+            conn = self._open()
+            self._idle.append((conn, time.monotonic()))
+            self._size += 1
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._stats["connects"] += 1
+        return conn
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        """Verifica se a conexão ainda é utilizável antes de entregá-la."""
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.healthcheck_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Retira uma conexão do pool (bloqueia até `timeout` se estiver cheio)."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise DatabaseError("O pool de conexões foi encerrado.")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()  # LIFO: conexão mais "quente"
+                    break
+                if self._size < self.maxconn:
+                    # Reserva a vaga e abre a conexão fora do lock
+                    self._size += 1
+                    conn, idle_since = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    metrics.inc("db_pool_timeouts_total")
+                    raise DatabaseError(
+                        f"Tempo esgotado esperando uma conexão livre ({self.maxconn} em uso)."
+                    )
+                self._cond.wait(remaining)
+
+        try:
+            if conn is None:
+                conn = self._open()
+            elif not self._is_healthy(conn, idle_since):
+                self._close_quietly(conn)
+                conn = self._open()
+                with self._cond:
+                    self._stats["reconnects"] += 1
+        except Exception:
+            # Libera a vaga reservada para não "vazar" capacidade do pool
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        metrics.observe("db_pool_wait_seconds", waited)
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Devolve uma conexão ao pool, descartando-a se estiver quebrada."""
+        if not discard and not conn.closed:
+            try:
+                # Nunca devolve uma conexão com transação pendente
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        else:
+            discard = True
+
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+                if discard:
+                    self._stats["discarded"] += 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager que empresta uma conexão e a devolve ao final.
+
+        Em caso de exceção a transação é desfeita; conexões perdidas
+        (servidor caiu, rede) são descartadas em vez de voltarem ao pool.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except Exception as e:
+            discard = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)) or conn.closed
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def close(self):
+        """Fecha todas as conexões ociosas e impede novos checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Retorna uma cópia dos contadores do pool."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+        checkouts = stats["checkouts"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / checkouts if checkouts else 0.0
+        return stats
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Retorna o pool global, criando-o na primeira chamada."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+@contextmanager
+def db_connection():
+    """Atalho para `get_pool().connection()`."""
+    with get_pool().connection() as conn:
+        yield conn
+
+def set_pool(pool: ConnectionPool | None) -> ConnectionPool | None:
+    """Substitui o pool global (ex.: apontando para outro banco) e retorna o anterior."""
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    return previous
+
+def close_pool():
+    """Encerra o pool global (registrado no atexit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+def get_pool_stats() -> dict:
+    """Contadores do pool global (checkouts, tempo de espera etc.)."""
+    if _pool is None:
+        return {}
+    return _pool.stats()
+
+atexit.register(close_pool)
+
+# --- Operações ---
+
+# Regra de atualização de um IP já registrado, comum a todos os upserts
+# (inclusive os do AsyncIPService): None não apaga o valor já gravado
+UPSERT_CONFLICT_SQL = """ON CONFLICT (ip_address) DO UPDATE SET
+        mobile_code = COALESCE(EXCLUDED.mobile_code, registered_ips.mobile_code),
+        country = COALESCE(EXCLUDED.country, registered_ips.country),
+        record_type = EXCLUDED.record_type,
+        registration_date = CURRENT_TIMESTAMP"""
+
+@metrics.timed("db_query_seconds", op="register_ip")
 def register_ip_in_db(ip_address, mobile_code, country, record_type) -> bool:
     """Insere ou ATUALIZA um registro de IP.
+    mobile_code/country None mantêm o valor já gravado.
     Retorna True se bem-sucedido.
     """
     # Sua lógica de ON CONFLICT DO UPDATE é ótima!
-    sql = """
+    sql = f"""
         INSERT INTO registered_ips (ip_address, mobile_code, country, record_type)
         VALUES (%s, %s, %s, %s)
-        ON CONFLICT (ip_address) DO UPDATE SET
-            mobile_code = EXCLUDED.mobile_code,
-            country = EXCLUDED.country,
-            record_type = EXCLUDED.record_type,
-            registration_date = CURRENT_TIMESTAMP;
+        {UPSERT_CONFLICT_SQL};
     """
-    conn = None
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute(sql, (ip_address, mobile_code, country, record_type))
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (ip_address, mobile_code, country, record_type))
             conn.commit()
             return True
+    except DatabaseError:
+        raise
     except Exception as e:
-        if conn: conn.rollback()
         # Levanta o erro para a camada de serviço tratar
         raise DatabaseError(f"Erro inesperado ao registrar/atualizar o IP: {e}") from e
-    finally:
-        if conn: conn.close()
 
+SELECT_COLUMNS_SQL = "SELECT ip_address, mobile_code, country, registration_date, record_type FROM registered_ips"
+
+def _parse_ip(value):
+    """ipaddress.IPv4Address/IPv6Address, ou None se `value` não for um IP."""
+    try:
+        return ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+
+@metrics.timed("db_query_seconds", op="search_ip")
 def search_ip_in_db(ip_address) -> dict | None:
     """Busca por um IP e retorna seus dados (como um dict) ou None."""
-    sql = "SELECT ip_address, mobile_code, country, registration_date, record_type FROM registered_ips WHERE ip_address = %s;"
-    conn = None
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute(sql, (ip_address,))
-            result = cur.fetchone()
-            return result # <-- Retorna a linha (que é um DictRow) ou None
+    ip = _parse_ip(ip_address)
+    if ip is None:
+        return None  # a coluna é inet: um texto que não é IP nunca está na tabela
+    sql = f"{SELECT_COLUMNS_SQL} WHERE ip_address = %s::inet;"
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (str(ip),))
+                result = cur.fetchone()
+                return result # <-- Retorna a linha (que é um DictRow) ou None
+    except DatabaseError:
+        raise
     except Exception as e:
         # Levanta o erro para a camada de serviço tratar
         raise DatabaseError(f"Erro inesperado ao buscar o IP: {e}") from e
-    finally:
-        if conn: conn.close()
\ No newline at end of file
+
+@metrics.timed("db_query_seconds", op="search_ips")
+def search_ips_in_db(ip_addresses) -> dict[str, dict]:
+    """Busca vários IPs com uma única consulta. Retorna {ip: registro} só dos encontrados.
+
+    As chaves são os textos recebidos em `ip_addresses` (o banco devolve a
+    forma canônica, que pode ser escrita de outro jeito).
+    """
+    parsed = {}
+    for value in dict.fromkeys(ip_addresses):
+        ip = _parse_ip(value)
+        if ip is not None:
+            parsed.setdefault(ip, []).append(value)
+    if not parsed:
+        return {}
+    sql = f"{SELECT_COLUMNS_SQL} WHERE ip_address = ANY(%s::inet[]);"
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, ([str(ip) for ip in parsed],))
+                found = {}
+                for row in cur.fetchall():
+                    for value in parsed.get(ipaddress.ip_address(row["ip_address"]), ()):
+                        found[value] = row
+                return found
+    except DatabaseError:
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Erro inesperado ao buscar os IPs: {e}") from e
+
+def _limit_clause(limit: int | None) -> str:
+    if limit is None:
+        return ""
+    if limit < 1:
+        raise ValueError("limit deve ser >= 1")
+    return f" LIMIT {int(limit)}"
+
+@metrics.timed("db_query_seconds", op="search_cidr")
+def search_cidr_in_db(network: str, limit: int | None = None) -> list:
+    """Todos os IPs dentro da rede (ex.: '10.0.0.0/8'), em ordem de endereço.
+
+    Levanta ValueError se `network` não for uma rede válida.
+    """
+    net = ipaddress.ip_network(str(network).strip(), strict=False)
+    sql = f"{SELECT_COLUMNS_SQL} WHERE ip_address <<= %s::inet ORDER BY ip_address{_limit_clause(limit)};"
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (str(net),))
+                return cur.fetchall()
+    except DatabaseError:
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Erro inesperado ao buscar a rede {net}: {e}") from e
+
+@metrics.timed("db_query_seconds", op="search_range")
+def search_range_in_db(start: str, end: str, limit: int | None = None) -> list:
+    """Todos os IPs entre `start` e `end` (inclusive), em ordem de endereço.
+
+    Levanta ValueError se os IPs forem inválidos, de versões diferentes ou fora de ordem.
+    """
+    first, last = ipaddress.ip_address(str(start).strip()), ipaddress.ip_address(str(end).strip())
+    if first.version != last.version:
+        raise ValueError("Início e fim da faixa devem ser da mesma versão de IP.")
+    if first > last:
+        raise ValueError("O início da faixa deve ser menor ou igual ao fim.")
+    sql = (f"{SELECT_COLUMNS_SQL} WHERE ip_address BETWEEN %s::inet AND %s::inet "
+           f"ORDER BY ip_address{_limit_clause(limit)};")
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (str(first), str(last)))
+                return cur.fetchall()
+    except DatabaseError:
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Erro inesperado ao buscar a faixa {first} - {last}: {e}") from e
+
+@metrics.timed("db_query_seconds", op="count_by_country")
+def count_by_country_in_db(network: str | None = None) -> dict:
+    """Quantidade de IPs por país (opcionalmente só dentro de `network`), do maior para o menor."""
+    params = ()
+    where = ""
+    if network is not None:
+        params = (str(ipaddress.ip_network(str(network).strip(), strict=False)),)
+        where = " WHERE ip_address <<= %s::inet"
+    sql = f"SELECT country, COUNT(*) AS total FROM registered_ips{where} GROUP BY country ORDER BY total DESC, country;"
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                return {row["country"]: row["total"] for row in cur.fetchall()}
+    except DatabaseError:
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Erro inesperado ao contar IPs por país: {e}") from e
+
+# --- Listagem e Exportação ---
+
+_LIST_COLUMNS = "SELECT id, ip_address, mobile_code, country, registration_date, record_type FROM registered_ips"
+_LIST_ORDER = "ORDER BY registration_date DESC, id DESC"
+
+def _list_filters(country=None, record_type=None, since=None, until=None) -> tuple[list, list]:
+    """Cláusulas WHERE (e parâmetros) dos filtros da listagem. `until` é exclusivo."""
+    clauses, params = [], []
+    if country:
+        clauses.append("country = %s")
+        params.append(country)
+    if record_type:
+        clauses.append("record_type = %s")
+        params.append(record_type)
+    if since is not None:
+        clauses.append("registration_date >= %s")
+        params.append(since)
+    if until is not None:
+        clauses.append("registration_date < %s")
+        params.append(until)
+    return clauses, params
+
+@metrics.timed("db_query_seconds", op="list_ips")
+def list_ips_in_db(country=None, record_type=None, since=None, until=None,
+                   after: tuple | None = None, limit: int = LIST_PAGE_SIZE) -> list:
+    """Uma página de registros, do mais recente para o mais antigo.
+
+    Paginação por chave (keyset): `after` é o par (registration_date, id) do
+    último registro da página anterior. Cada página custa o mesmo, não
+    importa quão longe esteja na listagem (ao contrário de OFFSET).
+    """
+    clauses, params = _list_filters(country, record_type, since, until)
+    if after is not None:
+        clauses.append("(registration_date, id) < (%s, %s)")
+        params.extend(after)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"{_LIST_COLUMNS}{where} {_LIST_ORDER}{_limit_clause(limit)};"
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
+    except DatabaseError:
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Erro inesperado ao listar os IPs: {e}") from e
+
+def iter_ips_in_db(country=None, record_type=None, since=None, until=None,
+                   itersize: int = EXPORT_ITERSIZE):
+    """Gera todos os registros filtrados, com memória constante.
+
+    Usa um cursor nomeado (no servidor): as linhas chegam em blocos de
+    `itersize`, em vez de o resultado inteiro ser carregado de uma vez.
+    A conexão fica ocupada até o gerador terminar (ou ser fechado).
+    """
+    clauses, params = _list_filters(country, record_type, since, until)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"{_LIST_COLUMNS}{where} {_LIST_ORDER};"
+    try:
+        with db_connection() as conn:
+            try:
+                with conn.cursor(name="export_registered_ips") as cur:
+                    cur.itersize = itersize
+                    cur.execute(sql, params)
+                    yield from cur
+            finally:
+                conn.rollback()  # encerra a transação que mantinha o cursor aberto
+    except DatabaseError:
+        raise
+    except psycopg2.Error as e:
+        raise DatabaseError(f"Erro inesperado ao exportar os IPs: {e}") from e
+
+# --- Registro em Lote ---
+
+# Limites das colunas de registered_ips (ver README)
+_MAX_MOBILE_CODE_LEN = 10
+_MAX_COUNTRY_LEN = 100
+_MAX_RECORD_TYPE_LEN = 20
+DEFAULT_RECORD_TYPE = "Publicação"
+# Motivo das linhas substituídas por uma ocorrência posterior do mesmo IP no lote
+DUPLICATE_IN_BATCH_REASON = "duplicado no lote (substituído por linha posterior)"
+# Status das linhas de um lote que não foi gravado por falha de conexão ou do
+# banco: ao contrário de 'rejected', reenviar a mesma linha pode dar certo
+FAILED_STATUS = "failed"
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS staging_registered_ips (
+        ip_address INET NOT NULL,
+        mobile_code VARCHAR(10),
+        country VARCHAR(100),
+        record_type VARCHAR(20) NOT NULL
+    ) ON COMMIT DELETE ROWS;
+"""
+_COPY_STAGING_SQL = "COPY staging_registered_ips (ip_address, mobile_code, country, record_type) FROM STDIN;"
+UPSERT_FROM_STAGING_SQL = f"""
+    INSERT INTO registered_ips (ip_address, mobile_code, country, record_type)
+    SELECT ip_address, mobile_code, country, record_type FROM staging_registered_ips
+    {UPSERT_CONFLICT_SQL}
+    RETURNING ip_address, (xmax = 0) AS inserted;
+"""
+
+def _normalize_bulk_row(row) -> tuple | None:
+    """Aceita um dict (chaves de register_ip_in_db) ou uma sequência de 4 itens.
+
+    Retorna None se a linha não tiver esse formato.
+    """
+    if isinstance(row, dict):
+        return (row.get("ip_address"), row.get("mobile_code"),
+                row.get("country"), row.get("record_type"))
+    if isinstance(row, (str, bytes)):
+        return None
+    try:
+        ip_address, mobile_code, country, record_type = row
+    except (TypeError, ValueError):
+        return None
+    return ip_address, mobile_code, country, record_type
+
+def validate_bulk_row(ip_address, mobile_code, country, record_type) -> str | None:
+    """Retorna o motivo da rejeição, ou None se a linha for válida."""
+    if not ip_address:
+        return "IP vazio"
+    if not isinstance(ip_address, str):
+        return "IP inválido"
+    try:
+        ipaddress.ip_address(ip_address)
+    except ValueError:
+        return "IP inválido"
+    for field, value, limit in (("mobile_code", mobile_code, _MAX_MOBILE_CODE_LEN),
+                                ("country", country, _MAX_COUNTRY_LEN),
+                                ("record_type", record_type, _MAX_RECORD_TYPE_LEN)):
+        if value is None and field != "record_type":
+            continue
+        if not isinstance(value, str):
+            return f"{field} deve ser texto"
+        if len(value) > limit:
+            return f"{field} excede {limit} caracteres"
+    return None
+
+def prepare_bulk_rows(rows) -> tuple[list[dict], list[int]]:
+    """Valida as linhas de um registro em lote.
+
+    Retorna o relatório (um dict por linha, na ordem de entrada; as inválidas
+    já como 'rejected') e os índices das linhas válidas, cujos valores
+    normalizados ficam em `entry["_values"]` até `finish_bulk_report`.
+    """
+    report, pending = [], []
+    for row in rows:
+        values = _normalize_bulk_row(row)
+        if values is None:
+            report.append({"ip_address": None, "status": "rejected",
+                           "reason": "linha malformada (esperado dict ou 4 campos)"})
+            continue
+        ip_address, mobile_code, country, record_type = values
+        if isinstance(ip_address, str):
+            ip_address = ip_address.strip()
+        record_type = record_type or DEFAULT_RECORD_TYPE
+        entry = {"ip_address": ip_address, "status": None, "reason": None}
+        reason = validate_bulk_row(ip_address, mobile_code, country, record_type)
+        if reason:
+            entry["status"], entry["reason"] = "rejected", reason
+        else:
+            entry["_values"] = (ip_address, mobile_code, country, record_type)
+            pending.append(len(report))
+        report.append(entry)
+    return report, pending
+
+def latest_per_ip(report: list[dict], chunk: list[int]) -> dict:
+    """{ipaddress: índice} da última ocorrência de cada IP do lote; as anteriores viram 'rejected'.
+
+    Compara endereços, não textos: '2001:DB8::1' e '2001:db8::1' são o mesmo IP.
+    """
+    latest = {}
+    for idx in chunk:
+        ip = ipaddress.ip_address(report[idx]["ip_address"])
+        if ip in latest:
+            superseded = report[latest[ip]]
+            superseded["status"] = "rejected"
+            superseded["reason"] = DUPLICATE_IN_BATCH_REASON
+        latest[ip] = idx
+    return latest
+
+def finish_bulk_report(report: list[dict], failure: str | None = None, retryable: bool = False) -> list[dict]:
+    """Marca o que ficou sem status por causa de `failure` e remove os campos internos.
+
+    Com `retryable` (conexão caiu, banco fora do ar) o status é FAILED_STATUS;
+    sem, 'rejected' (o banco recusou os dados do lote).
+    """
+    status = FAILED_STATUS if retryable else "rejected"
+    for entry in report:
+        if failure and entry["status"] is None:
+            entry["status"], entry["reason"] = status, failure
+        entry.pop("_values", None)
+    return report
+
+def _copy_field(value) -> str:
+    """Escapa um valor para o formato texto do COPY (NULL vira \\N)."""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+def _upsert_chunk(cur, chunk: list) -> dict:
+    """Carrega um lote via COPY e faz um único upsert. Retorna {ip: 'inserted'|'updated'}."""
+    buf = io.StringIO()
+    for values in chunk:
+        buf.write("\t".join(_copy_field(v) for v in values))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(_COPY_STAGING_SQL, buf)
+    cur.execute(UPSERT_FROM_STAGING_SQL)
+    # O banco devolve a forma canônica do inet; as chaves são objetos ipaddress
+    return {ipaddress.ip_address(ip): ("inserted" if inserted else "updated")
+            for ip, inserted in cur.fetchall()}
+
+@metrics.timed("db_query_seconds", op="register_ips")
+def register_ips_in_db(rows, chunk_size: int = BULK_CHUNK_SIZE) -> list[dict]:
+    """Insere ou ATUALIZA vários IPs de uma vez.
+
+    Cada lote de `chunk_size` linhas é copiado (COPY) para uma tabela temporária
+    e gravado com um único INSERT ... ON CONFLICT, em sua própria transação.
+    Retorna um relatório na ordem de entrada: uma lista de dicts com
+    `ip_address`, `status` ('inserted', 'updated', 'rejected' ou 'failed') e `reason`.
+
+    Linhas inválidas são rejeitadas sem ir ao banco. IPs repetidos dentro do
+    mesmo lote: vale a última ocorrência. mobile_code/country None não apagam
+    o valor já gravado (ex.: reingestão sem enriquecimento).
+
+    Se um lote falhar, ele e os seguintes ficam sem gravar (os lotes
+    anteriores já foram): 'rejected' se o banco recusou os dados
+    (DataError/IntegrityError), FAILED_STATUS se a falha foi de conexão ou do
+    banco e a linha pode ser reenviada.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size deve ser >= 1")
+
+    report, pending = prepare_bulk_rows(rows)
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    if chunks:
+        failure, retryable = None, True
+        try:
+            with db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(CREATE_STAGING_SQL)
+                    conn.commit()
+                    for chunk in chunks:
+                        if failure:
+                            break
+                        latest = latest_per_ip(report, chunk)
+                        try:
+                            outcome = _upsert_chunk(cur, [report[i]["_values"] for i in latest.values()])
+                            conn.commit()
+                        except psycopg2.Error as e:
+                            conn.rollback()
+                            failure = f"falha no lote: {e}"
+                            retryable = not isinstance(e, (psycopg2.DataError, psycopg2.IntegrityError))
+                            continue
+                        for ip, idx in latest.items():
+                            report[idx]["status"] = outcome.get(ip, "rejected")
+        except DatabaseError as e:
+            failure = str(e)
+        except Exception as e:
+            failure = f"Erro inesperado no registro em lote: {e}"
+        return finish_bulk_report(report, failure, retryable)
+    return finish_bulk_report(report)
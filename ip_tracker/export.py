@@ -0,0 +1,93 @@
+# ip_tracker/export.py
+"""Exportação dos IPs registrados em CSV ou JSON Lines, em streaming.
+
+Uso:
+    python -m ip_tracker.export -o ips.csv
+    python -m ip_tracker.export --format jsonl --country Brasil --since 2025-01-01 > brasil.jsonl
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+from .database import DatabaseError
+from .log import configure_logging
+from .storage import create_storage
+
+EXPORT_FIELDS = ("ip_address", "mobile_code", "country", "record_type", "registration_date")
+EXPORT_FORMATS = ("csv", "jsonl")
+
+def _value(row, field):
+    value = row[field]
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+def write_csv(rows, out) -> int:
+    """Escreve as linhas em CSV (com cabeçalho). Retorna quantas foram escritas."""
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for row in rows:
+        writer.writerow([_value(row, field) for field in EXPORT_FIELDS])
+        count += 1
+    return count
+
+def write_jsonl(rows, out) -> int:
+    """Escreve um objeto JSON por linha. Retorna quantas linhas foram escritas."""
+    count = 0
+    for row in rows:
+        out.write(json.dumps({field: _value(row, field) for field in EXPORT_FIELDS}, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+def export_ips(out, fmt: str = "csv", storage=None, **filters) -> int:
+    """Exporta os registros (filtros de database.list_ips_in_db) para o arquivo `out`.
+
+    `storage` é o backend de onde ler (padrão: STORAGE_BACKEND do config).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato inválido: {fmt!r} (use {', '.join(EXPORT_FORMATS)})")
+    writer = write_csv if fmt == "csv" else write_jsonl
+    storage = storage if storage is not None else create_storage()
+    return writer(storage.iter_ips(**filters), out)
+
+def _parse_day(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ip_tracker.export",
+                                     description="Exporta os IPs registrados em CSV ou JSON Lines.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None,
+                        help="formato (padrão: pela extensão de --output, ou csv)")
+    parser.add_argument("-o", "--output", default="-", help="arquivo de saída ('-' = stdout, padrão)")
+    parser.add_argument("--country", default=None, help="só IPs deste país")
+    parser.add_argument("--record-type", default=None, help="só registros deste tipo")
+    parser.add_argument("--since", type=_parse_day, default=None, help="registrados a partir de AAAA-MM-DD")
+    parser.add_argument("--until", type=_parse_day, default=None, help="registrados até AAAA-MM-DD (inclusive)")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    fmt = args.format or ("jsonl" if args.output.endswith(".jsonl") else "csv")
+    filters = {
+        "country": args.country,
+        "record_type": args.record_type,
+        "since": args.since,
+        "until": args.until + timedelta(days=1) if args.until else None,
+    }
+    try:
+        if args.output == "-":
+            count = export_ips(sys.stdout, fmt, **filters)
+        else:
+            with open(args.output, "w", newline="", encoding="utf-8") as out:
+                count = export_ips(out, fmt, **filters)
+    except (DatabaseError, OSError) as e:
+        print(f"Erro na exportação: {e}", file=sys.stderr)
+        return 1
+    print(f"{count} registros exportados.", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
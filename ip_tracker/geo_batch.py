@@ -0,0 +1,154 @@
+# ip_tracker/geo_batch.py
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import GEO_API_URL, GEO_API_TIMEOUT, GEO_BATCH_SIZE, GEO_MAX_IN_FLIGHT
+from .utils import get_http_session, requests
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Resultado usado para IPs que a API não conseguiu resolver (mesmo formato de get_ip_info)
+FAILED_LOOKUP = {"status": "fail"}
+
+class RateLimiter:
+    """Respeita os cabeçalhos de limite do ip-api (X-Rl e X-Ttl).
+
+    X-Rl é o número de requisições restantes na janela atual e X-Ttl os
+    segundos até a janela reiniciar. Novas requisições só saem enquanto houver
+    cota para elas e para as que já estão em voo.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._remaining = None   # desconhecido até a primeira resposta
+        self._reset_at = 0.0     # instante (monotonic) em que a janela reinicia
+        self._blocked_until = 0.0
+        self._in_flight = 0
+
+    def acquire(self):
+        """Bloqueia até ser permitido enviar mais uma requisição."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now >= self._reset_at:
+                    self._remaining = None
+                if now < self._blocked_until:
+                    self._cond.wait(self._blocked_until - now)
+                    continue
+                if self._remaining is not None and self._remaining <= self._in_flight:
+                    self._cond.wait(max(self._reset_at - now, 0.05))
+                    continue
+                self._in_flight += 1
+                return
+
+    def release(self, response: requests.Response | None):
+        """Atualiza a cota com os cabeçalhos da resposta (ou None em erro de rede)."""
+        with self._cond:
+            self._in_flight -= 1
+            if response is not None:
+                now = time.monotonic()
+                ttl = _int_header(response.headers, "X-Ttl")
+                remaining = _int_header(response.headers, "X-Rl")
+                if ttl is not None:
+                    self._reset_at = now + ttl
+                if remaining is not None:
+                    self._remaining = remaining
+                if response.status_code == 429:
+                    self._blocked_until = now + (ttl if ttl is not None else 60)
+            self._cond.notify_all()
+
+def _int_header(headers, name: str) -> int | None:
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class BatchGeoLookup:
+    """Consulta o país de muitos IPs usando o endpoint /batch do ip-api.
+
+    Agrupa os IPs em lotes de `batch_size`, mantém no máximo `max_in_flight`
+    requisições simultâneas sobre a sessão HTTP compartilhada, aplica
+    `timeout` a cada requisição e respeita os limites de taxa do provedor.
+    O limite de requisições em voo e o de taxa valem para todas as chamadas
+    de `lookup` na mesma instância, inclusive de threads diferentes.
+    """
+
+    def __init__(self, batch_size: int = GEO_BATCH_SIZE, max_in_flight: int = GEO_MAX_IN_FLIGHT,
+                 timeout: float = GEO_API_TIMEOUT, base_url: str = GEO_API_URL,
+                 session: requests.Session | None = None, max_retries: int = 3):
+        if batch_size < 1 or max_in_flight < 1:
+            raise ValueError("batch_size e max_in_flight devem ser >= 1")
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.url = f"{base_url.rstrip('/')}/batch"
+        self.session = session or get_http_session()
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+    def lookup(self, ips) -> dict[str, dict]:
+        """Retorna um mapeamento {ip: info} para todos os IPs (sem repetir consultas)."""
+        unique = list(dict.fromkeys(ip for ip in ips if ip))
+        batches = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+        results = {}
+        if not batches:
+            return results
+        if len(batches) == 1:
+            results.update(self._fetch_batch(batches[0]))
+            return results
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches))) as pool:
+            for batch_result in pool.map(self._fetch_batch, batches):
+                results.update(batch_result)
+        return results
+
+    def _fetch_batch(self, batch: list[str]) -> dict[str, dict]:
+        """Envia um lote, com novas tentativas para 429, 5xx e erros de rede."""
+        payload = [{"query": ip, "fields": "status,country,query"} for ip in batch]
+        for attempt in range(self.max_retries + 1):
+            with self._slots:
+                self.rate_limiter.acquire()
+                response = None
+                try:
+                    with metrics.timed("geo_api_seconds", endpoint="batch"):
+                        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                except requests.exceptions.RequestException as e:
+                    logger.warning("Erro ao consultar API de IP em lote",
+                                   extra={"attempt": attempt + 1, "batch_size": len(batch), "error": str(e)})
+                finally:
+                    self.rate_limiter.release(response)
+
+            if response is not None:
+                if response.status_code == 429 or response.status_code >= 500:
+                    metrics.inc("geo_api_errors_total", endpoint="batch", status=str(response.status_code))
+                    logger.warning("API de IP em lote respondeu com erro",
+                                   extra={"attempt": attempt + 1, "status": response.status_code})
+                else:
+                    try:
+                        response.raise_for_status()
+                        return self._parse(batch, response.json())
+                    except (requests.exceptions.RequestException, ValueError) as e:
+                        metrics.inc("geo_api_errors_total", endpoint="batch", status="invalid")
+                        logger.warning("Resposta inválida da API de IP em lote", extra={"error": str(e)})
+                        break
+            if attempt < self.max_retries:
+                time.sleep(min(2 ** attempt * 0.5, 8))
+        return {ip: dict(FAILED_LOOKUP) for ip in batch}
+
+    @staticmethod
+    def _parse(batch: list[str], data) -> dict[str, dict]:
+        results = {ip: dict(FAILED_LOOKUP) for ip in batch}
+        for item in data if isinstance(data, list) else []:
+            ip = item.get("query")
+            if ip in results and item.get("status") == "success" and item.get("country"):
+                results[ip] = {"country": item["country"]}
+        return results
+
+def get_ip_info_batch(ips) -> dict[str, dict]:
+    """Atalho: consulta vários IPs com as configurações padrão."""
+    return BatchGeoLookup().lookup(ips)
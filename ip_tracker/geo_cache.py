@@ -0,0 +1,79 @@
+# ip_tracker/geo_cache.py
+import ipaddress
+
+from .cache import LRUCache, SQLiteStore, MISSING
+from .config import GEO_CACHE_MAX_ENTRIES, GEO_CACHE_TTL, GEO_CACHE_NEGATIVE_TTL, GEO_CACHE_PATH
+from .utils import get_ip_info
+
+FAILED_LOOKUP = {"status": "fail"}
+
+def is_failed_lookup(info: dict) -> bool:
+    """Uma consulta sem país é tratada como negativa (TTL curto)."""
+    return not (info and info.get("country"))
+
+def normalize_ip(ip) -> str | None:
+    """Forma canônica do IP (chave do cache), ou None se não for um IP."""
+    try:
+        return str(ipaddress.ip_address(ip.strip()))
+    except (ValueError, AttributeError):
+        return None
+
+def is_non_routable(ip: str) -> bool:
+    """IPs privados, reservados, loopback etc. (ou inválidos) nunca têm país na API."""
+    try:
+        return not ipaddress.ip_address(ip.strip()).is_global
+    except (ValueError, AttributeError):
+        return True
+
+def create_geo_cache(path: str | None = None) -> LRUCache:
+    """Cria o cache de geolocalização a partir do config.py."""
+    path = GEO_CACHE_PATH if path is None else path
+    store = SQLiteStore(path, table="geo_cache") if path else None
+    return LRUCache(
+        max_entries=GEO_CACHE_MAX_ENTRIES,
+        ttl=GEO_CACHE_TTL,
+        negative_ttl=GEO_CACHE_NEGATIVE_TTL,
+        is_negative=is_failed_lookup,
+        store=store,
+        name="geo",
+    )
+
+def lookup_cached(cache: LRUCache, ip: str, fetch=get_ip_info) -> dict:
+    """Consulta um IP passando pelo cache; IPs não roteáveis nem chegam à API.
+
+    O cache usa a forma canônica do IP (' 8.8.8.8' e '8.8.8.8', '2001:DB8::1'
+    e '2001:db8::1' são a mesma entrada) e devolve cópias: alterar o dict
+    retornado não altera o que está em cache.
+    """
+    key = normalize_ip(ip)
+    if key is None or is_non_routable(key):
+        return dict(FAILED_LOOKUP)
+    return dict(cache.get_or_load(key, fetch))
+
+def lookup_many_cached(cache: LRUCache, ips, fetch_many) -> dict[str, dict]:
+    """Versão em lote: só os IPs ausentes do cache são enviados para `fetch_many`.
+
+    O resultado usa os textos recebidos como chaves; o cache e `fetch_many`,
+    a forma canônica.
+    """
+    results, missing = {}, {}  # missing: forma canônica -> textos recebidos
+    for ip in dict.fromkeys(ips):
+        if not ip:
+            continue
+        key = normalize_ip(ip)
+        if key is None or is_non_routable(key):
+            results[ip] = dict(FAILED_LOOKUP)
+            continue
+        info = cache.get(key, MISSING)
+        if info is MISSING:
+            missing.setdefault(key, []).append(ip)
+        else:
+            results[ip] = dict(info)
+    if missing:
+        fetched = fetch_many(list(missing))
+        for key, originals in missing.items():
+            info = fetched.get(key, FAILED_LOOKUP)
+            cache.set(key, info)
+            for ip in originals:
+                results[ip] = dict(info)
+    return results
@@ -0,0 +1,269 @@
+# ip_tracker/geo_local.py
+import csv
+import heapq
+import ipaddress
+import logging
+import mmap
+import os
+import socket
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+from .config import GEO_PROVIDER, GEOIP_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+FAILED_LOOKUP = {"status": "fail"}
+
+# Formato do índice compilado (little-endian):
+#   cabeçalho: magic, nº de faixas IPv4, nº de faixas IPv6, nº de países, bytes dos nomes
+#   IPv4: inícios uint32[n4], fins uint32[n4], país uint16[n4]
+#   IPv6: inícios 16 bytes big-endian [n6], fins [n6], país uint16[n6]
+#   nomes dos países em UTF-8 separados por '\n'
+# v2: faixas achatadas (sem sobreposição); índices v1 são recompilados a partir do CSV
+_MAGIC = b"IPGEOv2\x00"
+_HEADER = struct.Struct("<8sIIII")
+_V6_WIDTH = 16
+
+class _FixedWidthKeys:
+    """Sequência de chaves de tamanho fixo sobre um buffer (para usar com bisect).
+
+    Chaves big-endian de mesmo tamanho comparam como bytes na mesma ordem que
+    os inteiros que representam.
+    """
+
+    def __init__(self, buf, count: int, width: int):
+        self._buf = buf
+        self._count = count
+        self._width = width
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i: int) -> bytes:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start = i * self._width
+        return bytes(self._buf[start:start + self._width])
+
+def _parse_range(row: list[str]):
+    """Converte uma linha do CSV em (início, fim, versão, país) ou None (cabeçalho/lixo).
+
+    Aceita `rede_cidr,país` ou `ip_inicial,ip_final,país` (IPs em texto ou inteiros).
+    """
+    row = [field.strip() for field in row]
+    try:
+        if len(row) == 2:
+            net = ipaddress.ip_network(row[0], strict=False)
+            return int(net.network_address), int(net.broadcast_address), net.version, row[1]
+        if len(row) >= 3:
+            start = ipaddress.ip_address(int(row[0]) if row[0].isdigit() else row[0])
+            end = ipaddress.ip_address(int(row[1]) if row[1].isdigit() else row[1])
+            if start.version != end.version or int(end) < int(start):
+                return None
+            return int(start), int(end), start.version, row[2]
+    except ValueError:
+        return None
+    return None
+
+def _flatten(ranges: list[tuple]) -> list[tuple]:
+    """Faixas (início, fim, país) ordenadas e sem sobreposição, para a busca binária.
+
+    Onde faixas se sobrepõem (ex.: 10.0.0.0/8 e 10.1.0.0/16), vale a mais
+    específica (a menor); entre faixas do mesmo tamanho, a que vem depois no
+    CSV. Sem sobreposições (o caso comum), só ordena.
+    """
+    ordered = sorted(ranges)
+    if all(prev[1] < cur[0] for prev, cur in zip(ordered, ordered[1:])):
+        return ordered
+    # Varredura pelos limites: em cada trecho elementar, vence o topo do heap
+    # (menor faixa ativa); faixas que já terminaram saem do heap sob demanda
+    items = sorted((start, end, -order, country) for order, (start, end, country) in enumerate(ranges))
+    points = sorted({start for start, _, _, _ in items} | {end + 1 for _, end, _, _ in items})
+    flat, active, next_item = [], [], 0
+    for point, following in zip(points, points[1:]):
+        while next_item < len(items) and items[next_item][0] == point:
+            start, end, neg_order, country = items[next_item]
+            heapq.heappush(active, (end - start, neg_order, end, country))
+            next_item += 1
+        while active and active[0][2] < point:
+            heapq.heappop(active)
+        if not active:
+            continue
+        country = active[0][3]
+        if flat and flat[-1][2] == country and flat[-1][1] == point - 1:
+            flat[-1] = (flat[-1][0], following - 1, country)
+        else:
+            flat.append((point, following - 1, country))
+    return flat
+
+def compile_csv(csv_path: str, index_path: str) -> int:
+    """Compila o CSV de faixas no índice binário. Retorna o nº de faixas do índice.
+
+    Faixas sobrepostas são achatadas (ver `_flatten`): no índice, cada IP cai
+    em no máximo uma faixa.
+    """
+    v4, v6 = [], []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            parsed = _parse_range(row)
+            if parsed is None or not parsed[3]:
+                continue
+            start, end, version, country = parsed
+            (v4 if version == 4 else v6).append((start, end, country))
+    v4 = _flatten(v4)
+    v6 = _flatten(v6)
+
+    countries = sorted({c for _, _, c in v4} | {c for _, _, c in v6})
+    if len(countries) > 0xFFFF:
+        raise ValueError("Países demais para o índice (máximo 65535).")
+    country_idx = {c: i for i, c in enumerate(countries)}
+    names = "\n".join(countries).encode("utf-8")
+
+    v4_starts = array("I", (s for s, _, _ in v4))
+    v4_ends = array("I", (e for _, e, _ in v4))
+    v4_idx = array("H", (country_idx[c] for _, _, c in v4))
+    v6_idx = array("H", (country_idx[c] for _, _, c in v6))
+    if sys.byteorder == "big":
+        for arr in (v4_starts, v4_ends, v4_idx, v6_idx):
+            arr.byteswap()
+
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(_MAGIC, len(v4), len(v6), len(countries), len(names)))
+        out.write(v4_starts.tobytes())
+        out.write(v4_ends.tobytes())
+        out.write(v4_idx.tobytes())
+        out.write(b"".join(s.to_bytes(_V6_WIDTH, "big") for s, _, _ in v6))
+        out.write(b"".join(e.to_bytes(_V6_WIDTH, "big") for _, e, _ in v6))
+        out.write(v6_idx.tobytes())
+        out.write(names)
+    os.replace(tmp_path, index_path)  # troca atômica: leitores nunca veem meio arquivo
+    return len(v4) + len(v6)
+
+class LocalGeoIPDatabase:
+    """Base de geolocalização offline sobre um índice mapeado em memória (mmap).
+
+    A abertura só mapeia o arquivo (quase instantânea, páginas carregadas sob
+    demanda); cada consulta é uma busca binária (bisect) nos inícios das faixas.
+    """
+
+    def __init__(self, index_path: str):
+        self.path = index_path
+        self._file = open(index_path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Arquivo vazio não pode ser mapeado
+            self._file.close()
+            raise ValueError(f"Índice GeoIP vazio: {index_path}")
+        buf = memoryview(self._mm)
+
+        magic, n4, n6, n_countries, names_len = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"Arquivo não é um índice GeoIP válido: {index_path}")
+
+        offset = _HEADER.size
+        def take(size):
+            nonlocal offset
+            view = buf[offset:offset + size]
+            offset += size
+            return view
+
+        v4_starts, v4_ends, v4_idx = take(4 * n4), take(4 * n4), take(2 * n4)
+        v6_starts, v6_ends, v6_idx = take(_V6_WIDTH * n6), take(_V6_WIDTH * n6), take(2 * n6)
+        names = bytes(take(names_len)).decode("utf-8")
+
+        if sys.byteorder == "little":
+            # Acesso direto ao mmap, sem cópia
+            self._v4_starts = v4_starts.cast("I")
+            self._v4_ends = v4_ends.cast("I")
+            self._v4_idx = v4_idx.cast("H")
+            self._v6_idx = v6_idx.cast("H")
+        else:
+            self._v4_starts, self._v4_ends, self._v4_idx, self._v6_idx = (
+                self._swapped("I", v4_starts), self._swapped("I", v4_ends),
+                self._swapped("H", v4_idx), self._swapped("H", v6_idx),
+            )
+        self._v6_starts = _FixedWidthKeys(v6_starts, n6, _V6_WIDTH)
+        self._v6_ends = _FixedWidthKeys(v6_ends, n6, _V6_WIDTH)
+        self._countries = names.split("\n") if n_countries else []
+
+    @staticmethod
+    def _swapped(typecode: str, view) -> array:
+        arr = array(typecode)
+        arr.frombytes(view)
+        arr.byteswap()
+        return arr
+
+    @classmethod
+    def open(cls, path: str) -> "LocalGeoIPDatabase":
+        """Abre um índice compilado, ou um CSV (compilando `<csv>.idx` se necessário)."""
+        if path.lower().endswith(".csv"):
+            index_path = f"{path}.idx"
+            if (not os.path.exists(index_path)
+                    or os.path.getmtime(index_path) < os.path.getmtime(path)):
+                compile_csv(path, index_path)
+            try:
+                return cls(index_path)
+            except ValueError:
+                compile_csv(path, index_path)  # índice de outra versão do formato
+                return cls(index_path)
+        return cls(path)
+
+    def __len__(self):
+        return len(self._v4_starts) + len(self._v6_starts)
+
+    def lookup_country(self, ip: str) -> str | None:
+        """Retorna o país do IP ou None se ele não estiver em nenhuma faixa."""
+        ip = ip.strip()
+        try:
+            # inet_pton é bem mais rápido que ipaddress.ip_address no caminho quente
+            if ":" not in ip:
+                key = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+            else:
+                key = socket.inet_pton(socket.AF_INET6, ip.split("%", 1)[0])
+        except OSError:
+            return None
+        if isinstance(key, int):
+            i = bisect_right(self._v4_starts, key) - 1
+            if i >= 0 and key <= self._v4_ends[i]:
+                return self._countries[self._v4_idx[i]]
+            return None
+        i = bisect_right(self._v6_starts, key) - 1
+        if i >= 0 and key <= self._v6_ends[i]:
+            return self._countries[self._v6_idx[i]]
+        return None
+
+    def lookup(self, ip: str) -> dict:
+        """Mesmo formato de utils.get_ip_info: {'country': ...} ou {'status': 'fail'}."""
+        country = self.lookup_country(ip)
+        return {"country": country} if country else dict(FAILED_LOOKUP)
+
+    def close(self):
+        # Libera as views antes de fechar o mmap
+        self._v4_starts = self._v4_ends = self._v4_idx = self._v6_idx = None
+        self._v6_starts = self._v6_ends = None
+        try:
+            self._mm.close()
+        except (BufferError, ValueError):
+            pass
+        self._file.close()
+
+def load_local_geoip() -> LocalGeoIPDatabase | None:
+    """Abre a base local se GEO_PROVIDER='local' e GEOIP_DB_PATH estiver configurado."""
+    if GEO_PROVIDER != "local" or not GEOIP_DB_PATH:
+        return None
+    try:
+        return LocalGeoIPDatabase.open(GEOIP_DB_PATH)
+    except (OSError, ValueError) as e:
+        logger.error("Erro ao abrir a base GeoIP local; usando apenas a API",
+                     extra={"path": GEOIP_DB_PATH, "error": str(e)})
+        return None
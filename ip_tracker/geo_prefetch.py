@@ -0,0 +1,133 @@
+# ip_tracker/geo_prefetch.py
+"""Consulta antecipada do país enquanto o usuário preenche o formulário.
+
+Assim que um IP válido aparece no campo (colado, extraído por OCR ou
+digitado), a consulta de geolocalização começa em segundo plano; quando o
+usuário clica em Registrar, o resultado já chegou ou está a caminho, e a
+ida à API sai do caminho crítico.
+
+- debounce: com digitação, a consulta só começa `delay` s depois do último
+  IP informado, para não disparar uma por tecla ('10.0.0.1' → '10.0.0.12');
+  um IP colado ou extraído por OCR chega inteiro e é consultado na hora;
+- cancelamento: um IP novo cancela a consulta agendada do anterior (a que
+  já estiver em andamento termina e fica no cache de geolocalização, mas
+  o resultado não é mais usado);
+- `result(ip)` usa o resultado pronto, espera o que está em andamento ou,
+  se o debounce ainda não venceu, consulta na hora, sem esperar o prazo;
+  o resultado é usado uma vez só: depois disso (ou de uma consulta que já
+  terminou), o mesmo IP volta a passar pelo cache de geolocalização, com
+  os prazos de validade dele.
+"""
+import ipaddress
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+from .config import GEO_PREFETCH_DELAY_MS
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+def _normalize(ip: str) -> str | None:
+    """O IP na forma canônica, ou None se o texto (ainda) não for um IP."""
+    try:
+        return str(ipaddress.ip_address(ip.strip()))
+    except (ValueError, AttributeError):
+        return None
+
+class GeoPrefetcher:
+    """Mantém uma consulta antecipada por vez: a do último IP informado.
+
+    `lookup(ip) -> dict` é a consulta de verdade (ex.: IPService.get_ip_details,
+    que passa pelo cache).
+    """
+
+    def __init__(self, lookup, delay: float = GEO_PREFETCH_DELAY_MS / 1000):
+        self._lookup = lookup
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._ip = None       # IP da consulta atual
+        self._future = None   # resultado da consulta atual
+        self._timer = None    # debounce ainda não vencido
+
+    def schedule(self, ip: str, delay: float | None = None) -> bool:
+        """Agenda a consulta de `ip` para daqui a `delay` s (padrão: self.delay).
+
+        Retorna False (e cancela a anterior) se o texto não for um IP válido.
+        """
+        ip = _normalize(ip)
+        with self._lock:
+            if ip is not None and ip == self._ip and not self._future.done():
+                return True  # mesmo IP: mantém a consulta agendada ou em andamento
+            self._cancel_locked()
+            if ip is None:
+                return False
+            future = Future()
+            timer = threading.Timer(self.delay if delay is None else delay, self._run, args=(ip, future))
+            timer.daemon = True
+            self._ip, self._future, self._timer = ip, future, timer
+        timer.start()
+        metrics.inc("geo_prefetch_total", result="scheduled")
+        return True
+
+    def cancel(self):
+        """Descarta a consulta atual (ex.: campo apagado, janela fechada)."""
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._future is not None and self._future.cancel():
+            metrics.inc("geo_prefetch_total", result="cancelled")
+        self._ip = self._future = self._timer = None
+
+    def _run(self, ip: str, future: Future):
+        """Executa a consulta (no timer ou em result()); só a primeira chamada roda."""
+        with self._lock:
+            if future.running() or future.done() or not future.set_running_or_notify_cancel():
+                return  # já começou em outra thread, ou foi cancelada antes de começar
+            if self._future is future:
+                self._timer = None
+        try:
+            future.set_result(self._lookup(ip))
+        except Exception as e:
+            logger.warning("Falha na consulta antecipada do IP", extra={"ip": ip, "error": str(e)})
+            future.set_exception(e)
+
+    def result(self, ip: str, timeout: float | None = None) -> dict:
+        """Detalhes de `ip`, aproveitando a consulta antecipada se for do mesmo IP.
+
+        O tempo de espera aqui (o que o usuário sente depois do clique) vai
+        para a métrica `geo_prefetch_wait_seconds{result}`, com result =
+        'hit' (já pronta), 'inflight' (em andamento), 'pending' (debounce
+        não vencido: consultada na hora) ou 'miss' (outro IP ou nenhuma).
+        """
+        start = time.perf_counter()
+        normalized = _normalize(ip)
+        with self._lock:
+            future = self._future if normalized is not None and normalized == self._ip else None
+            timer = self._timer if future is not None else None
+            if timer is not None:
+                timer.cancel()
+        if future is None:
+            state = "miss"
+            info = self._lookup(ip)
+        else:
+            state = "hit" if future.done() else "pending" if timer is not None else "inflight"
+            if timer is not None:
+                self._run(normalized, future)  # não espera o debounce; no-op se o timer já começou
+            try:
+                info = future.result(timeout)
+            except CancelledError:
+                # Outro IP chegou ao campo entre o clique e o início da consulta
+                state = "miss"
+                info = self._lookup(ip)
+            finally:
+                with self._lock:
+                    if self._future is future and future.done():
+                        self._ip = self._future = self._timer = None  # já consumido
+        metrics.inc("geo_prefetch_total", result=state)
+        metrics.observe("geo_prefetch_wait_seconds", time.perf_counter() - start, result=state)
+        return info
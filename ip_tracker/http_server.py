@@ -0,0 +1,374 @@
+# ip_tracker/http_server.py
+"""Servidor HTTP de consulta e registro de IPs, para outros serviços.
+
+Uso:
+    python -m ip_tracker.http_server --port 8080
+
+Rotas:
+    GET  /ip/{ip}     registro do IP (404 se não existir)
+    POST /ip          {"ip_address", "mobile_code", "country", "record_type"}
+                      (sem "country", o país é consultado como no app)
+    POST /ip/batch    lista desses objetos (país consultado em lote); responde o relatório por linha
+    GET  /stats       contadores dos lotes e do armazenamento (pool de conexões / arquivo SQLite)
+    GET  /metrics     latências e contadores (texto do Prometheus; ?format=json para JSON)
+
+Consultas e gravações que chegam ao mesmo tempo são agrupadas (micro-batching):
+cada lote vira uma única consulta `WHERE ip_address = ANY(...)` ou um único
+upsert em lote, em vez de uma ida ao banco por requisição.
+"""
+import argparse
+import ipaddress
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .config import HTTP_HOST, HTTP_PORT, HTTP_BATCH_WINDOW_MS, HTTP_MAX_BATCH, HTTP_BATCH_WORKERS
+from .database import DEFAULT_RECORD_TYPE, FAILED_STATUS
+from .ip_extractor import IPExtractor
+from .ip_service import IPService
+from .log import configure_logging
+from . import metrics
+
+_STOP = object()
+_MAX_BODY = 8 * 1024 * 1024
+
+class MicroBatcher:
+    """Agrupa itens enviados por várias threads em lotes para `func`.
+
+    O primeiro item de um lote espera no máximo `window` segundos por outros
+    (ou até juntar `max_batch`). `func(itens)` deve retornar uma lista de
+    resultados na mesma ordem; se levantar uma exceção, ela vai para todos os
+    Futures do lote, e se retornar menos resultados, os que sobraram falham.
+    `workers` threads montam e executam lotes em paralelo. Depois de
+    `close()`, `submit` devolve um Future já com erro.
+    """
+
+    def __init__(self, func, window: float = HTTP_BATCH_WINDOW_MS / 1000,
+                 max_batch: int = HTTP_MAX_BATCH, workers: int = HTTP_BATCH_WORKERS,
+                 name: str = "batcher"):
+        if max_batch < 1 or workers < 1:
+            raise ValueError("max_batch e workers devem ser >= 1")
+        self.func = func
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"items": 0, "batches": 0, "max_batch_seen": 0, "errors": 0}
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        with self._lock:
+            # Sob o lock: nada entra na fila depois do _STOP de close()
+            if not self._closed:
+                self._queue.put((item, future))
+                return future
+        future.set_exception(RuntimeError("MicroBatcher fechado"))
+        return future
+
+    def __call__(self, item, timeout: float | None = None):
+        """Envia um item e espera o resultado dele."""
+        return self.submit(item).result(timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            self._queue.put(_STOP)  # devolve para as outras threads também pararem
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                # Sem esperar: pega o que já está na fila; depois, até o fim da janela
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            try:
+                results = self.func(items)
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                results = list(results)
+                for i, (_, future) in enumerate(batch):
+                    if i < len(results):
+                        future.set_result(results[i])
+                    else:
+                        future.set_exception(RuntimeError(
+                            f"lote retornou {len(results)} resultados para {len(batch)} itens"))
+                if len(results) < len(batch):
+                    with self._lock:
+                        self._stats["errors"] += 1
+            with self._lock:
+                self._stats["items"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+
+    def close(self):
+        with self._lock:
+            already_closed, self._closed = self._closed, True
+            if not already_closed:
+                self._queue.put(_STOP)
+        for t in self._threads:
+            t.join()
+        # Sobras na fila (não deveria haver): ninguém mais vai processá-las
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                entry[1].set_exception(RuntimeError("MicroBatcher fechado"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_batch"] = stats["items"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+class ServiceUnavailable(Exception):
+    """O banco não respondeu ao lote (vira HTTP 503)."""
+
+class IPHTTPApp:
+    """Liga as rotas HTTP ao IPService através de dois MicroBatchers."""
+
+    def __init__(self, service: IPService, window: float = HTTP_BATCH_WINDOW_MS / 1000,
+                 max_batch: int = HTTP_MAX_BATCH, workers: int = HTTP_BATCH_WORKERS):
+        self.service = service
+        self.lookups = MicroBatcher(self._lookup_batch, window, max_batch, workers, name="lookup-batch")
+        self.writes = MicroBatcher(self._write_batch, window, max_batch, workers, name="write-batch")
+
+    def _lookup_batch(self, ips: list[str]) -> list:
+        found = self.service.search_many(ips)
+        if found is None:
+            raise ServiceUnavailable("Falha ao consultar o banco.")
+        return [found.get(ip) for ip in ips]
+
+    def _write_batch(self, rows: list[tuple]) -> list[dict]:
+        # IP repetido no lote: a última gravação vence e todas recebem o resultado dela
+        latest = {}
+        for i, row in enumerate(rows):
+            latest[row[0]] = i
+        winners = sorted(latest.values())
+        report = self.service.register_many([rows[i] for i in winners], chunk_size=len(winners))
+        # Lote que não chegou ao banco volta no relatório como 'failed': é 503, não erro da linha
+        if report is None or any(entry["status"] == FAILED_STATUS for entry in report):
+            raise ServiceUnavailable("Falha ao gravar no banco.")
+        by_ip = {rows[i][0]: entry for i, entry in zip(winners, report)}
+        return [by_ip[row[0]] for row in rows]
+
+    @staticmethod
+    def _parse_row(data) -> tuple:
+        if not isinstance(data, dict):
+            raise ValueError("esperado um objeto JSON")
+        ip = normalize_ip(data.get("ip_address") or data.get("ip") or "")
+        return ip, data.get("mobile_code"), data.get("country"), data.get("record_type") or DEFAULT_RECORD_TYPE
+
+    def row_from_json(self, data) -> tuple:
+        """Converte o corpo de POST /ip em (ip, mobile_code, country, record_type)."""
+        ip, mobile_code, country, record_type = self._parse_row(data)
+        if not country:
+            country = self.service.get_ip_details(ip).get("country")
+        return ip, mobile_code, country, record_type
+
+    def write_many(self, items: list) -> list[dict]:
+        """POST /ip/batch: como POST /ip para cada objeto, com o país consultado em lote.
+
+        As linhas válidas passam pelo mesmo micro-batching de escrita; as
+        inválidas voltam como 'rejected' no relatório, na ordem de entrada.
+        """
+        report, rows = [None] * len(items), {}
+        for i, data in enumerate(items):
+            try:
+                rows[i] = self._parse_row(data)
+            except ValueError:
+                ip = (data.get("ip_address") or data.get("ip")) if isinstance(data, dict) else None
+                reason = "IP inválido" if isinstance(data, dict) else "esperado um objeto JSON"
+                report[i] = {"ip_address": ip, "status": "rejected", "reason": reason}
+        missing = list(dict.fromkeys(row[0] for row in rows.values() if not row[2]))
+        if missing:
+            details = self.service.get_ip_details_many(missing)
+            for i, (ip, mobile_code, country, record_type) in rows.items():
+                if not country:
+                    rows[i] = ip, mobile_code, details.get(ip, {}).get("country"), record_type
+        futures = {i: self.writes.submit(row) for i, row in rows.items()}
+        for i, future in futures.items():
+            report[i] = future.result()
+        return report
+
+    def stats(self) -> dict:
+        stats = {"lookups": self.lookups.stats(), "writes": self.writes.stats()}
+        if hasattr(self.service, "storage_stats"):
+            stats["storage"] = self.service.storage_stats()
+        if hasattr(self.service, "search_cache_stats"):
+            stats["search_cache"] = self.service.search_cache_stats()
+        return stats
+
+    def close(self):
+        self.lookups.close()
+        self.writes.close()
+
+def normalize_ip(value: str) -> str:
+    """Forma canônica do IP (IPv6 comprimido); levanta ValueError se inválido."""
+    return str(ipaddress.ip_address(str(value).strip()))
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+class IPRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: clientes reaproveitam a conexão
+    disable_nagle_algorithm = True  # cabeçalho e corpo saem em escritas separadas
+    server_version = "ip-tracker"
+    app: IPHTTPApp = None  # definido em make_server
+
+    def log_message(self, format, *args):
+        pass  # uma linha por requisição atrapalha em QPS alto
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload, default=_json_default, ensure_ascii=False).encode("utf-8")
+        self._send_body(status, body, "application/json; charset=utf-8")
+
+    def _send_body(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self) -> str:
+        """Rota da requisição para o rótulo das métricas (sem o IP, para não explodir a cardinalidade)."""
+        path = urlsplit(self.path).path
+        if path.startswith("/ip/") and path != "/ip/batch":
+            return "/ip/{ip}"
+        return path if path in ("/ip", "/ip/batch", "/stats", "/metrics") else "other"
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY:
+            raise ValueError("corpo grande demais")
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def do_GET(self):
+        with metrics.timed("http_request_seconds", method="GET", route=self._route()):
+            self._handle_get()
+
+    def do_POST(self):
+        with metrics.timed("http_request_seconds", method="POST", route=self._route()):
+            self._handle_post()
+
+    def _handle_get(self):
+        url = urlsplit(self.path)
+        try:
+            if url.path.startswith("/ip/"):
+                try:
+                    ip = normalize_ip(unquote(url.path[len("/ip/"):]))
+                except ValueError:
+                    return self._send(400, {"error": "IP inválido"})
+                record = self.app.lookups(ip)
+                if record is None:
+                    return self._send(404, {"error": "IP não encontrado", "ip_address": ip})
+                return self._send(200, dict(record))
+            if url.path == "/stats":
+                return self._send(200, self.app.stats())
+            if url.path == "/metrics":
+                if parse_qs(url.query).get("format") == ["json"]:
+                    return self._send(200, metrics.snapshot())
+                return self._send_body(200, metrics.to_prometheus().encode("utf-8"),
+                                       "text/plain; version=0.0.4; charset=utf-8")
+            self._send(404, {"error": "rota inexistente"})
+        except ServiceUnavailable as e:
+            self._send(503, {"error": str(e)})
+
+    def _handle_post(self):
+        try:
+            data = self._read_json()
+        except ValueError as e:
+            return self._send(400, {"error": f"JSON inválido: {e}"})
+        path = urlsplit(self.path).path
+        try:
+            if path == "/ip":
+                try:
+                    row = self.app.row_from_json(data)
+                except ValueError as e:
+                    return self._send(400, {"error": str(e)})
+                entry = self.app.writes(row)
+                status = {"inserted": 201, "updated": 200}.get(entry["status"], 422)
+                return self._send(status, entry)
+            if path == "/ip/batch":
+                if not isinstance(data, list):
+                    return self._send(400, {"error": "esperada uma lista de objetos"})
+                return self._send(200, self.app.write_many(data))
+            self._send(404, {"error": "rota inexistente"})
+        except (TypeError, ValueError, KeyError) as e:
+            self._send(400, {"error": f"linha inválida: {e}"})
+        except ServiceUnavailable as e:
+            self._send(503, {"error": str(e)})
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # o padrão (5) recusa conexões em rajadas de clientes
+
+def make_server(app: IPHTTPApp, host: str = HTTP_HOST, port: int = HTTP_PORT) -> ThreadingHTTPServer:
+    """Cria o servidor (uma thread por conexão) ligado ao `app`."""
+    handler = type("BoundIPRequestHandler", (IPRequestHandler,), {"app": app})
+    return _Server((host, port), handler)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m ip_tracker.http_server",
+                                     description="Serviço HTTP de consulta e registro de IPs.")
+    parser.add_argument("--host", default=HTTP_HOST, help="endereço de escuta (padrão: %(default)s)")
+    parser.add_argument("--port", type=int, default=HTTP_PORT, help="porta (padrão: %(default)s)")
+    parser.add_argument("--window-ms", type=float, default=HTTP_BATCH_WINDOW_MS,
+                        help="janela de agrupamento em ms (padrão: %(default)s)")
+    parser.add_argument("--max-batch", type=int, default=HTTP_MAX_BATCH, help="itens por lote")
+    parser.add_argument("--workers", type=int, default=HTTP_BATCH_WORKERS, help="threads executando lotes")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    metrics.start_metrics_dump()
+    app = IPHTTPApp(IPService(IPExtractor()), window=args.window_ms / 1000,
+                    max_batch=args.max_batch, workers=args.workers)
+    server = make_server(app, args.host, args.port)
+    print(f"Servindo em http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        app.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
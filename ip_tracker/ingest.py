@@ -0,0 +1,271 @@
+# ip_tracker/ingest.py
+"""Ingestão de logs pela linha de comando: extrair → deduplicar → enriquecer → gravar.
+
+Uso:
+    python -m ip_tracker.ingest access.log auth.log
+    zcat logs/*.gz | python -m ip_tracker.ingest --record-type Revisão
+    python -m ip_tracker.ingest --dry-run access.log
+    python -m ip_tracker.ingest --images capturas/ print.png
+"""
+import argparse
+import queue
+import sys
+import threading
+import time
+
+from .config import BULK_CHUNK_SIZE, GEO_BATCH_SIZE
+from .database import DEFAULT_RECORD_TYPE
+from .ip_extractor import IPExtractor, STREAM_CHUNK_SIZE
+from .ip_service import IPService
+from .log import configure_logging
+
+_END = object()  # marca o fim do fluxo em cada fila
+
+class _Progress:
+    """Contadores compartilhados entre os estágios (atualizados sem lock: só somas)."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.bytes = 0
+        self.images = 0
+        self.lines = 0
+        self.ips = 0
+        self.enriched = 0
+        self.statuses = {"inserted": 0, "updated": 0, "rejected": 0, "failed": 0}
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        if self.images:
+            return (f"{self.images} imagens ({self.images / elapsed:,.1f} imagens/s) | {self.ips} IPs únicos | "
+                    f"{self.enriched} enriquecidos | {self.statuses['inserted']} inseridos, "
+                    f"{self.statuses['updated']} atualizados, {self.statuses['rejected']} rejeitados, "
+                    f"{self.statuses['failed']} não gravados")
+        return (f"{self.lines} linhas ({self.lines / elapsed:,.0f} linhas/s, "
+                f"{self.bytes / elapsed / 1_048_576:.1f} MB/s) | {self.ips} IPs únicos | "
+                f"{self.enriched} enriquecidos | {self.statuses['inserted']} inseridos, "
+                f"{self.statuses['updated']} atualizados, {self.statuses['rejected']} rejeitados, "
+                f"{self.statuses['failed']} não gravados")
+
+class IngestPipeline:
+    """Pipeline em três estágios ligados por filas limitadas.
+
+    leitura/extração (com deduplicação) → enriquecimento em lotes → upsert em
+    lotes. As filas limitadas aplicam contrapressão: se o banco ficar lento, a
+    leitura espera em vez de acumular IPs na memória.
+    """
+
+    def __init__(self, service: IPService, mobile_code: str | None = None,
+                 record_type: str = DEFAULT_RECORD_TYPE, batch_size: int = GEO_BATCH_SIZE,
+                 chunk_size: int = BULK_CHUNK_SIZE, queue_size: int = 10_000,
+                 enrich: bool = True, dry_run: bool = False, ipv6: bool = True, images: bool = False):
+        self.service = service
+        self.mobile_code = mobile_code
+        self.record_type = record_type
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.enrich = enrich
+        self.dry_run = dry_run
+        self.ipv6 = ipv6
+        self.images = images
+        self.progress = _Progress()
+        self._ips = queue.Queue(maxsize=queue_size)
+        self._rows = queue.Queue(maxsize=queue_size)
+        self._errors = []
+        self._failed = threading.Event()
+
+    # --- Estágio 1: leitura e extração ---
+
+    def _chunks(self, inputs):
+        for name in inputs:
+            if name == "-":
+                yield from self._count(iter(lambda: sys.stdin.buffer.read(STREAM_CHUNK_SIZE), b""))
+            else:
+                with open(name, "rb") as f:
+                    yield from self._count(iter(lambda: f.read(STREAM_CHUNK_SIZE), b""))
+            yield b"\n"  # separa arquivos: um IP não pode "atravessar" de um para outro
+
+    def _count(self, chunks):
+        for chunk in chunks:
+            if self._failed.is_set():
+                return
+            self.progress.bytes += len(chunk)
+            self.progress.lines += chunk.count(b"\n")
+            yield chunk
+
+    def _image_ips(self, inputs):
+        """IPs de todas as imagens (arquivos ou pastas), sem repetição."""
+        seen = set()
+        for _, candidates in self.service.extractor.extract_all_from_images(inputs, ipv6=self.ipv6):
+            if self._failed.is_set():
+                return
+            self.progress.images += 1
+            for candidate in candidates:
+                if candidate["ip"] not in seen:
+                    seen.add(candidate["ip"])
+                    yield candidate["ip"]
+
+    def _read(self, inputs):
+        try:
+            if self.images:
+                ips = self._image_ips(inputs)
+            else:
+                ips = self.service.extractor.extract_all(self._chunks(inputs), ipv6=self.ipv6)
+            for ip in ips:
+                self.progress.ips += 1
+                self._put(self._ips, ip)
+        finally:
+            self._put(self._ips, _END, force=True)
+
+    # --- Estágio 2: enriquecimento ---
+
+    def _enrich_stage(self):
+        try:
+            done = False
+            while not done:
+                batch, done = self._collect(self._ips, self.batch_size)
+                if not batch:
+                    continue
+                infos = self.service.get_ip_details_many(batch) if self.enrich else {}
+                for ip in batch:
+                    country = infos.get(ip, {}).get("country")
+                    if country:
+                        self.progress.enriched += 1
+                    self._put(self._rows, (ip, self.mobile_code, country, self.record_type))
+        finally:
+            self._put(self._rows, _END, force=True)
+
+    # --- Estágio 3: gravação ---
+
+    def _write_stage(self):
+        done = False
+        while not done:
+            rows, done = self._collect(self._rows, self.chunk_size)
+            if rows:
+                self._flush(rows)
+
+    def _flush(self, rows):
+        if self.dry_run:
+            return
+        report = self.service.register_many(rows, chunk_size=self.chunk_size)
+        if report is None:
+            self.progress.statuses["failed"] += len(rows)
+            return
+        for entry in report:
+            self.progress.statuses[entry["status"]] += 1
+
+    # --- Orquestração ---
+
+    def _collect(self, q, max_items: int, linger: float = 0.25):
+        """Junta até `max_items` itens da fila.
+
+        Espera o primeiro item sem limite e os seguintes por até `linger`
+        segundos, para não segurar um lote parcial quando a entrada está lenta.
+        Retorna (itens, terminou).
+        """
+        items = []
+        while len(items) < max_items:
+            try:
+                item = q.get(timeout=linger if items else 0.5)
+            except queue.Empty:
+                if items:
+                    return items, False
+                if self._failed.is_set():
+                    return items, True
+                continue
+            if item is _END:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _put(self, q, item, force: bool = False):
+        """Coloca na fila, desistindo se outro estágio falhou (evita deadlock)."""
+        while True:
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if self._failed.is_set():
+                    if force:
+                        return  # quem consome também vê a falha e encerra
+                    raise RuntimeError("Pipeline interrompido por erro em outro estágio.")
+
+    def _guard(self, target, *args):
+        def run():
+            try:
+                target(*args)
+            except Exception as e:
+                self._errors.append(e)
+                self._failed.set()
+        return threading.Thread(target=run, daemon=True)
+
+    def run(self, inputs, progress_interval: float = 2.0, out=sys.stderr) -> _Progress:
+        """Executa o pipeline até o fim das entradas e retorna os contadores."""
+        threads = [self._guard(self._read, inputs), self._guard(self._enrich_stage)]
+        for t in threads:
+            t.start()
+
+        writer = self._guard(self._write_stage)
+        writer.start()
+        while writer.is_alive():
+            writer.join(progress_interval or None)
+            if progress_interval and writer.is_alive():
+                print(self.progress.line(), file=out, flush=True)
+        for t in threads:
+            t.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return self.progress
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m ip_tracker.ingest",
+        description="Extrai IPs de arquivos de log (ou stdin), enriquece com o país e grava em registered_ips.",
+    )
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="arquivos de log ('-' = stdin, padrão); com --images, imagens ou pastas")
+    parser.add_argument("--mobile-code", default=None, help="código mobile gravado em todos os IPs")
+    parser.add_argument("--record-type", default=DEFAULT_RECORD_TYPE, help="tipo do registro (padrão: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=GEO_BATCH_SIZE, help="IPs por consulta de geolocalização")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="linhas por upsert no banco")
+    parser.add_argument("--queue-size", type=int, default=10_000, help="capacidade das filas entre os estágios")
+    parser.add_argument("--no-enrich", action="store_true", help="não consulta o país (grava country vazio)")
+    parser.add_argument("--no-ipv6", action="store_true", help="extrai apenas IPv4")
+    parser.add_argument("--images", action="store_true",
+                        help="as entradas são capturas de tela: todos os IPs de cada imagem via OCR")
+    parser.add_argument("--dry-run", action="store_true", help="executa tudo menos a gravação no banco")
+    parser.add_argument("--progress-interval", type=float, default=2.0,
+                        help="segundos entre relatórios de progresso (0 desativa)")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    pipeline = IngestPipeline(
+        IPService(IPExtractor()),
+        mobile_code=args.mobile_code,
+        record_type=args.record_type,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        queue_size=args.queue_size,
+        enrich=not args.no_enrich,
+        dry_run=args.dry_run,
+        ipv6=not args.no_ipv6,
+        images=args.images,
+    )
+    try:
+        progress = pipeline.run(args.inputs, progress_interval=args.progress_interval)
+    except (OSError, RuntimeError, ImportError) as e:
+        print(f"Erro na ingestão: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("\nIngestão interrompida.", file=sys.stderr)
+        return 130
+    print(progress.line(), file=sys.stderr)
+    if args.dry_run:
+        print("(dry-run: nada foi gravado no banco)", file=sys.stderr)
+    not_written = progress.statuses["rejected"] + progress.statuses["failed"]
+    return 1 if not_written and not args.dry_run else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
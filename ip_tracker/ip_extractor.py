@@ -1,41 +1,512 @@
 # ip_tracker/ip_extractor.py
+from __future__ import annotations
+
+import functools
+import ipaddress
+import math
+import logging
+import os
 import re
-import pytesseract
-from PIL import Image
+import shlex
+import threading
+import time
+from concurrent.futures import Future
+from .config import OCR_PREPROCESS, OCR_TESSERACT_CONFIG, OCR_FALLBACK_FULL, OCR_PROXIMITY_WEIGHT, \
+    OCR_BATCH_SIZE
+from .lazy import lazy_import
+from .ocr_preprocess import preprocess_for_ocr, preprocess_with_transform, TARGET_LINE_HEIGHT
+from .ocr_executor import OCRExecutor
+from .ocr_cache import OCRCache, image_key, MISSING
+from . import metrics
+
+# OCR só carrega na primeira imagem: extração de texto/logs não precisa deles
+pytesseract = lazy_import("pytesseract", extra="ocr")
+Image = lazy_import("PIL.Image", extra="ocr")
+
+logger = logging.getLogger(__name__)
+
+@functools.cache
+def _tesserocr():
+    """O módulo tesserocr, ou None se não estiver instalado.
+
+    Opcional: mantém o Tesseract carregado em cada worker, sem abrir um
+    processo novo por imagem como o pytesseract faz.
+    """
+    try:
+        import tesserocr
+    except ImportError:
+        return None
+    return tesserocr
+
+def _ocr_engine() -> str:
+    return "tesserocr" if _tesserocr() is not None else "pytesseract"
+
+# --- Padrões (compilados uma única vez) ---
+
+# Octeto válido: 0-255, sem aceitar coisas como 999.1.1.1
+_OCTET = r'(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])'
+_IPV4_BODY = rf'{_OCTET}(?:\.{_OCTET}){{3}}'
+# Não pode estar colado a letras/dígitos, nem fazer parte de algo como 1.2.3.4.5
+IPV4_PATTERN = re.compile(rf'(?<![\w.]){_IPV4_BODY}(?!\w|\.\d)')
+_IPV4_FULL = re.compile(_IPV4_BODY.encode())
+
+# Varredura em streaming: primeiro acha "tokens candidatos" (sequências de
+# dígitos hexadecimais, pontos e dois-pontos delimitadas por não-palavras),
+# que o motor de regex encontra muito rápido com findall; depois valida cada
+# token distinto uma única vez. Tokens com menos de 7 caracteres (ex.: '::1')
+# são ignorados. Um token pode começar logo após ':' ('addr:10.0.0.1'),
+# como em IPV4_PATTERN; o findall pega o token mais à esquerda, então um
+# IPv6 ('fe80::1') continua inteiro.
+_CANDIDATE = re.compile(rb'[^\w.]([0-9A-Fa-f:][0-9A-Fa-f:.]{6,})(?!\w)')
+
+# Bytes que podem aparecer dentro de um token; um pedaço só é cortado fora deles
+_TOKEN_CHARS = frozenset(b'0123456789abcdefABCDEF.:')
+# Tokens maiores que isso não podem ser IPs (IPv6 com IPv4 embutido tem até 45)
+_MAX_CARRY = 64
+# Limite do memo de validação (timestamps únicos poderiam fazê-lo crescer sem fim)
+_MEMO_LIMIT = 100_000
+STREAM_CHUNK_SIZE = 1 << 20  # 1 MiB
 
 # --- Funções Base de Extração ---
 
 def find_ip_in_text(text: str) -> str | None:
-    """Procura por um endereço IP em uma string de texto."""
+    """Procura por um endereço IPv4 válido em uma string de texto."""
     if not text:
         return None
-    ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-    found_ips = re.findall(ip_pattern, text)
-    if found_ips:
-        return found_ips[0]
+    match = IPV4_PATTERN.search(text)
+    return match.group(0) if match else None
+
+def _iter_chunks(source, chunk_size: int):
+    """Normaliza a fonte em um iterador de pedaços de bytes.
+
+    Aceita um caminho de arquivo, um objeto com `.read()` (binário ou texto)
+    ou um iterável de pedaços (bytes ou str).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            yield from iter(lambda: f.read(chunk_size), b'')
+        return
+    if isinstance(source, (bytes, bytearray)):
+        yield bytes(source)
+        return
+    if hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(chunk_size), source.read(0))
+    else:
+        chunks = source
+    for chunk in chunks:
+        yield chunk.encode('utf-8', 'ignore') if isinstance(chunk, str) else chunk
+
+def _split_safe(buffer: bytes) -> int:
+    """Retorna a posição após o último byte que não pode fazer parte de um token."""
+    for i in range(len(buffer) - 1, max(len(buffer) - _MAX_CARRY, 0) - 1, -1):
+        if buffer[i] not in _TOKEN_CHARS:
+            return i + 1
+    # O final inteiro parece um token em formação; guarda só o que ainda pode sê-lo
+    return max(len(buffer) - _MAX_CARRY, 0)
+
+def _validate_token(token: bytes, ipv6: bool) -> str | None:
+    """Converte um token candidato em um IP válido (ou None)."""
+    token = token.rstrip(b'.')  # ponto final de frase
+    if b':' not in token:
+        return token.decode('ascii') if _IPV4_FULL.fullmatch(token) else None
+    if ipv6 and any(c not in b':.' for c in token):
+        try:
+            return str(ipaddress.IPv6Address(token.decode('ascii')))
+        except ValueError:
+            pass
+    # IPv4 com porta (10.0.0.1:8080) ou seguido de dois-pontos ("host 10.0.0.1: up")
+    host, sep, port = token.partition(b':')
+    if sep and (not port or port.isdigit()) and _IPV4_FULL.fullmatch(host):
+        return host.decode('ascii')
     return None
 
-def ocr_image_to_ip(image: Image.Image) -> str | None:
-    """Executa OCR em um objeto de imagem e procura por um IP."""
+def iter_ips(source, dedupe: bool = True, ipv6: bool = True, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Percorre `source` em pedaços e gera os IPs válidos encontrados.
+
+    A memória usada é constante (um pedaço por vez, mais o conjunto de IPs já
+    vistos quando `dedupe=True`). IPs partidos entre dois pedaços são
+    reconstituídos. IPv6 é devolvido na forma comprimida.
+    """
+    memo = {}
+    seen = set()
+    # O byte inicial faz o papel de "início de texto" para o delimitador do padrão
+    carry = b'\n'
+    for chunk in _iter_chunks(source, chunk_size):
+        if not chunk:
+            continue
+        buffer = carry + chunk
+        cut = _split_safe(buffer)
+        yield from _scan(buffer, cut, ipv6, dedupe, memo, seen)
+        # O resto segue para o próximo pedaço, com um byte de contexto (o delimitador)
+        carry = buffer[max(cut - 1, 0):]
+    if len(carry) > 1:
+        yield from _scan(carry + b'\n', len(carry) + 1, ipv6, dedupe, memo, seen)
+
+def _scan(buffer: bytes, end: int, ipv6: bool, dedupe: bool, memo: dict, seen: set):
+    if len(memo) > _MEMO_LIMIT:
+        memo.clear()
+    for token in _CANDIDATE.findall(buffer, 0, end):
+        if dedupe and token in seen:
+            continue
+        ip = memo.get(token, token)
+        if ip is token:
+            ip = memo[token] = _validate_token(token, ipv6)
+        if ip is None:
+            continue
+        if dedupe:
+            # Guarda o token (barato de comparar) e o IP normalizado
+            seen.add(token)
+            if ip in seen:
+                continue
+            seen.add(ip)
+        yield ip
+
+# --- Execução do Tesseract ---
+
+_tess_local = threading.local()
+
+def _parse_tesseract_config(config: str) -> tuple[int | None, dict]:
+    """Converte '--psm N -c chave=valor' no par (psm, variáveis)."""
+    psm, variables = None, {}
+    args = shlex.split(config or '')
+    for i, arg in enumerate(args):
+        if arg == '--psm' and i + 1 < len(args):
+            psm = int(args[i + 1])
+        elif arg == '-c' and i + 1 < len(args) and '=' in args[i + 1]:
+            name, value = args[i + 1].split('=', 1)
+            variables[name] = value
+    return psm, variables
+
+def _tess_api(tesserocr, config: str):
+    """A API do tesserocr da thread atual, configurada com `config`."""
+    api = getattr(_tess_local, 'api', None)
+    if api is None:
+        api = _tess_local.api = tesserocr.PyTessBaseAPI(lang='eng')
+    psm, variables = _parse_tesseract_config(config)
+    api.SetPageSegMode(psm if psm is not None else tesserocr.PSM.AUTO)
+    # A API é reutilizada: zera a whitelist de chamadas anteriores
+    api.SetVariable('tessedit_char_whitelist', variables.pop('tessedit_char_whitelist', ''))
+    for name, value in variables.items():
+        api.SetVariable(name, value)
+    return api
+
+def _image_to_string(image: Image.Image, config: str = '') -> str:
+    """OCR de uma imagem, via tesserocr (se instalado) ou pytesseract."""
+    tesserocr = _tesserocr()
+    if tesserocr is None:
+        return pytesseract.image_to_string(image, lang='eng', config=config)
+    api = _tess_api(tesserocr, config)
+    api.SetImage(image)
+    return api.GetUTF8Text()
+
+def _image_to_words(image: Image.Image, config: str = '') -> list[tuple[str, float, tuple]]:
+    """Palavras reconhecidas: (texto, confiança 0-100, (esq, topo, dir, base))."""
+    tesserocr = _tesserocr()
+    words = []
+    if tesserocr is None:
+        data = pytesseract.image_to_data(image, lang='eng', config=config, output_type=pytesseract.Output.DICT)
+        for text, conf, left, top, width, height in zip(
+                data['text'], data['conf'], data['left'], data['top'], data['width'], data['height']):
+            text = str(text).strip()
+            # Linhas de bloco/parágrafo/linha vêm com texto vazio e confiança -1
+            if text and float(conf) >= 0:
+                words.append((text, float(conf), (left, top, left + width, top + height)))
+        return words
+    api = _tess_api(tesserocr, config)
+    api.SetImage(image)
+    api.Recognize()
+    iterator = api.GetIterator()
+    if iterator is None:
+        return words  # nada reconhecido
+    level = tesserocr.RIL.WORD
+    for item in tesserocr.iterate_level(iterator, level):
+        text = (item.GetUTF8Text(level) or '').strip()
+        box = item.BoundingBox(level)
+        if text and box is not None:
+            words.append((text, float(item.Confidence(level)), tuple(box)))
+    return words
+
+def warmup_tesseract():
+    """Prepara o worker atual (carrega o modelo ou resolve o binário do Tesseract)."""
+    if _tesserocr() is not None:
+        _image_to_string(Image.new('L', (32, 32), 255))
+    else:
+        pytesseract.get_tesseract_version()
+
+@metrics.timed("ocr_image_seconds")
+def ocr_image_to_ip(image: Image.Image, preprocess: bool = OCR_PREPROCESS) -> str | None:
+    """Executa OCR em um objeto de imagem e procura por um IP.
+
+    Com `preprocess`, o Tesseract recebe só a região de texto já binarizada e
+    em escala adequada, restrito a dígitos e pontos; se nada for achado (e
+    OCR_FALLBACK_FULL estiver ativo), tenta de novo com a imagem original.
+    """
     try:
-        text = pytesseract.image_to_string(image, lang='eng')
-        print(f"Texto extraído do OCR: {text}")
+        if preprocess:
+            with metrics.timed("ocr_preprocess_seconds"):
+                prepared = preprocess_for_ocr(image)
+            with metrics.timed("ocr_tesseract_seconds", engine=_ocr_engine(), stage="prepared"):
+                text = _image_to_string(prepared, config=OCR_TESSERACT_CONFIG)
+            ip = find_ip_in_text(text)
+            if ip or not OCR_FALLBACK_FULL:
+                return ip
+            metrics.inc("ocr_fallback_total")
+        with metrics.timed("ocr_tesseract_seconds", engine=_ocr_engine(), stage="full"):
+            text = _image_to_string(image)
+        logger.debug("OCR da imagem completa", extra={"chars": len(text)})
         return find_ip_in_text(text)
     except Exception as e:
-        print(f"Erro durante o OCR: {e}")
+        logger.error("Erro durante o OCR", extra={"error": str(e)})
         # Propaga o erro para a thread principal tratar
-        raise e 
+        raise e
+
+# --- Vários IPs por imagem ---
+
+# Empilhamento no modo em lote: o Tesseract recusa imagens com mais de 32767 px
+_COMPOSITE_MAX_SIDE = 30_000
+_COMPOSITE_GAP = 2 * TARGET_LINE_HEIGHT
+# Pontuação usada só para tirar IPs de dentro de palavras ('IP:10.0.0.1,')
+_WORD_PUNCTUATION = ' \t,;()[]{}<>"\'|'
+
+def _ips_in_word(text: str, ipv6: bool) -> list[str]:
+    found = IPV4_PATTERN.findall(text)
+    if not found and ipv6 and ':' in text:
+        ip = _validate_token(text.strip(_WORD_PUNCTUATION).encode('ascii', 'ignore'), ipv6=True)
+        if ip is not None:
+            found.append(ip)
+    return found
+
+def _words_to_candidates(words, transform=(0, 0, 1.0), ipv6: bool = True) -> list[dict]:
+    """Um candidato por IP achado nas palavras, com a caixa já em coordenadas da imagem original."""
+    offset_x, offset_y, scale = transform
+    candidates = []
+    for text, conf, (left, top, right, bottom) in words:
+        for ip in _ips_in_word(text, ipv6):
+            candidates.append({
+                "ip": ip,
+                "confidence": round(conf, 1),
+                "box": (round(offset_x + left / scale), round(offset_y + top / scale),
+                        round(offset_x + right / scale), round(offset_y + bottom / scale)),
+            })
+    return candidates
+
+def rank_candidates(candidates: list[dict], size: tuple[int, int], cursor: tuple[int, int] | None = None,
+                    proximity_weight: float = OCR_PROXIMITY_WEIGHT) -> list[dict]:
+    """Ordena os candidatos do mais para o menos provável, um por IP.
+
+    score = confiança (0-1) × (1 − peso × distância), com a distância do
+    centro da caixa até `cursor` (ou o centro da imagem) dividida pela
+    diagonal. Um IP que aparece várias vezes fica com a melhor ocorrência e
+    o total em `occurrences`.
+    """
+    width, height = size
+    anchor_x, anchor_y = cursor if cursor is not None else (width / 2, height / 2)
+    diagonal = math.hypot(width, height) or 1.0
+    best = {}
+    for candidate in candidates:
+        left, top, right, bottom = candidate["box"]
+        distance = math.hypot((left + right) / 2 - anchor_x, (top + bottom) / 2 - anchor_y) / diagonal
+        scored = dict(candidate, score=round(candidate["confidence"] / 100 * (1 - proximity_weight * min(distance, 1.0)), 4))
+        current = best.get(candidate["ip"])
+        occurrences = current["occurrences"] + 1 if current else 1
+        if current is None or scored["score"] > current["score"]:
+            current = scored
+        current["occurrences"] = occurrences
+        best[candidate["ip"]] = current
+    return sorted(best.values(), key=lambda c: (c["score"], c["confidence"]), reverse=True)
+
+@metrics.timed("ocr_candidates_seconds")
+def ocr_image_to_candidates(image: Image.Image, cursor: tuple[int, int] | None = None,
+                            preprocess: bool = OCR_PREPROCESS, ipv6: bool = True) -> list[dict]:
+    """Todos os IPs da imagem, do mais provável para o menos provável.
+
+    Usa os dados por palavra do Tesseract (image_to_data): cada candidato é
+    {'ip', 'confidence' (0-100), 'box' (esq, topo, dir, base na imagem
+    original), 'score', 'occurrences'}. Ver rank_candidates para a ordem.
+    A passada na imagem preparada só lê dígitos e pontos; IPv6 aparece na
+    passada da imagem inteira (OCR_FALLBACK_FULL), feita quando a primeira
+    não acha nada.
+    """
+    if preprocess:
+        with metrics.timed("ocr_preprocess_seconds"):
+            prepared, transform = preprocess_with_transform(image)
+        with metrics.timed("ocr_tesseract_seconds", engine=_ocr_engine(), stage="prepared_words"):
+            words = _image_to_words(prepared, config=OCR_TESSERACT_CONFIG)
+        candidates = _words_to_candidates(words, transform, ipv6)
+        if candidates or not OCR_FALLBACK_FULL:
+            return rank_candidates(candidates, image.size, cursor)
+        metrics.inc("ocr_fallback_total")
+    with metrics.timed("ocr_tesseract_seconds", engine=_ocr_engine(), stage="full_words"):
+        words = _image_to_words(image)
+    return rank_candidates(_words_to_candidates(words, ipv6=ipv6), image.size, cursor)
+
+def _composite_groups(sizes: list[tuple[int, int]]) -> list[list[int]]:
+    """Divide as imagens (pelos tamanhos) em grupos que cabem numa imagem composta."""
+    groups, current, height = [], [], 0
+    for index, (width, h) in enumerate(sizes):
+        extra = h + (_COMPOSITE_GAP if current else 0)
+        if current and height + extra > _COMPOSITE_MAX_SIDE:
+            groups.append(current)
+            current, height, extra = [], 0, h
+        current.append(index)
+        height += extra
+    if current:
+        groups.append(current)
+    return groups
+
+def _compose(images: list) -> tuple[Image.Image, list[int]]:
+    """Empilha as imagens (preparadas, modo 'L') com um espaço em branco entre elas.
+
+    Retorna a imagem composta e o topo de cada uma dentro dela.
+    """
+    width = min(max(image.width for image in images), _COMPOSITE_MAX_SIDE)
+    height = sum(image.height for image in images) + _COMPOSITE_GAP * (len(images) - 1)
+    composite = Image.new('L', (width, height), 255)
+    tops, y = [], 0
+    for image in images:
+        composite.paste(image, (0, y))
+        tops.append(y)
+        y += image.height + _COMPOSITE_GAP
+    return composite, tops
+
+@metrics.timed("ocr_batch_seconds")
+def ocr_images_to_candidates(images, cursor: tuple[int, int] | None = None,
+                             preprocess: bool = OCR_PREPROCESS, ipv6: bool = True) -> list[list[dict]]:
+    """ocr_image_to_candidates para várias imagens, na mesma ordem.
+
+    Com o pytesseract (um processo do Tesseract por chamada), as imagens
+    preparadas são empilhadas numa imagem composta e lidas numa única
+    chamada, e as palavras voltam para a imagem de origem pela posição.
+    Com o tesserocr, que já mantém o modelo carregado, cada imagem é lida
+    separadamente.
+    """
+    images = list(images)
+    if not preprocess or _tesserocr() is not None:
+        return [ocr_image_to_candidates(image, cursor, preprocess, ipv6) for image in images]
+
+    with metrics.timed("ocr_preprocess_seconds"):
+        prepared = [preprocess_with_transform(image) for image in images]
+    results = [[] for _ in images]
+    for group in _composite_groups([p.size for p, _ in prepared]):
+        composite, tops = _compose([prepared[i][0] for i in group])
+        with metrics.timed("ocr_tesseract_seconds", engine="pytesseract", stage="composite"):
+            words = _image_to_words(composite, config=OCR_TESSERACT_CONFIG)
+        per_image = {i: [] for i in group}
+        for text, conf, (left, top, right, bottom) in words:
+            center = (top + bottom) / 2
+            for i, image_top in zip(group, tops):
+                if image_top <= center < image_top + prepared[i][0].height:
+                    per_image[i].append((text, conf, (left, top - image_top, right, bottom - image_top)))
+                    break
+        for i, image_words in per_image.items():
+            results[i] = rank_candidates(_words_to_candidates(image_words, prepared[i][1], ipv6),
+                                         images[i].size, cursor)
+    for i, image in enumerate(images):
+        if not results[i] and OCR_FALLBACK_FULL:
+            metrics.inc("ocr_fallback_total")
+            with metrics.timed("ocr_tesseract_seconds", engine="pytesseract", stage="full_words"):
+                words = _image_to_words(image)
+            results[i] = rank_candidates(_words_to_candidates(words, ipv6=ipv6), image.size, cursor)
+    return results
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+
+def _image_paths(paths):
+    """Os arquivos informados e as imagens (por extensão) das pastas, em ordem alfabética."""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(path, name)
+        else:
+            yield path
 
 # --- Classe 'Wrapper' ---
 
 class IPExtractor:
     """Abstrai a extração de IPs de texto ou imagem."""
-    
+
+    def __init__(self, ocr_cache: OCRCache | None = None):
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.ocr_cache = ocr_cache if ocr_cache is not None else OCRCache()
+
     def extract_from_text(self, text: str) -> str | None:
         """Extrai IP de uma string de texto."""
         return find_ip_in_text(text)
 
-    def extract_from_image(self, image: Image.Image) -> str | None:
-        """Extrai IP de um objeto de Imagem (PIL)."""
+    def extract_all(self, source, dedupe: bool = True, ipv6: bool = True):
+        """Gera todos os IPs de um arquivo, stream ou iterável de pedaços."""
+        return iter_ips(source, dedupe=dedupe, ipv6=ipv6)
+
+    def extract_from_image(self, image: Image.Image, cache_key: str | None = None) -> str | None:
+        """Extrai IP de um objeto de Imagem (PIL), reaproveitando resultados de imagens idênticas."""
         # Agora este método espera um objeto de imagem
-        return ocr_image_to_ip(image)
\ No newline at end of file
+        if cache_key is None:
+            cache_key = image_key(image)
+            cached = self.ocr_cache.get(cache_key)
+            if cached is not MISSING:
+                return cached
+        start = time.perf_counter()
+        ip = ocr_image_to_ip(image)
+        self.ocr_cache.put(cache_key, ip, time.perf_counter() - start)
+        return ip
+
+    def extract_candidates_from_image(self, image: Image.Image, cursor: tuple[int, int] | None = None) -> list[dict]:
+        """Todos os IPs da imagem, ordenados (ver ocr_image_to_candidates)."""
+        return ocr_image_to_candidates(image, cursor)
+
+    def extract_candidates_from_images(self, images, cursor: tuple[int, int] | None = None) -> list[list[dict]]:
+        """Candidatos de várias imagens com uma chamada ao Tesseract por lote (ver ocr_images_to_candidates)."""
+        return ocr_images_to_candidates(images, cursor)
+
+    def extract_all_from_images(self, paths, batch_size: int = OCR_BATCH_SIZE, ipv6: bool = True):
+        """Gera (caminho, candidatos) para arquivos de imagem ou pastas com imagens.
+
+        As imagens são abertas e lidas `batch_size` por vez, para a memória
+        não crescer com o número de arquivos.
+        """
+        batch = []
+        for path in _image_paths(paths):
+            batch.append(path)
+            if len(batch) >= batch_size:
+                yield from self._candidates_for_paths(batch, ipv6)
+                batch = []
+        if batch:
+            yield from self._candidates_for_paths(batch, ipv6)
+
+    @staticmethod
+    def _candidates_for_paths(paths, ipv6):
+        images = []
+        for path in paths:
+            with Image.open(path) as image:
+                image.load()
+                images.append(image)
+        yield from zip(paths, ocr_images_to_candidates(images, ipv6=ipv6))
+
+    def extract_from_image_async(self, image: Image.Image, key=None) -> Future:
+        """Agenda o OCR no pool de workers e retorna um Future com o IP (ou None).
+
+        Pedidos com a mesma `key` (ex.: 'main', 'dialog') substituem os
+        anteriores; o Future substituído termina com CancelledError.
+        """
+        # Colagem repetida: responde na hora, sem esperar a fila, mas ainda
+        # substituindo o pedido anterior da mesma `key`
+        cache_key = image_key(image)
+        cached = self.ocr_cache.get(cache_key)
+        if cached is not MISSING:
+            return self.start_ocr_pool().completed(cached, key=key)
+        return self.start_ocr_pool().submit(image, key=key, cache_key=cache_key)
+
+    def start_ocr_pool(self) -> OCRExecutor:
+        """Cria (uma vez) e aquece o pool de workers de OCR."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = OCRExecutor(self.extract_from_image, warmup=warmup_tesseract)
+        return self._executor
+
+    def shutdown(self):
+        """Encerra o pool de OCR (se tiver sido criado)."""
+        if self._executor is not None:
+            self._executor.shutdown()
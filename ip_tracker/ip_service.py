@@ -1,8 +1,19 @@
 # ip_tracker/ip_service.py
-import tkinter as tk
-from .database import register_ip_in_db, search_ip_in_db, DatabaseError
+import logging
+
+from .database import DatabaseError
+from .config import BULK_CHUNK_SIZE, LIST_PAGE_SIZE, GEO_PREFETCH
+from .export import export_ips
 from .utils import get_ip_info
+from .geo_batch import BatchGeoLookup
+from .geo_cache import create_geo_cache, lookup_cached, lookup_many_cached, is_failed_lookup
+from .geo_local import load_local_geoip
+from .geo_prefetch import GeoPrefetcher
 from .ip_extractor import IPExtractor
+from .record_cache import RecordCache, start_record_cache_listener
+from .storage import create_storage
+
+logger = logging.getLogger(__name__)
 
 # --- Constantes de Mensagens ---
 # (As constantes de OCR foram movidas para app_gui.py)
@@ -16,31 +27,194 @@ SEARCH_IP_PROMPT = "Digite o endereço IP para buscar:"
 class IPService:
     """Encapsula a lógica de negócios para registro e busca de IPs."""
 
-    def __init__(self, extractor: IPExtractor):
+    def __init__(self, extractor: IPExtractor, geo_cache=None, local_geo=None, record_cache=None,
+                 write_behind=None, storage=None, geo_batch=None):
         self.extractor = extractor
+        # Onde os registros ficam (storage.StorageBackend); padrão: STORAGE_BACKEND do config
+        self.storage = storage if storage is not None else create_storage()
+        self.geo_cache = geo_cache if geo_cache is not None else create_geo_cache()
+        # Base GeoIP offline (GEO_PROVIDER='local'); None = só a API
+        self.local_geo = local_geo if local_geo is not None else load_local_geoip()
+        # Uma só para todas as chamadas: o limite de taxa (X-Rl/X-Ttl) e o máximo
+        # de requisições em voo valem para o processo, não para cada lote
+        self.geo_batch = geo_batch if geo_batch is not None else BatchGeoLookup()
+        # Cache das buscas no banco, invalidado pelas gravações (e por NOTIFY, se configurado)
+        self.record_cache = record_cache if record_cache is not None else RecordCache()
+        # LISTEN/NOTIFY só existe no PostgreSQL; no SQLite só este processo grava no cache
+        self.record_cache_listener = (start_record_cache_listener(self.record_cache)
+                                      if self.storage.name == "postgres" else None)
+        # Fila com diário local (write_behind.WriteBehindQueue); None = grava direto no banco
+        self.write_behind = write_behind
+        # Consulta do país iniciada antes do clique em Registrar; None = só no registro
+        self.geo_prefetch = GeoPrefetcher(self.get_ip_details) if GEO_PREFETCH else None
 
     def get_ip_details(self, ip: str) -> dict:
-        """Busca detalhes do IP na API externa."""
-        return get_ip_info(ip)
+        """Busca detalhes do IP na base local (se houver) ou na API externa (passando pelo cache)."""
+        if self.local_geo is not None:
+            info = self.local_geo.lookup(ip)
+            if not is_failed_lookup(info):
+                return info
+        return lookup_cached(self.geo_cache, ip, get_ip_info)
+
+    def prefetch_ip_details(self, ip: str, debounce: bool = True) -> bool:
+        """Começa a consultar o país de `ip` em segundo plano (ver geo_prefetch.py).
+
+        `debounce=False` para IPs que chegam inteiros (colados, OCR): a
+        consulta começa na hora. Texto que não é um IP válido cancela a
+        consulta anterior. Retorna se uma consulta ficou agendada.
+        """
+        if self.geo_prefetch is None:
+            return False
+        return self.geo_prefetch.schedule(ip, delay=None if debounce else 0)
+
+    def get_ip_details_many(self, ips) -> dict[str, dict]:
+        """Busca detalhes de vários IPs (base local, depois API em lote com cache)."""
+        results = {}
+        remaining = ips
+        if self.local_geo is not None:
+            remaining = []
+            for ip in ips:
+                info = self.local_geo.lookup(ip)
+                if is_failed_lookup(info):
+                    remaining.append(ip)
+                else:
+                    results[ip] = info
+        results.update(lookup_many_cached(self.geo_cache, remaining, self.geo_batch.lookup))
+        return results
 
     def register_ip(self, ip: str, mobile_code: str, country: str, record_type: str) -> bool:
-        """Tenta registrar um IP no banco. Retorna True/False."""
+        """Tenta registrar um IP no banco. Retorna True/False.
+
+        Com a fila write-behind, True significa gravado no diário local; o
+        envio ao banco acontece em segundo plano.
+        """
+        ip = ip.strip() if isinstance(ip, str) else ip
+        if self.write_behind is not None:
+            try:
+                self.write_behind.enqueue(ip, mobile_code, country, record_type)
+                return True
+            except ValueError as e:
+                logger.warning("Registro rejeitado", extra={"ip": ip, "error": str(e)})
+                return False
+            except (RuntimeError, OSError) as e:
+                logger.warning("Fila de registros indisponível; gravando direto no banco", extra={"error": str(e)})
         try:
-            success = register_ip_in_db(ip, mobile_code, country, record_type)
+            success = self.storage.register_ip(ip, mobile_code, country, record_type)
             return success
         except DatabaseError as e:
-            print(f"Erro ao registrar IP no serviço: {e}")
+            logger.error("Erro ao registrar IP no serviço", extra={"error": str(e)})
             return False
+        finally:
+            # Mesmo em erro: a gravação pode ter sido aplicada antes da falha
+            self.record_cache.invalidate([ip] if ip else [])
+
+    def register_many(self, rows, chunk_size: int = BULK_CHUNK_SIZE) -> list[dict] | None:
+        """Registra vários IPs em lote (um upsert por lote, numa transação).
+
+        `rows` são dicts ou tuplas (ip, mobile_code, country, record_type).
+        Retorna o relatório por linha de `register_ips_in_db` ou None em erro.
+        """
+        try:
+            report = self.storage.register_ips(rows, chunk_size=chunk_size)
+        except DatabaseError as e:
+            logger.error("Erro ao registrar IPs em lote no serviço", extra={"error": str(e)})
+            self.record_cache.clear()
+            return None
+        self.record_cache.invalidate(
+            [entry["ip_address"] for entry in report if entry["status"] != "rejected"])
+        return report
 
     def search_ip(self, ip: str) -> dict | None:
         """Tenta buscar um IP no banco. Retorna um dict ou None."""
+        if self.write_behind is not None:
+            # Registro ainda na fila é mais recente do que o que está no banco
+            pending = self.write_behind.pending_record(ip)
+            if pending is not None:
+                return pending
         try:
-            result = search_ip_in_db(ip)
+            result = self.record_cache.search(ip.strip(), self.storage.search_ip)
             return result
         except DatabaseError as e:
-            print(f"Erro ao buscar IP no serviço: {e}")
+            logger.error("Erro ao buscar IP no serviço", extra={"error": str(e)})
+            return None
+
+    def search_many(self, ips) -> dict[str, dict] | None:
+        """Busca vários IPs com uma única consulta. Retorna {ip: registro} ou None em erro."""
+        try:
+            results = self.record_cache.search_many(ips, self.storage.search_ips)
+        except DatabaseError as e:
+            logger.error("Erro ao buscar IPs em lote no serviço", extra={"error": str(e)})
+            return None
+        if self.write_behind is not None:
+            for ip in ips:
+                pending = self.write_behind.pending_record(ip)
+                if pending is not None:
+                    results[ip] = pending
+        return results
+
+    def search_cidr(self, network: str, limit: int | None = None) -> list | None:
+        """IPs registrados dentro da rede (ex.: '192.168.0.0/16'). None em erro de banco.
+
+        Levanta ValueError se a rede for inválida.
+        """
+        try:
+            return self.storage.search_cidr(network, limit=limit)
+        except DatabaseError as e:
+            logger.error("Erro ao buscar rede no serviço", extra={"error": str(e)})
             return None
 
+    def search_range(self, start: str, end: str, limit: int | None = None) -> list | None:
+        """IPs registrados entre `start` e `end` (inclusive). None em erro de banco.
+
+        Levanta ValueError se a faixa for inválida.
+        """
+        try:
+            return self.storage.search_range(start, end, limit=limit)
+        except DatabaseError as e:
+            logger.error("Erro ao buscar faixa no serviço", extra={"error": str(e)})
+            return None
+
+    def count_by_country(self, network: str | None = None) -> dict | None:
+        """{país: quantidade} dos IPs registrados (opcionalmente só dentro de `network`)."""
+        try:
+            return self.storage.count_by_country(network)
+        except DatabaseError as e:
+            logger.error("Erro ao contar IPs por país no serviço", extra={"error": str(e)})
+            return None
+
+    def list_ips(self, country=None, record_type=None, since=None, until=None,
+                 after: tuple | None = None, page_size: int = LIST_PAGE_SIZE) -> dict | None:
+        """Uma página da listagem (mais recentes primeiro). None em erro de banco.
+
+        Retorna {'rows': [...], 'next': cursor}; passe `next` como `after` para
+        a página seguinte (None = acabou).
+        """
+        try:
+            rows = self.storage.list_ips(country, record_type, since, until, after=after, limit=page_size + 1)
+        except DatabaseError as e:
+            logger.error("Erro ao listar IPs no serviço", extra={"error": str(e)})
+            return None
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        last = rows[-1] if rows else None
+        return {"rows": rows, "next": (last["registration_date"], last["id"]) if has_more else None}
+
+    def export(self, out, fmt: str = "csv", **filters) -> int | None:
+        """Exporta os registros filtrados para `out` (CSV ou JSONL). Retorna a quantidade ou None em erro."""
+        try:
+            return export_ips(out, fmt, storage=self.storage, **filters)
+        except DatabaseError as e:
+            logger.error("Erro ao exportar IPs no serviço", extra={"error": str(e)})
+            return None
+
+    def storage_stats(self) -> dict:
+        """Contadores do armazenamento (pool de conexões do PostgreSQL, arquivo do SQLite)."""
+        return self.storage.stats()
+
+    def search_cache_stats(self) -> dict:
+        """Acertos do cache de buscas e consultas ao banco evitadas."""
+        return self.record_cache.stats()
+
     #
     # A FUNÇÃO 'process_paste_event' FOI REMOVIDA DAQUI.
     # A lógica agora está em app_gui.py (_handle_paste e _run_ocr_task)
@@ -56,7 +230,8 @@ class IPService:
 
         country = None
         try:
-            info = self.get_ip_details(ip)
+            # Normalmente já consultado (ou a caminho) desde que o IP entrou no campo
+            info = self.geo_prefetch.result(ip) if self.geo_prefetch is not None else self.get_ip_details(ip)
             country = info.get("country")
         except Exception as e:
             show_error_func("Erro de Rede", f"Falha ao obter informações do IP: {e}")
@@ -0,0 +1,42 @@
+# ip_tracker/lazy.py
+"""Importação adiada de dependências pesadas.
+
+    psycopg2 = lazy_import("psycopg2", extra="postgres")
+
+O módulo só é importado no primeiro acesso a um atributo (`psycopg2.connect`,
+`except psycopg2.Error` etc.). Assim, importar ip_tracker.ip_extractor não
+carrega o pytesseract, nem ip_tracker.database o psycopg2: a abertura do app
+e das ferramentas de linha de comando paga só pelo que elas usam de fato.
+
+Para anotações de tipo com esses módulos, use `from __future__ import
+annotations` (senão a anotação força a importação ao definir a função).
+"""
+import importlib
+
+class LazyModule:
+    """Representa o módulo `name` e o importa na primeira vez que for usado."""
+
+    def __init__(self, name: str, extra: str | None = None):
+        self.__name = name
+        self.__extra = extra
+        self.__module = None
+
+    def _load(self):
+        if self.__module is None:
+            try:
+                self.__module = importlib.import_module(self.__name)
+            except ImportError as e:
+                hint = f" (instale com: pip install -r requirements-{self.__extra}.txt)" if self.__extra else ""
+                raise ImportError(f"Dependência opcional ausente: {self.__name}{hint}") from e
+        return self.__module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "carregado" if self.__module is not None else "não carregado"
+        return f"<LazyModule {self.__name!r} ({state})>"
+
+def lazy_import(name: str, extra: str | None = None) -> LazyModule:
+    """Módulo `name` importado no primeiro uso. `extra` é o requirements-<extra>.txt que o instala."""
+    return LazyModule(name, extra)
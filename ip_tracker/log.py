@@ -0,0 +1,47 @@
+# ip_tracker/log.py
+"""Configuração dos logs do projeto: uma linha JSON por evento, no stderr.
+
+Os módulos usam `logging.getLogger(__name__)` e passam os dados do evento
+em `extra`, que viram campos do JSON:
+
+    logger.warning("Erro ao consultar API de IP", extra={"ip": ip, "error": str(e)})
+"""
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from .config import LOG_LEVEL, LOG_FORMAT
+
+# Atributos que todo LogRecord tem; o que sobrar veio de `extra`
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """Formata o registro como um objeto JSON (ts, level, logger, msg e os campos de `extra`)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None):
+    """Configura o logger `ip_tracker` (chamado pelos pontos de entrada, não pelos módulos)."""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger = logging.getLogger("ip_tracker")
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
@@ -0,0 +1,242 @@
+# ip_tracker/metrics.py
+"""Métricas de desempenho: contadores e histogramas de latência em memória.
+
+Uso:
+    from . import metrics
+
+    with metrics.timed("geo_api_seconds", endpoint="single"):
+        ...
+    metrics.inc("geo_api_errors_total", endpoint="single")
+
+    @metrics.timed("db_query_seconds", op="search_ip")
+    def search_ip_in_db(...): ...
+
+`timed` também conta as exceções que atravessam o bloco, em
+`<nome sem _seconds>_errors_total` com os mesmos rótulos.
+
+Os valores podem ser lidos com `snapshot()` (dict com p50/p90/p99), em texto
+do Prometheus com `to_prometheus()`, pela rota GET /metrics do http_server ou
+num arquivo atualizado periodicamente (METRICS_DUMP_PATH).
+"""
+import atexit
+import bisect
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+from .config import METRICS_DUMP_PATH, METRICS_DUMP_INTERVAL
+
+# Limites (s) dos buckets: de 0,5 ms (cache, consulta local) a 30 s (OCR de imagem grande)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.9, 0.99)
+
+class Histogram:
+    """Contagem de observações por bucket, como num histograma do Prometheus.
+
+    Memória constante; os quantis são estimados por interpolação linear
+    dentro do bucket (mesma conta do `histogram_quantile`).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # o último é o +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if cumulative + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / n, self.max)
+            cumulative += n
+        return self.max
+
+    def summary(self) -> dict:
+        summary = {"count": self.count, "sum": self.sum,
+                   "avg": self.sum / self.count if self.count else 0.0, "max": self.max}
+        for q in QUANTILES:
+            summary[f"p{round(q * 100)}"] = self.quantile(q)
+        return summary
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _format_value(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return "+Inf" if value == math.inf else repr(float(value))
+
+class MetricsRegistry:
+    """Conjunto de contadores e histogramas, identificados por nome + rótulos."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def timed(self, name: str, **labels) -> "_Timer":
+        """Mede a duração de um bloco `with` ou de uma função decorada."""
+        return _Timer(self, name, labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        """{'counters': [...], 'histograms': [...]}, com p50/p90/p99 de cada histograma."""
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), **histogram.summary()}
+                          for (name, labels), histogram in sorted(self._histograms.items())]
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self) -> str:
+        """Formato texto de exposição do Prometheus (versão 0.0.4)."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.counts), h.count, h.sum, h.buckets))
+                                for key, h in self._histograms.items())
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (counts, count, total, buckets) in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for upper, n in zip((*buckets, math.inf), counts):
+                cumulative += n
+                le = "+Inf" if upper == math.inf else repr(upper)
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+class _Timer:
+    """Context manager/decorador devolvido por MetricsRegistry.timed."""
+
+    def __init__(self, registry: MetricsRegistry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.errors_name = f"{name.removesuffix('_seconds')}_errors_total"
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self._start, **self.labels)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.registry.inc(self.errors_name, **self.labels)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Um timer novo por chamada: o decorador é usado por várias threads
+            with _Timer(self.registry, self.name, self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+# --- Registro global do processo ---
+
+REGISTRY = MetricsRegistry()
+
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timed = REGISTRY.timed
+snapshot = REGISTRY.snapshot
+to_prometheus = REGISTRY.to_prometheus
+to_json = REGISTRY.to_json
+
+# --- Exportação para arquivo ---
+
+def write_metrics_file(path: str, registry: MetricsRegistry = REGISTRY):
+    """Grava as métricas em `path` (substituição atômica).
+
+    Extensão .prom ou .txt = texto do Prometheus (ex.: para o textfile
+    collector do node_exporter); qualquer outra = JSON.
+    """
+    content = registry.to_prometheus() if path.endswith((".prom", ".txt")) else registry.to_json()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def _dump_quietly(path: str, registry: MetricsRegistry):
+    try:
+        write_metrics_file(path, registry)
+    except OSError:
+        registry.inc("metrics_dump_errors_total")
+
+_dump_thread = None
+_dump_lock = threading.Lock()
+
+def start_metrics_dump(path: str = METRICS_DUMP_PATH, interval: float = METRICS_DUMP_INTERVAL,
+                       registry: MetricsRegistry = REGISTRY):
+    """Regrava o arquivo de métricas a cada `interval` s (e ao sair). No-op se `path` for vazio."""
+    global _dump_thread
+    if not path:
+        return None
+    with _dump_lock:
+        if _dump_thread is not None:
+            return _dump_thread
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                _dump_quietly(path, registry)
+
+        _dump_thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+        _dump_thread.start()
+        atexit.register(_dump_quietly, path, registry)
+    return _dump_thread
@@ -0,0 +1,70 @@
+# ip_tracker/ocr_cache.py
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+
+from .cache import LRUCache, SQLiteStore, MISSING
+from .config import OCR_CACHE_MAX_ENTRIES, OCR_CACHE_MAX_BYTES, OCR_CACHE_TTL, OCR_CACHE_PATH
+from .lazy import lazy_import
+
+Image = lazy_import("PIL.Image", extra="ocr")
+
+try:
+    # Opcional: xxh3 é bem mais rápido que os hashes do hashlib em buffers de vários MB
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Custo fixo estimado de uma entrada (tuplas, dict do LRU etc.), além de chave e valor
+_ENTRY_OVERHEAD = 200
+
+def image_key(image: Image.Image) -> str:
+    """Hash do conteúdo da imagem: pixels + tamanho + modo."""
+    header = f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode()
+    pixels = image.tobytes()
+    if xxhash is not None:
+        return "x" + xxhash.xxh3_128_hexdigest(header + pixels)
+    # sha256 tem aceleração em hardware na maioria das CPUs atuais (SHA-NI, ARMv8)
+    digest = hashlib.sha256(header)
+    digest.update(pixels)
+    return "s" + digest.hexdigest()[:32]
+
+def _entry_size(key: str, value: dict) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value.get("ip") or "") + _ENTRY_OVERHEAD
+
+class OCRCache:
+    """Cache de resultados de OCR indexado pelo hash da imagem.
+
+    Despeja por LRU quando o total estimado de bytes passa de `max_bytes`.
+    Guarda também quanto tempo o OCR levou, para contabilizar o tempo
+    economizado a cada acerto.
+    """
+
+    def __init__(self, max_entries: int = OCR_CACHE_MAX_ENTRIES, max_bytes: int = OCR_CACHE_MAX_BYTES,
+                 ttl: float = OCR_CACHE_TTL, path: str = OCR_CACHE_PATH):
+        store = SQLiteStore(path, table="ocr_cache") if path else None
+        self._cache = LRUCache(max_entries=max_entries, ttl=ttl, store=store,
+                               max_bytes=max_bytes, sizeof=_entry_size, name="ocr")
+        self._lock = threading.Lock()
+        self._time_saved = 0.0
+
+    def get(self, key: str):
+        """Retorna o IP armazenado (pode ser None = "sem IP na imagem") ou MISSING."""
+        entry = self._cache.get(key, MISSING)
+        if entry is MISSING:
+            return MISSING
+        with self._lock:
+            self._time_saved += entry.get("cost", 0.0)
+        return entry.get("ip")
+
+    def put(self, key: str, ip: str | None, cost: float):
+        """Armazena o resultado e o tempo (s) que o OCR levou para produzi-lo."""
+        self._cache.set(key, {"ip": ip, "cost": cost})
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        with self._lock:
+            stats["time_saved_s"] = round(self._time_saved, 3)
+        return stats
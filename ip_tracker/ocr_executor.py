@@ -0,0 +1,120 @@
+# ip_tracker/ocr_executor.py
+import logging
+import queue
+import threading
+from concurrent.futures import CancelledError, Future
+
+from .config import OCR_WORKERS, OCR_MAX_QUEUE
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class OCRQueueFullError(RuntimeError):
+    """A fila de OCR está cheia; o pedido foi recusado."""
+    pass
+
+class OCRExecutor:
+    """Pool fixo de workers de OCR com fila limitada.
+
+    Os workers são criados uma vez (e aquecidos com `warmup`, se informado),
+    em vez de uma thread nova por colagem. Pedidos enviados com a mesma `key`
+    se substituem: o anterior é cancelado se ainda estiver na fila, ou tem o
+    resultado descartado (CancelledError) se já estiver rodando.
+    """
+
+    def __init__(self, func, workers: int = OCR_WORKERS, max_queue: int = OCR_MAX_QUEUE, warmup=None):
+        self._func = func
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._latest = {}         # key -> Future mais recente
+        self._superseded = set()  # futures em execução cujo resultado deve ser descartado
+        self._closed = False
+        self._threads = []
+        for i in range(max(workers, 1)):
+            t = threading.Thread(target=self._worker, args=(warmup,), name=f"ocr-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, image, key=None, **kwargs) -> Future:
+        """Enfileira `func(image, **kwargs)` e retorna um Future com o resultado."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("O executor de OCR foi encerrado.")
+            # Enfileira antes de substituir: com a fila cheia, o pedido anterior continua valendo
+            try:
+                self._queue.put_nowait((future, key, image, kwargs))
+            except queue.Full:
+                future.set_exception(OCRQueueFullError("Fila de OCR cheia; tente novamente em instantes."))
+                return future
+            if key is not None:
+                self._supersede_locked(key, future)
+        return future
+
+    def completed(self, result, key=None) -> Future:
+        """Future já resolvido com `result` (ex.: acerto de cache), que substitui
+        o pedido anterior da mesma `key` como se tivesse passado pela fila."""
+        future = Future()
+        future.set_result(result)
+        if key is not None:
+            with self._lock:
+                self._supersede_locked(key, future)
+                # Já terminou: não fica registrado como o mais recente em andamento
+                del self._latest[key]
+        return future
+
+    def _supersede_locked(self, key, future: Future):
+        """Torna `future` o mais recente de `key`, cancelando ou descartando o anterior."""
+        previous = self._latest.get(key)
+        if previous is not None and not previous.cancel() and not previous.done():
+            self._superseded.add(previous)
+        self._latest[key] = future
+
+    def _worker(self, warmup):
+        if warmup is not None:
+            try:
+                warmup()
+            except Exception as e:
+                logger.warning("Falha ao aquecer o worker de OCR", extra={"error": str(e)})
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            future, key, image, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue  # cancelado enquanto esperava na fila
+            try:
+                result, error = self._func(image, **kwargs), None
+            except Exception as e:
+                result, error = None, e
+            with self._lock:
+                superseded = future in self._superseded
+                self._superseded.discard(future)
+                if key is not None and self._latest.get(key) is future:
+                    del self._latest[key]
+            if superseded:
+                future.set_exception(CancelledError("Pedido de OCR substituído por um mais recente."))
+            elif error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, wait: bool = True, timeout: float | None = 5.0):
+        """Cancela o que está na fila e encerra os workers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[0].cancel()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        if wait:
+            for t in self._threads:
+                t.join(timeout)
@@ -0,0 +1,156 @@
+# ip_tracker/ocr_preprocess.py
+from __future__ import annotations
+
+from statistics import median
+
+import math
+
+from .lazy import lazy_import
+
+Image = lazy_import("PIL.Image", extra="ocr")
+ImageChops = lazy_import("PIL.ImageChops", extra="ocr")
+ImageFilter = lazy_import("PIL.ImageFilter", extra="ocr")
+ImageOps = lazy_import("PIL.ImageOps", extra="ocr")
+
+# Altura de linha (px) em que o Tesseract tem boa precisão sem desperdiçar tempo
+TARGET_LINE_HEIGHT = 40
+MIN_SCALE, MAX_SCALE = 0.35, 2.0
+# Fração mínima de "tinta" para uma linha/coluna de pixels contar como texto
+_INK_ROW_MIN = 3       # em 0-255 (~1%)
+# Faixas com mais tinta que isso são blocos sólidos/imagens, não texto
+_INK_BAND_MAX = 140    # em 0-255 (~55%)
+_MIN_BAND_HEIGHT = 4
+_BAND_GAP = 2          # linhas vazias toleradas dentro de uma mesma faixa
+_PADDING = 12
+# A análise de layout roda numa cópia reduzida com no máximo este lado (px)
+ANALYSIS_MAX_DIM = 1000
+# Blocos sólidos (ícones, fotos, barras) são detectados em células deste lado (px
+# da imagem reduzida): uma célula inteiramente preenchida não é traço de letra
+_SOLID_CELL = 4
+
+def otsu_threshold(histogram: list[int]) -> int:
+    """Limiar de Otsu sobre o histograma de 256 tons de uma imagem 'L'."""
+    total = sum(histogram)
+    if not total:
+        return 127
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg = weight_bg = 0
+    best_t, best_var = 127, -1.0
+    for t, h in enumerate(histogram):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best_t, best_var = t, var
+    return best_t
+
+def _binarize(gray: Image.Image, threshold: int) -> Image.Image:
+    return gray.point([0 if i <= threshold else 255 for i in range(256)])
+
+def _profile(ink: Image.Image, horizontal: bool) -> list[int]:
+    """Média de tinta por linha (ou coluna), calculada em C via resize BOX."""
+    w, h = ink.size
+    size = (1, h) if horizontal else (w, 1)
+    return list(ink.resize(size, Image.BOX).getdata())
+
+def text_ink_mask(gray: Image.Image, threshold: int) -> tuple[Image.Image, int]:
+    """Máscara reduzida de "tinta de texto" (255) e o fator de redução usado.
+
+    Binariza em resolução cheia (para não perder traços finos), reduz para no
+    máximo ANALYSIS_MAX_DIM e apaga os blocos sólidos: células de
+    _SOLID_CELL px totalmente preenchidas (e suas vizinhas) não são texto.
+    Tudo é feito com operações em C do PIL (reduce/point/resize).
+    """
+    ink = gray.point([255 if i <= threshold else 0 for i in range(256)])
+    factor = max(1, math.ceil(max(ink.size) / ANALYSIS_MAX_DIM))
+    if factor > 1:
+        ink = ink.reduce(factor).point([255 if i > 64 else 0 for i in range(256)])
+    cells = ink.reduce(_SOLID_CELL).point([255 if i >= 250 else 0 for i in range(256)])
+    solid = cells.filter(ImageFilter.MaxFilter(3)).resize(
+        (cells.width * _SOLID_CELL, cells.height * _SOLID_CELL), Image.NEAREST
+    ).crop((0, 0) + ink.size)
+    return ImageChops.subtract(ink, solid), factor
+
+def find_text_bands(ink: Image.Image) -> list[tuple[int, int]]:
+    """Retorna as faixas horizontais (topo, base) que parecem linhas de texto."""
+    rows = _profile(ink, horizontal=True)
+    bands, start, gap = [], None, 0
+    for y, value in enumerate(rows + [0] * (_BAND_GAP + 1)):
+        if value >= _INK_ROW_MIN:
+            if start is None:
+                start = y
+            gap = 0
+        elif start is not None:
+            gap += 1
+            if gap > _BAND_GAP:
+                end = y - gap + 1
+                band = rows[start:end]
+                if end - start >= _MIN_BAND_HEIGHT and sum(band) / len(band) <= _INK_BAND_MAX:
+                    bands.append((start, end))
+                start, gap = None, 0
+    return bands
+
+def text_region(ink: Image.Image, bands: list[tuple[int, int]]) -> tuple[int, int, int, int] | None:
+    """Caixa (esq, topo, dir, base) que contém todas as faixas de texto."""
+    if not bands:
+        return None
+    w, _ = ink.size
+    top, bottom = bands[0][0], bands[-1][1]
+    strip = ink.crop((0, top, w, bottom))
+    cols = [x for x, value in enumerate(_profile(strip, horizontal=False)) if value >= _INK_ROW_MIN]
+    if not cols:
+        return None
+    return cols[0], top, cols[-1] + 1, bottom
+
+def preprocess_for_ocr(image: Image.Image) -> Image.Image:
+    """Prepara uma captura de tela para o Tesseract.
+
+    Converte para tons de cinza (invertendo temas escuros), binariza com Otsu,
+    recorta para a região que contém texto (descartando margens e blocos
+    sólidos) e ajusta a escala para que as linhas tenham ~TARGET_LINE_HEIGHT px.
+    """
+    return preprocess_with_transform(image)[0]
+
+def preprocess_with_transform(image: Image.Image) -> tuple[Image.Image, tuple[float, float, float]]:
+    """Como preprocess_for_ocr, devolvendo também (esq, topo, escala) do recorte.
+
+    Um ponto (x, y) da imagem preparada corresponde a
+    (esq + x / escala, topo + y / escala) na imagem original.
+    """
+    gray = image.convert("L")
+    histogram = gray.histogram()
+    pixels = sum(histogram) or 1
+    if sum(i * h for i, h in enumerate(histogram)) / pixels < 128:
+        # Modo escuro: texto claro sobre fundo escuro
+        gray = ImageOps.invert(gray)
+        histogram = histogram[::-1]
+    threshold = otsu_threshold(histogram)
+
+    ink, factor = text_ink_mask(gray, threshold)
+    bands = find_text_bands(ink)
+    box = text_region(ink, bands)
+    offset_x = offset_y = 0
+    if box is not None:
+        w, h = gray.size
+        left, top, right, bottom = box
+        offset_x, offset_y = max(left * factor - _PADDING, 0), max(top * factor - _PADDING, 0)
+        gray = gray.crop((offset_x, offset_y,
+                          min(right * factor + _PADDING, w), min(bottom * factor + _PADDING, h)))
+
+    applied = 1.0
+    if bands:
+        line_height = median(end - start for start, end in bands) * factor
+        scale = min(max(TARGET_LINE_HEIGHT / line_height, MIN_SCALE), MAX_SCALE)
+        if not 0.9 <= scale <= 1.1:
+            w, h = gray.size
+            gray = gray.resize((max(int(w * scale), 1), max(int(h * scale), 1)), Image.LANCZOS)
+            applied = gray.size[0] / w
+
+    return _binarize(gray, threshold), (offset_x, offset_y, applied)
@@ -0,0 +1,225 @@
+# ip_tracker/record_cache.py
+import logging
+import select
+import threading
+
+from .cache import LRUCache, MISSING
+from .config import RECORD_CACHE_MAX_ENTRIES, RECORD_CACHE_TTL, RECORD_CACHE_NEGATIVE_TTL, \
+    RECORD_CACHE_NOTIFY_CHANNEL
+from .database import DatabaseError, get_db_connection, psycopg2, extensions
+from .geo_cache import normalize_ip
+
+logger = logging.getLogger(__name__)
+
+class RecordCache:
+    """Cache "read-through" das buscas em registered_ips.
+
+    Guarda também os IPs não encontrados (com `negative_ttl`, mais curto).
+    As chaves são a forma canônica do IP ('2001:DB8::1' e '2001:db8::1' são a
+    mesma entrada); texto que não é IP não entra no cache. Gravações feitas
+    por este processo invalidam as entradas afetadas; para gravações de
+    outros processos, veja RecordCacheListener.
+    """
+
+    def __init__(self, max_entries: int = RECORD_CACHE_MAX_ENTRIES, ttl: float = RECORD_CACHE_TTL,
+                 negative_ttl: float = RECORD_CACHE_NEGATIVE_TTL):
+        self._cache = LRUCache(max_entries=max_entries, ttl=ttl, negative_ttl=negative_ttl,
+                               is_negative=lambda record: record is None, name="record")
+        self._lock = threading.Lock()
+        # Incrementada a cada invalidação: uma leitura que começou antes dela não
+        # pode gravar no cache o que leu (poderia ser o valor antigo)
+        self._generation = 0
+        self._queries = 0
+        self._avoided = 0
+
+    def peek(self, ip: str):
+        """Registro em cache (None = "não existe no banco") ou MISSING."""
+        key = normalize_ip(ip)
+        record = self._cache.get(key, MISSING) if key is not None else MISSING
+        if record is MISSING:
+            return MISSING
+        with self._lock:
+            self._avoided += 1
+        return dict(record) if record is not None else None
+
+    def begin_load(self) -> int:
+        """Marca o início de uma consulta ao banco; passe o retorno para `store`."""
+        with self._lock:
+            self._queries += 1
+            return self._generation
+
+    def store(self, ip: str, record, generation: int):
+        """Guarda o resultado de uma consulta, se nada foi invalidado desde `begin_load`."""
+        key = normalize_ip(ip)
+        if key is None:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+        self._cache.set(key, dict(record) if record is not None else None)
+
+    def search(self, ip: str, loader):
+        """Retorna o registro de `ip`, chamando `loader(ip)` só em caso de falta."""
+        record = self.peek(ip)
+        if record is not MISSING:
+            return record
+        generation = self.begin_load()
+        record = loader(ip)  # erros não são guardados
+        self.store(ip, record, generation)
+        return record
+
+    async def search_async(self, ip: str, loader):
+        """Como `search`, com `loader` sendo uma corrotina (AsyncIPService)."""
+        record = self.peek(ip)
+        if record is not MISSING:
+            return record
+        generation = self.begin_load()
+        record = await loader(ip)
+        self.store(ip, record, generation)
+        return record
+
+    def search_many(self, ips, loader_many) -> dict:
+        """Versão em lote: só os IPs ausentes do cache vão para `loader_many(ips)`.
+
+        `loader_many` recebe os IPs na forma canônica; o resultado é indexado
+        pelos textos recebidos em `ips`.
+        """
+        keys, found, missing = self._split_many(ips)
+        if not missing:
+            return found
+        generation = self.begin_load()
+        return self._merge_many(keys, found, missing, loader_many(missing), generation)
+
+    async def search_many_async(self, ips, loader_many) -> dict:
+        """Como `search_many`, com `loader_many` sendo uma corrotina."""
+        keys, found, missing = self._split_many(ips)
+        if not missing:
+            return found
+        generation = self.begin_load()
+        return self._merge_many(keys, found, missing, await loader_many(missing), generation)
+
+    def _split_many(self, ips):
+        """({chave: textos}, encontrados no cache, chaves que faltam)."""
+        keys = {}
+        for ip in dict.fromkeys(ips):
+            key = normalize_ip(ip)
+            if key is not None:
+                keys.setdefault(key, []).append(ip)
+        found, missing = {}, []
+        for key, originals in keys.items():
+            record = self._cache.get(key, MISSING)
+            if record is MISSING:
+                missing.append(key)
+            elif record is not None:
+                for ip in originals:
+                    found[ip] = dict(record)
+        if not missing:
+            with self._lock:
+                self._avoided += 1
+        return keys, found, missing
+
+    def _merge_many(self, keys: dict, found: dict, missing: list, loaded: dict, generation: int) -> dict:
+        for key in missing:
+            record = loaded.get(key)
+            self.store(key, record, generation)
+            if record is not None:
+                for ip in keys[key]:
+                    found[ip] = dict(record)
+        return found
+
+    def invalidate(self, ips):
+        with self._lock:
+            self._generation += 1
+        for ip in ips:
+            key = normalize_ip(ip)
+            if key is not None:
+                self._cache.invalidate(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        """Estatísticas do LRU mais as consultas ao banco feitas e evitadas."""
+        stats = self._cache.stats()
+        with self._lock:
+            stats["db_queries"] = self._queries
+            stats["db_queries_avoided"] = self._avoided
+        return stats
+
+class RecordCacheListener:
+    """Mantém o cache coerente entre processos via LISTEN/NOTIFY do PostgreSQL.
+
+    Escuta `channel` numa conexão dedicada (fora do pool) e invalida o IP
+    recebido no payload (payload vazio limpa o cache). Exige o gatilho
+    descrito no README. Se a conexão cair, o cache é limpo e a escuta é
+    retomada com espera crescente.
+    """
+
+    def __init__(self, cache: RecordCache, channel: str = RECORD_CACHE_NOTIFY_CHANNEL,
+                 connect_func=get_db_connection):
+        if not channel.isidentifier():
+            raise ValueError(f"Nome de canal inválido: {channel!r}")
+        self.cache = cache
+        self.channel = channel
+        self._connect = connect_func
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="record-cache-listener", daemon=True)
+
+    def start(self) -> "RecordCacheListener":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = 5):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                delay = 1.0
+            except (DatabaseError, psycopg2.Error, OSError) as e:
+                logger.warning("Escuta de invalidações interrompida",
+                               extra={"error": str(e), "retry_in": delay})
+                # Notificações podem ter sido perdidas enquanto a conexão estava fora
+                self.cache.clear()
+                self._stop.wait(delay)
+                delay = min(delay * 2, 60)
+
+    def _listen(self):
+        conn = self._connect()
+        try:
+            conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {self.channel};")
+            while not self._stop.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                ips = set()
+                while conn.notifies:
+                    payload = conn.notifies.pop(0).payload
+                    if not payload:
+                        ips = None
+                        conn.notifies.clear()
+                        break
+                    # Gatilhos antigos (`::text` em vez de `host()`) mandam '1.2.3.4/32'
+                    ips.add(payload.split("/", 1)[0])
+                if ips is None:
+                    self.cache.clear()
+                elif ips:
+                    self.cache.invalidate(ips)
+        finally:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+def start_record_cache_listener(cache: RecordCache) -> RecordCacheListener | None:
+    """Inicia a escuta se RECORD_CACHE_NOTIFY_CHANNEL estiver configurado."""
+    if not RECORD_CACHE_NOTIFY_CHANNEL:
+        return None
+    return RecordCacheListener(cache).start()
@@ -0,0 +1,400 @@
+# ip_tracker/sqlite_backend.py
+"""Backend de armazenamento em SQLite (ver storage.py): um arquivo local, sem servidor.
+
+- WAL + synchronous=NORMAL: leituras não esperam as gravações e cada commit
+  não precisa de fsync (só o checkpoint).
+- Pool limitado de conexões (SQLITE_POOL_SIZE), emprestadas por operação:
+  muitas threads de vida curta (ex.: uma por requisição HTTP) não deixam
+  conexões abertas para trás. As consultas usam SQL fixo com parâmetros,
+  então cada uma é compilada uma vez por conexão e reaproveitada (cache de
+  statements do módulo sqlite3).
+- O IP é gravado na forma canônica e também como `ip_key` (versão + 16
+  bytes do endereço), que ordena como o inet do PostgreSQL: buscas por
+  rede e por faixa viram um BETWEEN no índice único.
+- registration_date fica em UTC, como texto de largura fixa (ordena como
+  a data); volta como datetime com fuso local.
+"""
+import ipaddress
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, time, timezone
+
+from .config import SQLITE_PATH, SQLITE_BUSY_TIMEOUT, SQLITE_POOL_SIZE, BULK_CHUNK_SIZE, LIST_PAGE_SIZE, EXPORT_ITERSIZE
+from .database import DatabaseError, DEFAULT_RECORD_TYPE, validate_bulk_row, prepare_bulk_rows, \
+    latest_per_ip, finish_bulk_report
+from .storage import StorageBackend
+from . import metrics
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS registered_ips (
+        id INTEGER PRIMARY KEY,
+        ip_key BLOB NOT NULL UNIQUE,
+        ip_address TEXT NOT NULL,
+        mobile_code TEXT,
+        country TEXT,
+        registration_date TEXT NOT NULL,
+        record_type TEXT NOT NULL DEFAULT 'Publicação'
+    );
+    CREATE INDEX IF NOT EXISTS registered_ips_listing ON registered_ips (registration_date DESC, id DESC);
+"""
+_UPSERT_SQL = """
+    INSERT INTO registered_ips (ip_key, ip_address, mobile_code, country, registration_date, record_type)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (ip_key) DO UPDATE SET
+        mobile_code = COALESCE(excluded.mobile_code, registered_ips.mobile_code),
+        country = COALESCE(excluded.country, registered_ips.country),
+        record_type = excluded.record_type,
+        registration_date = excluded.registration_date;
+"""
+_COLUMNS = "ip_address, mobile_code, country, registration_date, record_type"
+_LIST_COLUMNS = f"id, {_COLUMNS}"
+_SEARCH_SQL = f"SELECT {_COLUMNS} FROM registered_ips WHERE ip_key = ?;"
+_EXISTS_SQL = "SELECT 1 FROM registered_ips WHERE ip_key = ?;"
+_BETWEEN_SQL = f"SELECT {_COLUMNS} FROM registered_ips WHERE ip_key BETWEEN ? AND ? ORDER BY ip_key"
+_COUNT_SQL = "SELECT country, COUNT(*) AS total FROM registered_ips{where} GROUP BY country ORDER BY total DESC, country;"
+_LIST_ORDER = "ORDER BY registration_date DESC, id DESC"
+
+# Formato de registration_date no arquivo: largura fixa, para ordenar como texto
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f+00:00"
+
+def _key(ip) -> bytes:
+    """Chave ordenável do endereço: versão (1 byte) + endereço em 16 bytes."""
+    return bytes((ip.version,)) + ip.packed.rjust(16, b"\0")
+
+def _parse_ip(value):
+    try:
+        return ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime(_DATE_FORMAT)
+
+def _to_db_date(value) -> str:
+    """datetime/date -> texto UTC. Datas sem fuso são tratadas como hora local."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, time())
+    return value.astimezone(timezone.utc).strftime(_DATE_FORMAT)
+
+def _upsert_params(ip, values: tuple, now: str) -> tuple:
+    _, mobile_code, country, record_type = values
+    return _key(ip), str(ip), mobile_code, country, now, record_type
+
+def _row(row) -> dict:
+    record = dict(row)
+    record["registration_date"] = datetime.fromisoformat(record["registration_date"]).astimezone()
+    return record
+
+def _limit(sql: str, limit: int | None) -> tuple[str, tuple]:
+    if limit is None:
+        return sql + ";", ()
+    if limit < 1:
+        raise ValueError("limit deve ser >= 1")
+    return sql + " LIMIT ?;", (int(limit),)
+
+def _list_filters(country=None, record_type=None, since=None, until=None) -> tuple[list, list]:
+    """Cláusulas WHERE (e parâmetros) dos filtros da listagem. `until` é exclusivo."""
+    clauses, params = [], []
+    if country:
+        clauses.append("country = ?")
+        params.append(country)
+    if record_type:
+        clauses.append("record_type = ?")
+        params.append(record_type)
+    if since is not None:
+        clauses.append("registration_date >= ?")
+        params.append(_to_db_date(since))
+    if until is not None:
+        clauses.append("registration_date < ?")
+        params.append(_to_db_date(until))
+    return clauses, params
+
+class SQLiteBackend(StorageBackend):
+    """registered_ips num arquivo SQLite (`path`, padrão SQLITE_PATH; ':memory:' para testes)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH, busy_timeout: float = SQLITE_BUSY_TIMEOUT,
+                 pool_size: int = SQLITE_POOL_SIZE):
+        if pool_size < 1:
+            raise ValueError("pool_size deve ser >= 1")
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.pool_size = pool_size
+        self._memory = path == ":memory:"
+        if not self._memory:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # LIFO: a conexão devolvida por último (com o cache de statements quente) sai primeiro
+        self._idle = queue.LifoQueue()
+        self._opened = 0          # conexões do pool abertas ou sendo abertas
+        self._connections = []
+        self._lock = threading.Lock()
+        # Em memória, todas as threads precisam ver o mesmo banco: uma única conexão, serializada
+        self._shared_lock = threading.RLock() if self._memory else None
+        self._shared = None
+        self._closed = False
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    # --- Conexões ---
+
+    def _connect(self) -> sqlite3.Connection:
+        try:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            if not self._memory:
+                conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Erro ao abrir o banco SQLite {self.path}: {e}") from e
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        """Empresta uma conexão livre, abre outra se o pool ainda não está cheio ou espera uma."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._opened < self.pool_size
+            if create:
+                self._opened += 1
+        if create:
+            try:
+                return self._connect()
+            except DatabaseError:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            raise DatabaseError(f"Nenhuma conexão SQLite livre em {self.busy_timeout}s "
+                                f"(pool de {self.pool_size}).") from None
+
+    def _release(self, conn: sqlite3.Connection):
+        if not self._closed:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()  # não devolve ao pool uma transação aberta
+                self._idle.put(conn)
+                return
+            except sqlite3.Error:
+                pass
+        # Backend fechado ou conexão com problema: fecha e libera a vaga no pool
+        with self._lock:
+            self._opened -= 1
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def _connection(self):
+        """Uma conexão do pool pela duração do bloco (ou a compartilhada, em memória).
+
+        Erros do SQLite viram DatabaseError.
+        """
+        if self._closed:
+            raise DatabaseError("Backend SQLite já foi fechado.")
+        if self._memory:
+            with self._shared_lock:
+                if self._shared is None:
+                    self._shared = self._connect()
+                yield from self._guard(self._shared)
+            return
+        conn = self._checkout()
+        try:
+            yield from self._guard(conn)
+        finally:
+            self._release(conn)
+
+    @staticmethod
+    def _guard(conn):
+        try:
+            yield conn
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            raise DatabaseError(f"Erro no banco SQLite: {e}") from e
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT: trava a escrita no início, sem risco de upgrade com deadlock."""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            connections = len(self._connections)
+        idle = self._idle.qsize()
+        size = 0
+        if not self._memory:
+            for suffix in ("", "-wal"):
+                try:
+                    size += os.path.getsize(self.path + suffix)
+                except OSError:
+                    pass
+        return {"backend": self.name, "path": self.path, "connections": connections, "idle": idle,
+                "pool_size": self.pool_size, "size_bytes": size}
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    # --- Operações ---
+
+    @metrics.timed("sqlite_query_seconds", op="register_ip")
+    def register_ip(self, ip_address, mobile_code, country, record_type) -> bool:
+        record_type = record_type or DEFAULT_RECORD_TYPE
+        # O SQLite não limita o tamanho das colunas: valida como o VARCHAR/INET do PostgreSQL faria
+        reason = validate_bulk_row(ip_address, mobile_code, country, record_type)
+        if reason:
+            raise DatabaseError(f"Erro inesperado ao registrar/atualizar o IP: {reason}")
+        ip = ipaddress.ip_address(str(ip_address).strip())
+        with self._connection() as conn:
+            conn.execute(_UPSERT_SQL, _upsert_params(ip, (ip_address, mobile_code, country, record_type), _now()))
+        return True
+
+    @metrics.timed("sqlite_query_seconds", op="register_ips")
+    def register_ips(self, rows, chunk_size: int = BULK_CHUNK_SIZE) -> list[dict]:
+        """Cada lote de `chunk_size` linhas é gravado numa transação, com o mesmo
+        relatório (e as mesmas regras) de database.register_ips_in_db."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size deve ser >= 1")
+        report, pending = prepare_bulk_rows(rows)
+        failure, retryable = None, True
+        for start in range(0, len(pending), chunk_size):
+            latest = latest_per_ip(report, pending[start:start + chunk_size])
+            now = _now()
+            try:
+                with self._transaction() as conn:
+                    # Dentro da transação de escrita: ninguém insere entre a verificação e o upsert
+                    outcome = {ip: "updated" if conn.execute(_EXISTS_SQL, (_key(ip),)).fetchone() else "inserted"
+                               for ip in latest}
+                    conn.executemany(_UPSERT_SQL, [_upsert_params(ip, report[idx]["_values"], now)
+                                                   for ip, idx in latest.items()])
+            except DatabaseError as e:
+                failure = f"falha no lote: {e}"
+                # Arquivo travado, disco, backend fechado: pode dar certo depois; restrição violada, não
+                retryable = not isinstance(e.__cause__, (sqlite3.IntegrityError, sqlite3.DataError))
+                break
+            for ip, idx in latest.items():
+                report[idx]["status"] = outcome[ip]
+        return finish_bulk_report(report, failure, retryable)
+
+    @metrics.timed("sqlite_query_seconds", op="search_ip")
+    def search_ip(self, ip_address) -> dict | None:
+        ip = _parse_ip(ip_address)
+        if ip is None:
+            return None
+        with self._connection() as conn:
+            row = conn.execute(_SEARCH_SQL, (_key(ip),)).fetchone()
+        return _row(row) if row is not None else None
+
+    @metrics.timed("sqlite_query_seconds", op="search_ips")
+    def search_ips(self, ip_addresses) -> dict[str, dict]:
+        # Uma busca por índice para cada IP, na mesma transação de leitura: sem
+        # ida e volta pela rede, é tão rápido quanto um IN (...) e usa um único statement
+        parsed = {}
+        for value in dict.fromkeys(ip_addresses):
+            ip = _parse_ip(value)
+            if ip is not None:
+                parsed.setdefault(ip, []).append(value)
+        found = {}
+        if not parsed:
+            return found
+        with self._connection() as conn:
+            conn.execute("BEGIN;")
+            try:
+                for ip, values in parsed.items():
+                    row = conn.execute(_SEARCH_SQL, (_key(ip),)).fetchone()
+                    if row is not None:
+                        record = _row(row)
+                        for value in values:
+                            found[value] = record
+            finally:
+                conn.rollback()
+        return found
+
+    def _between(self, first, last, limit: int | None) -> list:
+        sql, params = _limit(_BETWEEN_SQL, limit)
+        with self._connection() as conn:
+            return [_row(row) for row in conn.execute(sql, (_key(first), _key(last), *params))]
+
+    @metrics.timed("sqlite_query_seconds", op="search_cidr")
+    def search_cidr(self, network: str, limit: int | None = None) -> list:
+        net = ipaddress.ip_network(str(network).strip(), strict=False)
+        return self._between(net.network_address, net.broadcast_address, limit)
+
+    @metrics.timed("sqlite_query_seconds", op="search_range")
+    def search_range(self, start: str, end: str, limit: int | None = None) -> list:
+        first, last = ipaddress.ip_address(str(start).strip()), ipaddress.ip_address(str(end).strip())
+        if first.version != last.version:
+            raise ValueError("Início e fim da faixa devem ser da mesma versão de IP.")
+        if first > last:
+            raise ValueError("O início da faixa deve ser menor ou igual ao fim.")
+        return self._between(first, last, limit)
+
+    @metrics.timed("sqlite_query_seconds", op="count_by_country")
+    def count_by_country(self, network: str | None = None) -> dict:
+        params = ()
+        where = ""
+        if network is not None:
+            net = ipaddress.ip_network(str(network).strip(), strict=False)
+            params = (_key(net.network_address), _key(net.broadcast_address))
+            where = " WHERE ip_key BETWEEN ? AND ?"
+        with self._connection() as conn:
+            return {row["country"]: row["total"] for row in conn.execute(_COUNT_SQL.format(where=where), params)}
+
+    @metrics.timed("sqlite_query_seconds", op="list_ips")
+    def list_ips(self, country=None, record_type=None, since=None, until=None,
+                 after: tuple | None = None, limit: int = LIST_PAGE_SIZE) -> list:
+        clauses, params = _list_filters(country, record_type, since, until)
+        if after is not None:
+            clauses.append("(registration_date, id) < (?, ?)")
+            params.extend((_to_db_date(after[0]), after[1]))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql, limit_params = _limit(f"SELECT {_LIST_COLUMNS} FROM registered_ips{where} {_LIST_ORDER}", limit)
+        with self._connection() as conn:
+            return [_row(row) for row in conn.execute(sql, (*params, *limit_params))]
+
+    def iter_ips(self, country=None, record_type=None, since=None, until=None,
+                 itersize: int = EXPORT_ITERSIZE):
+        """Gera os registros em blocos de `itersize` linhas, numa única transação de leitura."""
+        clauses, params = _list_filters(country, record_type, since, until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {_LIST_COLUMNS} FROM registered_ips{where} {_LIST_ORDER};"
+        with self._connection() as conn:
+            cur = conn.execute(sql, params)
+            try:
+                while True:
+                    rows = cur.fetchmany(itersize)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield _row(row)
+            finally:
+                cur.close()
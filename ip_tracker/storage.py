@@ -0,0 +1,131 @@
+# ip_tracker/storage.py
+"""Interface de armazenamento dos registros de IP usada pelo IPService.
+
+Duas implementações:
+- PostgresBackend: o PostgreSQL do .env (funções de database.py, pool compartilhado);
+- SQLiteBackend (sqlite_backend.py): um arquivo local, sem servidor — para
+  uso offline, máquinas sem PostgreSQL e testes.
+
+A escolhida por padrão vem de STORAGE_BACKEND (config.py). Todas as
+operações levantam DatabaseError em falha de banco e ValueError em
+argumento inválido, como as funções de database.py.
+"""
+from abc import ABC, abstractmethod
+
+from .config import STORAGE_BACKEND, BULK_CHUNK_SIZE, LIST_PAGE_SIZE, EXPORT_ITERSIZE
+from . import database
+
+STORAGE_BACKENDS = ("postgres", "sqlite")
+
+class StorageBackend(ABC):
+    """Operações sobre registered_ips. Os registros são mapeamentos com as
+    chaves ip_address, mobile_code, country, registration_date e record_type
+    (mais `id` na listagem e na exportação). Subclasses precisam implementar
+    todas as operações abstratas para serem instanciadas."""
+
+    name = ""
+
+    @abstractmethod
+    def register_ip(self, ip_address, mobile_code, country, record_type) -> bool:
+        """Insere ou atualiza um registro."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def register_ips(self, rows, chunk_size: int = BULK_CHUNK_SIZE) -> list[dict]:
+        """Registro em lote; relatório por linha como o de database.register_ips_in_db."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_ip(self, ip_address):
+        """O registro do IP ou None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_ips(self, ip_addresses) -> dict:
+        """{ip: registro} só dos encontrados, com os textos recebidos como chaves."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_cidr(self, network: str, limit: int | None = None) -> list:
+        """Registros dentro da rede, em ordem de endereço."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_range(self, start: str, end: str, limit: int | None = None) -> list:
+        """Registros entre `start` e `end` (inclusive), em ordem de endereço."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_by_country(self, network: str | None = None) -> dict:
+        """{país: quantidade}, do maior para o menor."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_ips(self, country=None, record_type=None, since=None, until=None,
+                 after: tuple | None = None, limit: int = LIST_PAGE_SIZE) -> list:
+        """Uma página (mais recentes primeiro); `after` = (registration_date, id) do último da anterior."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_ips(self, country=None, record_type=None, since=None, until=None,
+                 itersize: int = EXPORT_ITERSIZE):
+        """Gera todos os registros filtrados, com memória constante."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Contadores do backend (pool de conexões, arquivo etc.)."""
+        return {}
+
+    def close(self):
+        """Libera conexões e arquivos."""
+
+class PostgresBackend(StorageBackend):
+    """O PostgreSQL configurado no .env, via database.py."""
+
+    name = "postgres"
+
+    def register_ip(self, ip_address, mobile_code, country, record_type) -> bool:
+        return database.register_ip_in_db(ip_address, mobile_code, country, record_type)
+
+    def register_ips(self, rows, chunk_size: int = BULK_CHUNK_SIZE) -> list[dict]:
+        return database.register_ips_in_db(rows, chunk_size=chunk_size)
+
+    def search_ip(self, ip_address):
+        return database.search_ip_in_db(ip_address)
+
+    def search_ips(self, ip_addresses) -> dict:
+        return database.search_ips_in_db(ip_addresses)
+
+    def search_cidr(self, network: str, limit: int | None = None) -> list:
+        return database.search_cidr_in_db(network, limit=limit)
+
+    def search_range(self, start: str, end: str, limit: int | None = None) -> list:
+        return database.search_range_in_db(start, end, limit=limit)
+
+    def count_by_country(self, network: str | None = None) -> dict:
+        return database.count_by_country_in_db(network)
+
+    def list_ips(self, country=None, record_type=None, since=None, until=None,
+                 after: tuple | None = None, limit: int = LIST_PAGE_SIZE) -> list:
+        return database.list_ips_in_db(country, record_type, since, until, after=after, limit=limit)
+
+    def iter_ips(self, country=None, record_type=None, since=None, until=None,
+                 itersize: int = EXPORT_ITERSIZE):
+        return database.iter_ips_in_db(country, record_type, since, until, itersize=itersize)
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "db_pool": database.get_pool_stats()}
+
+    def close(self):
+        # O pool é global (compartilhado com o resto do processo) e fechado no atexit
+        pass
+
+def create_storage(name: str | None = None, **options) -> StorageBackend:
+    """Cria o backend `name` (padrão: STORAGE_BACKEND). `options` vão para o construtor."""
+    name = (name or STORAGE_BACKEND).strip().lower()
+    if name == "postgres":
+        return PostgresBackend(**options)
+    if name == "sqlite":
+        from .sqlite_backend import SQLiteBackend
+        return SQLiteBackend(**options)
+    raise ValueError(f"STORAGE_BACKEND inválido: {name!r} (use {', '.join(STORAGE_BACKENDS)})")
@@ -1,9 +1,20 @@
 # ip_tracker/ui_components.py
 import customtkinter
 import tkinter as tk
-import threading # <-- Importado
-from PIL import Image, ImageGrab # <-- Importado
+from tkinter import ttk, filedialog, messagebox
+import logging
+import threading
+from concurrent.futures import CancelledError
+from datetime import datetime, timedelta
 from .ip_extractor import IPExtractor 
+from .config import LIST_PAGE_SIZE
+from .lazy import lazy_import
+
+# Carregados na primeira colagem de imagem
+Image = lazy_import("PIL.Image", extra="ocr")
+ImageGrab = lazy_import("PIL.ImageGrab", extra="ocr")
+
+logger = logging.getLogger(__name__)
 
 class PasteEnabledInputDialog(customtkinter.CTkInputDialog):
     def __init__(self, *args, ip_extractor: IPExtractor, **kwargs):
@@ -30,7 +41,7 @@ class PasteEnabledInputDialog(customtkinter.CTkInputDialog):
         except tk.TclError:
             pass # Não é texto, prossiga para tentar imagem.
         except Exception as e:
-            print(f"Erro ao colar texto no diálogo: {e}")
+            logger.warning("Erro ao colar texto no diálogo", extra={"error": str(e)})
             return
 
         # 2. Tenta pegar IMAGEM (ainda no Thread Principal)
@@ -40,27 +51,29 @@ class PasteEnabledInputDialog(customtkinter.CTkInputDialog):
                 # Não é texto e nem imagem. Fim.
                 return
         except Exception as e:
-            print(f"Erro no diálogo ao pegar imagem do clipboard: {e}")
+            logger.warning("Erro no diálogo ao pegar imagem do clipboard", extra={"error": str(e)})
             return
 
-        # 3. TEMOS UMA IMAGEM. Inicie o thread de OCR.
+        # 3. TEMOS UMA IMAGEM. Envie para o pool de OCR.
         # Não precisamos desabilitar a UI, pois o diálogo já é modal (bloqueia)
-        
-        # Inicia o thread SOMENTE para a tarefa lenta (OCR)
-        threading.Thread(target=self._run_dialog_ocr_task, args=(image,), daemon=True).start()
+        future = self.ip_extractor.extract_from_image_async(image, key="dialog")
+        future.add_done_callback(self._on_dialog_ocr_done)
 
-    def _run_dialog_ocr_task(self, image_object: Image.Image):
+    def _on_dialog_ocr_done(self, future):
         """
-        Executa a tarefa lenta de OCR no *Thread Secundário*.
+        Chamado quando o OCR termina (em um worker do pool).
         """
-        extracted_ip = None
+        if future.cancelled():
+            return
         try:
-            # A única coisa no thread: processar a imagem (lento)
-            extracted_ip = self.ip_extractor.extract_from_image(image_object)
+            extracted_ip = future.result()
+        except CancelledError:
+            return # Substituído por uma colagem mais nova
         except Exception as e:
-            print(f"Erro na thread de OCR do diálogo: {e}")
+            logger.error("Erro no OCR do diálogo", extra={"error": str(e)})
             # Não podemos mostrar um pop-up aqui facilmente, apenas logar
-        
+            return
+
         # 4. A tarefa lenta acabou. Agende a atualização da UI no Thread Principal.
         def ui_update():
             # Verifica se o widget do diálogo ainda existe
@@ -71,4 +84,177 @@ class PasteEnabledInputDialog(customtkinter.CTkInputDialog):
         
         if extracted_ip:
             # Usa self.after() para agendar a atualização na thread principal
-            self.after(0, ui_update)
\ No newline at end of file
+            self.after(0, ui_update)
+
+class ResultsWindow(customtkinter.CTkToplevel):
+    """Tabela dos IPs registrados, carregada sob demanda.
+
+    Só a primeira página é buscada ao abrir; as seguintes são buscadas (em
+    uma thread) quando a rolagem se aproxima do fim da tabela.
+    """
+
+    COLUMNS = (
+        ("ip_address", "IP", 150),
+        ("country", "País", 130),
+        ("mobile_code", "Código Mobile", 110),
+        ("record_type", "Tipo", 100),
+        ("registration_date", "Data de Registro", 150),
+    )
+    ALL_TYPES = "Todos"
+
+    def __init__(self, *args, ip_service, page_size: int = LIST_PAGE_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.title("IPs Registrados")
+        self.geometry("780x480")
+        self.ip_service = ip_service
+        self.page_size = page_size
+
+        self._filters = {}
+        self._next = None
+        self._loading = False
+        self._exhausted = False
+        self._loaded = 0
+        # Incrementado a cada novo filtro: páginas de uma busca anterior são ignoradas
+        self._generation = 0
+
+        self._create_widgets()
+        self._apply_filters()
+
+    def _create_widgets(self):
+        filters = customtkinter.CTkFrame(self)
+        filters.pack(padx=10, pady=(10, 5), fill="x")
+        customtkinter.CTkLabel(filters, text="País:").pack(side="left", padx=(10, 5))
+        self.country_entry = customtkinter.CTkEntry(filters, width=110)
+        self.country_entry.pack(side="left")
+        self.type_menu = customtkinter.CTkOptionMenu(filters, values=[self.ALL_TYPES, "Publicação", "Revisão"], width=110)
+        self.type_menu.pack(side="left", padx=10)
+        customtkinter.CTkLabel(filters, text="De:").pack(side="left", padx=(0, 5))
+        self.since_entry = customtkinter.CTkEntry(filters, width=95, placeholder_text="dd/mm/aaaa")
+        self.since_entry.pack(side="left")
+        customtkinter.CTkLabel(filters, text="Até:").pack(side="left", padx=5)
+        self.until_entry = customtkinter.CTkEntry(filters, width=95, placeholder_text="dd/mm/aaaa")
+        self.until_entry.pack(side="left")
+        customtkinter.CTkButton(filters, text="Filtrar", width=70, command=self._apply_filters).pack(side="left", padx=10)
+        self.export_button = customtkinter.CTkButton(filters, text="Exportar", width=80, command=self._on_export_clicked)
+        self.export_button.pack(side="right", padx=10)
+
+        table = customtkinter.CTkFrame(self)
+        table.pack(padx=10, pady=5, fill="both", expand=True)
+        self.tree = ttk.Treeview(table, columns=[c for c, _, _ in self.COLUMNS], show="headings")
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor="w")
+        self.scrollbar = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.status_label = customtkinter.CTkLabel(self, text="", anchor="w")
+        self.status_label.pack(padx=20, pady=(0, 10), fill="x")
+
+    def _read_filters(self) -> dict | None:
+        """Filtros da tela, ou None (com aviso) se alguma data for inválida."""
+        try:
+            since = self._parse_date(self.since_entry.get())
+            until = self._parse_date(self.until_entry.get())
+        except ValueError:
+            messagebox.showwarning("Data Inválida", "Use datas no formato dd/mm/aaaa.", parent=self)
+            return None
+        record_type = self.type_menu.get()
+        return {
+            "country": self.country_entry.get().strip() or None,
+            "record_type": None if record_type == self.ALL_TYPES else record_type,
+            "since": since,
+            # A data final é inclusiva na tela e exclusiva na consulta
+            "until": until + timedelta(days=1) if until else None,
+        }
+
+    @staticmethod
+    def _parse_date(text: str) -> datetime | None:
+        text = text.strip()
+        return datetime.strptime(text, "%d/%m/%Y") if text else None
+
+    def _apply_filters(self):
+        filters = self._read_filters()
+        if filters is None:
+            return
+        self._filters = filters
+        self._generation += 1
+        self._next = None
+        self._loading = False
+        self._exhausted = False
+        self._loaded = 0
+        self.tree.delete(*self.tree.get_children())
+        self._load_more()
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Perto do fim (ou tabela ainda sem barra de rolagem): busca a próxima página
+        if float(last) > 0.9:
+            self._load_more()
+
+    def _load_more(self):
+        if self._loading or self._exhausted:
+            return
+        self._loading = True
+        self.status_label.configure(text="Carregando...")
+        generation, filters, after = self._generation, dict(self._filters), self._next
+
+        def load_task():
+            page = self.ip_service.list_ips(**filters, after=after, page_size=self.page_size)
+            self.after(0, lambda: self._on_page_loaded(generation, page))
+
+        threading.Thread(target=load_task, daemon=True).start()
+
+    def _on_page_loaded(self, generation: int, page: dict | None):
+        if generation != self._generation or not self.winfo_exists():
+            return  # filtro mudou (ou janela fechada) enquanto a página carregava
+        self._loading = False
+        if page is None:
+            self._exhausted = True
+            self.status_label.configure(text="Erro ao carregar os IPs. Verifique os logs.")
+            return
+        self._next = page["next"]
+        self._exhausted = self._next is None
+        self._loaded += len(page["rows"])
+        self.status_label.configure(
+            text=f"{self._loaded} IPs" + ("" if self._exhausted else " (role para carregar mais)"))
+        # Inserir dispara o yscrollcommand, que pede a próxima página se ainda couber na tela
+        for row in page["rows"]:
+            date = row["registration_date"]
+            self.tree.insert("", "end", values=(
+                row["ip_address"], row["country"] or "", row["mobile_code"] or "", row["record_type"],
+                date.strftime("%d/%m/%Y %H:%M:%S") if date else "",
+            ))
+
+    def _on_export_clicked(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Exportar IPs", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")],
+        )
+        if not path:
+            return
+        fmt = "jsonl" if path.lower().endswith(".jsonl") else "csv"
+        filters = dict(self._filters)
+        self.export_button.configure(state="disabled")
+
+        def export_task():
+            try:
+                with open(path, "w", newline="", encoding="utf-8") as out:
+                    count = self.ip_service.export(out, fmt, **filters)
+            except OSError as e:
+                count, error = None, str(e)
+            else:
+                error = "Falha ao ler os IPs do banco. Verifique os logs."
+            self.after(0, lambda: self._on_export_done(path, count, error))
+
+        threading.Thread(target=export_task, daemon=True).start()
+
+    def _on_export_done(self, path: str, count: int | None, error: str):
+        if not self.winfo_exists():
+            return
+        self.export_button.configure(state="normal")
+        if count is None:
+            messagebox.showerror("Erro na Exportação", error, parent=self)
+        else:
+            messagebox.showinfo("Exportação Concluída", f"{count} IPs exportados para {path}", parent=self)
@@ -1,16 +1,49 @@
 # ip_tracker/utils.py
-import requests
+from __future__ import annotations
 
-def get_ip_info(ip_address: str) -> dict:
+import logging
+import threading
+from .config import GEO_API_URL, GEO_API_TIMEOUT, GEO_MAX_IN_FLIGHT
+from .lazy import lazy_import
+from . import metrics
+
+# Importado na primeira consulta (~50 ms com urllib3), não ao abrir o app
+requests = lazy_import("requests", extra="base")
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada (keep-alive e pool de conexões)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(GEO_MAX_IN_FLIGHT, 1))
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+def get_ip_info(ip_address: str, base_url: str = GEO_API_URL) -> dict:
     """Obtém informações geográficas de um endereço IP usando uma API externa."""
     try:
         # Você estava pedindo 'city', mas a lógica só usava 'country'. 
         # Pedi apenas 'country' para ser mais eficiente.
-        response = requests.get(f"http://ip-api.com/json/{ip_address}?fields=country")
-        response.raise_for_status() # Lança exceção para erros HTTP
-        data = response.json()
+        with metrics.timed("geo_api_seconds", endpoint="single"):
+            response = get_http_session().get(
+                f"{base_url}/json/{ip_address}",
+                params={"fields": "country"},
+                timeout=GEO_API_TIMEOUT,
+            )
+            response.raise_for_status() # Lança exceção para erros HTTP
+            data = response.json()
         return data
     except requests.exceptions.RequestException as e:
-        print(f"Erro ao consultar API de IP: {e}")
+        logger.warning("Erro ao consultar API de IP", extra={"ip": ip_address, "error": str(e)})
         # Retorna um dict que o .get('country') do serviço tratará como None
-        return {"status": "fail"}
\ No newline at end of file
+        return {"status": "fail"}
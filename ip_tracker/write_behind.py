@@ -0,0 +1,359 @@
+# ip_tracker/write_behind.py
+import ipaddress
+import logging
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from .config import WRITE_BEHIND_JOURNAL, WRITE_BEHIND_BATCH, WRITE_BEHIND_FSYNC_MS, WRITE_BEHIND_MAX_BACKOFF
+from .database import DEFAULT_RECORD_TYPE, DUPLICATE_IN_BATCH_REASON, FAILED_STATUS, validate_bulk_row
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl  # trava o diário para um único processo (indisponível no Windows)
+except ImportError:
+    fcntl = None
+
+# Acima disso (bytes), o diário é truncado assim que tudo estiver gravado no banco
+_COMPACT_THRESHOLD = 64 * 1024
+
+class JournalLockedError(RuntimeError):
+    """O diário já está em uso por outro processo."""
+
+class WriteBehindQueue:
+    """Fila de registros com diário local: grava no disco na hora e no banco depois.
+
+    `enqueue` acrescenta o registro a um diário JSONL (append-only) e só
+    espera o fsync, que é feito em grupo: registros que chegam dentro de
+    `fsync_interval` compartilham um único fsync. Uma thread envia os
+    pendentes para `flush_func` (ex.: IPService.register_many) em lotes,
+    com novas tentativas e espera crescente enquanto o banco estiver fora.
+    Só falhas de conexão ou do banco são repetidas: uma linha que o banco
+    rejeita vai para `<diário>.rejected` (JSONL, com o motivo) e sai da fila.
+
+    O arquivo `<diário>.checkpoint` guarda o último número de sequência já
+    gravado no banco; na inicialização, o que vier depois dele é reenviado.
+    """
+
+    def __init__(self, flush_func, journal_path: str = WRITE_BEHIND_JOURNAL,
+                 batch_size: int = WRITE_BEHIND_BATCH, fsync_interval: float = WRITE_BEHIND_FSYNC_MS / 1000,
+                 max_backoff: float = WRITE_BEHIND_MAX_BACKOFF):
+        if batch_size < 1:
+            raise ValueError("batch_size deve ser >= 1")
+        self.flush_func = flush_func
+        self.path = journal_path
+        self.checkpoint_path = f"{journal_path}.checkpoint"
+        self.rejected_path = f"{journal_path}.rejected"
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._pending = []        # entradas ainda não gravadas no banco, em ordem de seq
+        self._latest = {}         # ipaddress -> entrada pendente mais recente (leitura das próprias escritas)
+        self._next_seq = 1
+        self._written_seq = 0     # última seq escrita no arquivo
+        self._synced_seq = 0      # última seq garantida em disco (fsync)
+        self._flushed_seq = 0     # última seq gravada no banco (= checkpoint)
+        self._closing = False
+        self._retry_now = False   # flush()/close() pedem nova tentativa sem esperar o backoff
+        self._file = None
+        self._threads = []
+        self._stats = {"enqueued": 0, "flushed": 0, "batches": 0, "retries": 0, "fsyncs": 0,
+                       "replayed": 0, "rejected": 0, "last_error": None}
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> "WriteBehindQueue":
+        """Abre o diário, recupera o que não chegou ao banco e inicia as threads."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._file.close()
+                raise JournalLockedError(f"Diário em uso por outro processo: {self.path}")
+        self._replay()
+        self._threads = [
+            threading.Thread(target=self._sync_loop, name="write-behind-fsync", daemon=True),
+            threading.Thread(target=self._flush_loop, name="write-behind-flush", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def _replay(self):
+        self._flushed_seq = self._read_checkpoint()
+        max_seq = self._flushed_seq
+        self._file.seek(0)
+        complete = 0    # fim da última linha terminada em \n
+        tail_ok = True  # a última linha lida é um registro válido
+        for line in self._file:
+            if line.endswith(b"\n"):
+                complete += len(line)
+            try:
+                entry = json.loads(line)
+                seq = entry["seq"]
+            except (ValueError, KeyError, TypeError):
+                tail_ok = False
+                continue  # linha incompleta de uma queda no meio da escrita
+            tail_ok = True
+            max_seq = max(max_seq, seq)
+            if seq > self._flushed_seq:
+                self._add_pending(entry)
+        if self._file.tell() > complete:
+            # Última linha sem \n: sem corrigir, o próximo registro seria emendado nela e perdido
+            if tail_ok:
+                self._file.write(b"\n")
+            else:
+                self._file.truncate(complete)
+            os.fsync(self._file.fileno())
+        self._next_seq = max_seq + 1
+        self._written_seq = self._synced_seq = max_seq
+        self._stats["replayed"] = len(self._pending)
+        if self._pending:
+            logger.info("Registros pendentes recuperados do diário", extra={"pending": len(self._pending)})
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return int(json.load(f)["flushed_seq"])
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError, TypeError) as e:
+            # Reenviar é seguro (o upsert é idempotente); perder registros não
+            logger.warning("Checkpoint inválido; reenviando todo o diário", extra={"error": str(e)})
+            return 0
+
+    def _write_checkpoint(self, seq: int):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"flushed_seq": seq}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self, timeout: float = 5.0) -> bool:
+        """Tenta gravar os pendentes por até `timeout` s e encerra.
+
+        Retorna True se nada ficou pendente; o que sobrar continua no diário
+        e é reenviado na próxima inicialização.
+        """
+        drained = self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(1.0)
+        if self._file is not None:
+            with self._cond:
+                self._fsync()
+                self._file.close()  # libera também a trava
+                self._file = None
+        return drained
+
+    # --- Escrita ---
+
+    def enqueue(self, ip_address: str, mobile_code, country, record_type, durable: bool = True) -> int:
+        """Registra no diário e retorna a seq. Levanta ValueError se o registro for inválido.
+
+        Com `durable`, só retorna depois do fsync (alguns milissegundos).
+        """
+        if isinstance(ip_address, str):
+            ip_address = ip_address.strip()
+        record_type = record_type or DEFAULT_RECORD_TYPE
+        reason = validate_bulk_row(ip_address, mobile_code, country, record_type)
+        if reason:
+            raise ValueError(reason)
+        with self._cond:
+            if self._file is None or self._closing:
+                raise RuntimeError("Fila de registros não iniciada ou encerrada.")
+            entry = {
+                "seq": self._next_seq,
+                "ip_address": ip_address,
+                "mobile_code": mobile_code,
+                "country": country,
+                "record_type": record_type,
+                "queued_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self._next_seq += 1
+            self._file.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._file.flush()  # chega ao SO agora; o fsync é em grupo
+            self._written_seq = entry["seq"]
+            self._add_pending(entry)
+            self._stats["enqueued"] += 1
+            self._cond.notify_all()
+            if durable:
+                while self._synced_seq < entry["seq"] and self._file is not None:
+                    self._cond.wait()
+        return entry["seq"]
+
+    def _add_pending(self, entry: dict):
+        self._pending.append(entry)
+        self._latest[ipaddress.ip_address(entry["ip_address"])] = entry
+
+    def _fsync(self):
+        """fsync do diário (com o lock adquirido)."""
+        if self._file is not None and self._synced_seq < self._written_seq:
+            os.fsync(self._file.fileno())
+            self._synced_seq = self._written_seq
+            self._stats["fsyncs"] += 1
+            self._cond.notify_all()
+
+    def _sync_loop(self):
+        while True:
+            with self._cond:
+                while self._synced_seq >= self._written_seq and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return
+            # Janela para juntar mais registros no mesmo fsync
+            time.sleep(self.fsync_interval)
+            with self._cond:
+                self._fsync()
+
+    # --- Envio ao banco ---
+
+    def _flush_loop(self):
+        initial_backoff = min(0.5, self.max_backoff)
+        backoff = initial_backoff
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return
+                batch = self._pending[:self.batch_size]
+
+            error = self._send(batch)
+            with self._cond:
+                if error is None:
+                    del self._pending[:len(batch)]
+                    for entry in batch:
+                        key = ipaddress.ip_address(entry["ip_address"])
+                        if self._latest.get(key) is entry:
+                            del self._latest[key]
+                    self._flushed_seq = batch[-1]["seq"]
+                    self._stats["flushed"] += len(batch)
+                    self._stats["batches"] += 1
+                    self._write_checkpoint(self._flushed_seq)
+                    if not self._pending:
+                        self._compact()
+                    backoff = initial_backoff
+                    self._cond.notify_all()
+                    continue
+                self._stats["retries"] += 1
+                self._stats["last_error"] = error
+                metrics.inc("write_behind_retries_total")
+                logger.warning("Falha ao gravar registros da fila",
+                               extra={"rows": len(batch), "error": error, "retry_in": backoff})
+                # Novos registros não encurtam a espera; só flush()/close()
+                deadline = time.monotonic() + backoff
+                while not self._retry_now and not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._retry_now = False
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def _send(self, batch: list) -> str | None:
+        """Envia um lote. Retorna None em sucesso ou a descrição do erro.
+
+        Linhas rejeitadas não são erro do lote: reenviar não mudaria a resposta
+        do banco, então vão para o arquivo de rejeitados e o lote segue.
+        """
+        rows = [(e["ip_address"], e["mobile_code"], e["country"], e["record_type"]) for e in batch]
+        try:
+            report = self.flush_func(rows)
+        except Exception as e:
+            return str(e)
+        if report is None:
+            return "erro de banco"
+        # Lote que não chegou ao banco (conexão, banco fora do ar): tenta de novo inteiro
+        for row in report:
+            if row["status"] == FAILED_STATUS:
+                return row["reason"]
+        # A linha repetida no lote foi substituída pela mais recente, não rejeitada
+        rejected = [dict(entry, reason=row["reason"]) for entry, row in zip(batch, report)
+                    if row["status"] == "rejected" and row["reason"] != DUPLICATE_IN_BATCH_REASON]
+        if rejected:
+            try:
+                self._write_rejected(rejected)
+            except OSError as e:
+                return f"falha ao gravar rejeitados: {e}"
+        return None
+
+    def _write_rejected(self, entries: list):
+        """Acrescenta as linhas rejeitadas pelo banco a `<diário>.rejected` (antes do checkpoint)."""
+        rejected_at = datetime.now(timezone.utc).isoformat()
+        with open(self.rejected_path, "ab") as f:
+            for entry in entries:
+                line = json.dumps(dict(entry, rejected_at=rejected_at), ensure_ascii=False)
+                f.write(line.encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        with self._cond:
+            self._stats["rejected"] += len(entries)
+        metrics.inc("write_behind_rejected_total", len(entries))
+        for entry in entries:
+            logger.error("Registro da fila rejeitado pelo banco",
+                         extra={"ip": entry["ip_address"], "seq": entry["seq"], "reason": entry["reason"],
+                                "rejected_path": self.rejected_path})
+
+    def _compact(self):
+        """Trunca o diário quando tudo já está no banco (com o lock adquirido).
+
+        O checkpoint foi gravado antes: se cair aqui, as linhas restantes têm
+        seq <= checkpoint e são ignoradas na recuperação.
+        """
+        if self._file is None or self._file.tell() < _COMPACT_THRESHOLD:
+            return
+        self._fsync()
+        self._file.truncate(0)
+        os.fsync(self._file.fileno())
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera até `timeout` s que todos os pendentes cheguem ao banco."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._retry_now = bool(self._pending)
+            self._cond.notify_all()
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    # --- Consulta ---
+
+    def pending_record(self, ip_address: str) -> dict | None:
+        """Registro ainda não gravado no banco para o IP (no formato de search_ip), ou None."""
+        try:
+            key = ipaddress.ip_address((ip_address or "").strip())
+        except ValueError:
+            return None
+        with self._cond:
+            entry = self._latest.get(key)
+        if entry is None:
+            return None
+        return {
+            "ip_address": entry["ip_address"],
+            "mobile_code": entry["mobile_code"],
+            "country": entry["country"],
+            "record_type": entry["record_type"],
+            "registration_date": datetime.fromisoformat(entry["queued_at"]).astimezone(),
+        }
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+            stats["flushed_seq"] = self._flushed_seq
+        return stats
@@ -0,0 +1,53 @@
+-- migrations/001_inet_ip_address.sql
+-- Converte registered_ips.ip_address de VARCHAR(45) para INET.
+--
+-- INET ocupa 7 bytes (IPv4) ou 19 bytes (IPv6) contra até 46 do texto, e o
+-- índice da restrição UNIQUE (btree) passa a ordenar por endereço. Com isso,
+-- o mesmo índice atende busca exata, faixas (BETWEEN) e sub-redes (<<=),
+-- sem precisar de um índice GiST adicional.
+--
+-- Antes de rodar, confira se há valores que não são IPs (a conversão falharia):
+--   SELECT ip_address FROM registered_ips
+--   WHERE trim(ip_address) !~ '^[0-9A-Fa-f:.]+$';
+--
+-- Depois, se há textos diferentes que viram o mesmo endereço (' 10.0.0.1',
+-- '2001:DB8::1' e '2001:db8::1'...): a restrição UNIQUE quebraria no ALTER.
+--   SELECT trim(ip_address)::inet, count(*), array_agg(id ORDER BY registration_date)
+--   FROM registered_ips GROUP BY 1 HAVING count(*) > 1;
+--
+-- Para resolver, fique com uma linha por endereço (abaixo, a mais recente) e
+-- apague as outras; revise o resultado antes do COMMIT:
+--   BEGIN;
+--   DELETE FROM registered_ips r
+--   USING registered_ips newer
+--   WHERE trim(r.ip_address)::inet = trim(newer.ip_address)::inet
+--     AND (r.registration_date, r.id) < (newer.registration_date, newer.id);
+--   COMMIT;
+--
+-- Uso:
+--   psql -d ip_tracker -f migrations/001_inet_ip_address.sql
+
+BEGIN;
+
+-- Falha com uma mensagem clara (em vez da violação de UNIQUE no meio do ALTER)
+-- se ainda houver duplicatas; veja a consulta acima
+DO $$
+DECLARE
+    duplicates integer;
+BEGIN
+    SELECT count(*) INTO duplicates FROM (
+        SELECT 1 FROM registered_ips GROUP BY trim(ip_address)::inet HAVING count(*) > 1
+    ) AS d;
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION '% endereço(s) aparecem em mais de uma linha depois da conversão; resolva as duplicatas antes de migrar', duplicates;
+    END IF;
+END
+$$;
+
+-- Reescreve a tabela e reconstrói o índice UNIQUE já sobre o novo tipo
+ALTER TABLE registered_ips
+    ALTER COLUMN ip_address TYPE INET USING trim(ip_address)::inet;
+
+COMMIT;
+
+ANALYZE registered_ips;
@@ -0,0 +1,21 @@
+-- migrations/002_listing_index.sql
+-- Índice da listagem paginada (database.list_ips_in_db), que ordena por
+-- (registration_date, id) do mais recente para o mais antigo e pagina por
+-- chave: "(registration_date, id) < (último da página anterior)".
+--
+-- A comparação por chave não funciona com NULL, então a coluna passa a ser
+-- NOT NULL. Registros antigos sem data recebem 1970-01-01 (ficam no fim da
+-- listagem).
+--
+-- Uso:
+--   psql -d ip_tracker -f migrations/002_listing_index.sql
+
+BEGIN;
+
+UPDATE registered_ips SET registration_date = 'epoch' WHERE registration_date IS NULL;
+ALTER TABLE registered_ips ALTER COLUMN registration_date SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS registered_ips_registration_date_id_idx
+    ON registered_ips (registration_date DESC, id DESC);
+
+COMMIT;
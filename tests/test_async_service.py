@@ -0,0 +1,176 @@
+# tests/test_async_service.py
+"""AsyncIPService: mesmo backend, fila e cache do IPService, com ou sem o asyncpg."""
+import asyncio
+import ipaddress
+
+import asyncpg
+
+from ip_tracker.async_service import AsyncIPService, AsyncPostgresBackend
+from ip_tracker.cache import MISSING
+from ip_tracker.database import DUPLICATE_IN_BATCH_REASON, FAILED_STATUS
+from ip_tracker.geo_cache import create_geo_cache
+from ip_tracker.ip_extractor import IPExtractor
+from ip_tracker.ip_service import IPService
+from ip_tracker.sqlite_backend import SQLiteBackend
+
+class _FakeQueue:
+    """O mínimo de WriteBehindQueue usado pelo IPService."""
+
+    def __init__(self):
+        self.records = {}
+
+    def enqueue(self, ip_address, mobile_code, country, record_type):
+        self.records[ip_address.strip()] = {"ip_address": ip_address.strip(), "mobile_code": mobile_code,
+                                            "country": country, "record_type": record_type}
+
+    def pending_record(self, ip_address):
+        return self.records.get(ip_address.strip())
+
+def _service(write_behind=None) -> IPService:
+    return IPService(IPExtractor(), geo_cache=create_geo_cache(path=""), storage=SQLiteBackend(":memory:"),
+                     write_behind=write_behind)
+
+def test_register_and_search_go_through_the_storage_backend():
+    service = _service()
+
+    async def scenario():
+        async with AsyncIPService(service) as async_service:
+            assert await async_service.register_ip(" 10.0.0.1 ", "m1", "Brasil", "Revisão")
+            return await async_service.search(" 10.0.0.1")
+
+    record = asyncio.run(scenario())
+    assert record["country"] == "Brasil"
+    assert service.storage.search_ip("10.0.0.1")["mobile_code"] == "m1"
+
+def test_register_uses_the_write_behind_queue_and_search_sees_pending_rows():
+    queue = _FakeQueue()
+    service = _service(write_behind=queue)
+
+    async def scenario():
+        async with AsyncIPService(service) as async_service:
+            await async_service.register_ip("10.0.0.2", "m2", "Chile", "Publicação")
+            return await async_service.search_ip("10.0.0.2")
+
+    assert asyncio.run(scenario())["country"] == "Chile"
+    assert service.storage.search_ip("10.0.0.2") is None  # ainda só na fila
+
+def test_search_is_served_from_the_shared_record_cache_after_a_write():
+    service = _service()
+
+    async def scenario():
+        async with AsyncIPService(service) as async_service:
+            assert await async_service.search_ip("10.0.0.3") is None
+            service.register_ip("10.0.0.3", None, "Peru", "Revisão")  # invalida o cache
+            return await async_service.search_ip("10.0.0.3")
+
+    assert asyncio.run(scenario())["country"] == "Peru"
+
+class _FakePool:
+    """Pool do asyncpg em memória: registered_ips como dict {ipaddress: registro}."""
+
+    def __init__(self, fail_with=None):
+        self.rows = {}
+        self.queries = 0
+        self.fail_with = fail_with
+        self._staging = []
+
+    def _upsert(self, ip, mobile_code, country, record_type) -> bool:
+        old = self.rows.get(ip)
+        self.rows[ip] = {
+            "ip_address": ip, "registration_date": None, "record_type": record_type,
+            "mobile_code": mobile_code if mobile_code is not None or old is None else old["mobile_code"],
+            "country": country if country is not None or old is None else old["country"],
+        }
+        return old is None
+
+    async def execute(self, sql, *args):
+        self.queries += 1
+        if "INSERT" in sql:
+            self._upsert(ipaddress.ip_address(args[0]), *args[1:])
+
+    async def fetchrow(self, sql, ip):
+        self.queries += 1
+        return self.rows.get(ip)
+
+    async def fetch(self, sql, *args):
+        self.queries += 1
+        if args:
+            return [self.rows[ip] for ip in args[0] if ip in self.rows]
+        if self.fail_with is not None:
+            raise self.fail_with
+        staged, self._staging = self._staging, []
+        return [{"ip_address": ip, "inserted": self._upsert(ip, *values)} for ip, *values in staged]
+
+    async def copy_records_to_table(self, table, columns, records):
+        self._staging.extend(records)
+
+    def acquire(self):
+        return self
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._staging = []
+        return False
+
+    async def close(self):
+        pass
+
+def _async_service(pool, write_behind=None) -> AsyncIPService:
+    return AsyncIPService(_service(write_behind), db=AsyncPostgresBackend(pool=pool))
+
+def test_native_path_shares_the_record_cache_with_canonical_keys():
+    pool = _FakePool()
+
+    async def scenario():
+        async with _async_service(pool) as async_service:
+            assert await async_service.register_ip(" 2001:DB8::1 ", "m1", "Chile", "Revisão")
+            first = await async_service.search(" 2001:db8:0::1")
+            await async_service.search_ip("2001:db8::1")  # do cache
+            queries = pool.queries
+            assert await async_service.register_ip("2001:db8::1", None, "Peru", "Revisão")
+            assert async_service.service.record_cache.peek("2001:DB8::1") is MISSING
+            return first, queries, await async_service.search_many(["2001:db8::1", "10.9.9.9", "lixo"])
+
+    first, queries, found = asyncio.run(scenario())
+    assert first["ip_address"] == "2001:db8::1" and first["country"] == "Chile"
+    assert queries == 2
+    assert found["2001:db8::1"]["country"] == "Peru" and found["2001:db8::1"]["mobile_code"] == "m1"
+    assert set(found) == {"2001:db8::1"}
+
+def test_native_path_routes_registrations_through_the_write_behind_queue():
+    queue = _FakeQueue()
+    pool = _FakePool()
+
+    async def scenario():
+        async with _async_service(pool, write_behind=queue) as async_service:
+            await async_service.register_ip("10.0.0.2", "m2", "Chile", "Publicação")
+            return await async_service.search_ip("10.0.0.2")
+
+    assert asyncio.run(scenario())["country"] == "Chile"
+    assert pool.rows == {} and pool.queries == 0
+
+def test_native_bulk_report_matches_the_sync_one():
+    async def scenario(pool):
+        async with _async_service(pool) as async_service:
+            await async_service.register_ip("10.0.0.1", None, "Brasil", None)
+            return await async_service.register_many([
+                ("10.0.0.1", "m1", None, "Revisão"), ("10.0.0.2", None, "Chile", None),
+                ("lixo", None, None, None), ("10.0.0.2", None, "Peru", None),
+            ])
+
+    pool = _FakePool()
+    report = asyncio.run(scenario(pool))
+    assert [entry["status"] for entry in report] == ["updated", "rejected", "rejected", "inserted"]
+    assert report[1]["reason"] == DUPLICATE_IN_BATCH_REASON
+    assert pool.rows[ipaddress.ip_address("10.0.0.1")]["country"] == "Brasil"
+    assert pool.rows[ipaddress.ip_address("10.0.0.2")]["country"] == "Peru"
+
+    outage = asyncio.run(scenario(_FakePool(fail_with=asyncpg.exceptions.AdminShutdownError("fora do ar"))))
+    assert [entry["status"] for entry in outage] == [FAILED_STATUS, "rejected", "rejected", FAILED_STATUS]
+    rejected = asyncio.run(scenario(_FakePool(fail_with=asyncpg.exceptions.DataError("valor inválido"))))
+    assert [entry["status"] for entry in rejected] == ["rejected"] * 4
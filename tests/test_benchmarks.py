@@ -0,0 +1,22 @@
+# tests/test_benchmarks.py
+"""Comparação dos resultados dos benchmarks com a linha de base."""
+from benchmarks.run import compare
+
+_BASELINE = {
+    "thresholds": {"default": 0.3, "*_p99_ms": 1.0},
+    "metrics": {"db.search_p50_ms": 1.0, "db.search_p99_ms": 1.0, "geo.batch_ips_per_s": 100.0},
+}
+
+def _statuses(current, **kwargs):
+    return {item["metric"]: item["status"] for item in compare(current, _BASELINE, **kwargs)}
+
+def test_tail_latency_noise_is_reported_but_not_a_regression():
+    current = {"db.search_p50_ms": 1.1, "db.search_p99_ms": 3.2, "geo.batch_ips_per_s": 50.0}
+    assert _statuses(current) == {"db.search_p50_ms": "ok", "db.search_p99_ms": "slower",
+                                  "geo.batch_ips_per_s": "regressed"}
+    assert _statuses(current, strict=True)["db.search_p99_ms"] == "regressed"
+
+def test_the_baseline_can_choose_which_metrics_are_informative():
+    baseline = dict(_BASELINE, informative=[])
+    current = {"db.search_p50_ms": 1.0, "db.search_p99_ms": 3.2, "geo.batch_ips_per_s": 100.0}
+    assert {item["status"] for item in compare(current, baseline)} == {"ok", "regressed"}
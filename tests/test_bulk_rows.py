@@ -0,0 +1,25 @@
+# tests/test_bulk_rows.py
+"""Validação das linhas do registro em lote (database.prepare_bulk_rows)."""
+from ip_tracker.database import prepare_bulk_rows, finish_bulk_report, DEFAULT_RECORD_TYPE
+
+def test_valid_rows_are_normalized():
+    report, pending = prepare_bulk_rows([(" 1.2.3.4 ", "m1", "Brasil", None),
+                                         {"ip_address": "2001:db8::1", "country": "Chile"}])
+    assert pending == [0, 1]
+    assert report[0]["_values"] == ("1.2.3.4", "m1", "Brasil", DEFAULT_RECORD_TYPE)
+    assert report[1]["_values"] == ("2001:db8::1", None, "Chile", DEFAULT_RECORD_TYPE)
+
+def test_invalid_rows_become_rejections_instead_of_exceptions():
+    rows = [
+        ("1.2.3.4", 123, "Brasil", "x"),       # mobile_code numérico (JSON)
+        ("1.2.3.5",),                          # tupla curta
+        "1.2.3.6",                             # texto solto
+        None,
+        {"ip_address": 5},                     # IP numérico
+        ("999.1.1.1", None, None, None),
+        ("1.2.3.7", None, "B" * 500, None),
+    ]
+    report = finish_bulk_report(prepare_bulk_rows(rows)[0])
+    assert [entry["status"] for entry in report] == ["rejected"] * len(rows)
+    assert all(entry["reason"] for entry in report)
+    assert report[0]["reason"] == "mobile_code deve ser texto"
@@ -0,0 +1,112 @@
+# tests/test_connection_pool.py
+"""ConnectionPool: checkout, devolução, espera e descarte de conexões quebradas."""
+import threading
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+
+from ip_tracker.database import ConnectionPool, DatabaseError, extensions
+
+class _FakeConnection:
+    """O mínimo de uma conexão psycopg2 usado pelo pool."""
+
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.rollbacks = 0
+        self.broken = False
+        self.info = SimpleNamespace(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if self.broken:
+            raise psycopg2.OperationalError("servidor fechou a conexão")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+def _pool(**kwargs):
+    opened = []
+
+    def connect():
+        opened.append(_FakeConnection(len(opened) + 1))
+        return opened[-1]
+
+    return ConnectionPool(connect_func=connect, **kwargs), opened
+
+def test_returned_connections_are_reused_most_recent_first():
+    pool, opened = _pool(minconn=2, maxconn=3)
+    assert len(opened) == 2
+    first = pool.getconn()
+    assert first is opened[1]  # LIFO
+    second = pool.getconn()
+    third = pool.getconn()  # abre a terceira sob demanda
+    assert len(opened) == 3 and third is opened[2]
+    pool.putconn(second)
+    pool.putconn(first)
+    assert pool.getconn() is first
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["in_use"], stats["checkouts"]) == (3, 1, 2, 4)
+
+def test_a_pending_transaction_is_rolled_back_before_the_connection_goes_back():
+    pool, _ = _pool(minconn=0, maxconn=1)
+    with pool.connection() as conn:
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+    assert conn.rollbacks == 1
+    assert pool.getconn() is conn
+
+def test_lost_connections_are_discarded_and_stale_ones_replaced():
+    pool, opened = _pool(minconn=0, maxconn=2, healthcheck_idle=0)
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            raise psycopg2.OperationalError("conexão perdida")
+    assert conn.closed and pool.stats()["discarded"] == 1 and pool.stats()["size"] == 0
+
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True  # quebrou enquanto estava ociosa: o checkout testa e reabre
+    replacement = pool.getconn()
+    assert replacement is not conn and conn.closed
+    assert pool.stats()["reconnects"] == 1 and len(opened) == 3
+
+def test_checkout_waits_for_a_returned_connection_and_then_times_out():
+    pool, _ = _pool(minconn=1, maxconn=1, timeout=5)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    assert pool.getconn() is conn
+    pool.timeout = 0.05
+    with pytest.raises(DatabaseError):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+
+def test_a_failed_connect_does_not_leak_capacity_and_close_stops_checkouts():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise psycopg2.OperationalError("banco fora do ar")
+        return _FakeConnection(len(attempts))
+
+    pool = ConnectionPool(minconn=0, maxconn=1, timeout=0.05, connect_func=connect)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    conn = pool.getconn()  # a vaga reservada foi liberada
+    pool.putconn(conn)
+    pool.close()
+    assert conn.closed
+    with pytest.raises(DatabaseError):
+        pool.getconn()
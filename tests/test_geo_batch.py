@@ -0,0 +1,78 @@
+# tests/test_geo_batch.py
+"""Consulta em lote e limite de taxa, contra o stub local do ip-api."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from benchmarks.geo_stub import GeoStubServer
+from ip_tracker.geo_batch import BatchGeoLookup, RateLimiter
+from ip_tracker.geo_cache import create_geo_cache
+from ip_tracker.ip_extractor import IPExtractor
+from ip_tracker.ip_service import IPService
+from ip_tracker.sqlite_backend import SQLiteBackend
+from ip_tracker.utils import requests
+
+IPS = [f"8.8.{i}.{j}" for i in range(3) for j in range(1, 5)]
+
+def _response(status: int, **headers):
+    return SimpleNamespace(status_code=status, headers=headers)
+
+def test_lookup_resolves_all_ips_in_batches():
+    with GeoStubServer(country="Brasil") as stub:
+        lookup = BatchGeoLookup(batch_size=5, max_in_flight=2, base_url=stub.url, session=requests.Session())
+        results = lookup.lookup(IPS + IPS[:3])  # repetidos vão uma vez só
+    assert results == {ip: {"country": "Brasil"} for ip in IPS}
+    assert stub.state.requests == 3
+
+def test_rate_limiter_waits_for_the_window_instead_of_getting_429():
+    with GeoStubServer(rate_limit=2, window=1.0) as stub:
+        lookup = BatchGeoLookup(batch_size=1, max_in_flight=1, base_url=stub.url, session=requests.Session())
+        start = time.monotonic()
+        results = lookup.lookup(IPS[:4])
+        elapsed = time.monotonic() - start
+    assert all(info == {"country": "Brasil"} for info in results.values())
+    assert stub.state.throttled == 0
+    assert elapsed >= 0.5  # a 3ª requisição esperou a janela reiniciar
+
+def test_429_is_retried_after_the_ttl():
+    with GeoStubServer(fail_first=1, window=1.0) as stub:
+        lookup = BatchGeoLookup(batch_size=10, base_url=stub.url, session=requests.Session())
+        results = lookup.lookup(IPS[:3])
+    assert results == {ip: {"country": "Brasil"} for ip in IPS[:3]}
+    assert stub.state.throttled == 1
+    assert stub.state.requests == 2
+
+def test_429_without_retries_returns_failed_lookups():
+    with GeoStubServer(fail_first=5, window=1.0) as stub:
+        lookup = BatchGeoLookup(base_url=stub.url, session=requests.Session(), max_retries=0)
+        results = lookup.lookup(IPS[:2])
+    assert results == {ip: {"status": "fail"} for ip in IPS[:2]}
+
+def test_rate_limiter_blocks_after_429_until_ttl():
+    limiter = RateLimiter()
+    limiter.acquire()
+    limiter.release(_response(429, **{"X-Ttl": "1"}))
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.9
+    limiter.release(None)
+
+def test_rate_limiter_waits_when_the_quota_is_used_up():
+    limiter = RateLimiter()
+    limiter.acquire()
+    limiter.release(_response(200, **{"X-Rl": "0", "X-Ttl": "1"}))
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.9
+    limiter.release(None)
+
+def test_ip_service_shares_one_rate_limiter_across_concurrent_callers():
+    with GeoStubServer(rate_limit=2, window=1.0) as stub:
+        geo_batch = BatchGeoLookup(batch_size=1, max_in_flight=1, base_url=stub.url, session=requests.Session())
+        service = IPService(IPExtractor(), geo_cache=create_geo_cache(path=""), storage=SQLiteBackend(":memory:"),
+                            geo_batch=geo_batch)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(service.get_ip_details_many, [IPS[i:i + 2] for i in (0, 2, 4)]))
+    assert service.geo_batch is geo_batch
+    assert all(info == {"country": "Brasil"} for found in results for info in found.values())
+    assert stub.state.throttled == 0
@@ -0,0 +1,37 @@
+# tests/test_geo_cache.py
+"""Cache de geolocalização: chaves canônicas e cópias defensivas."""
+from ip_tracker.geo_cache import create_geo_cache, lookup_cached, lookup_many_cached
+
+class _Fetch:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, ip):
+        self.calls.append(ip)
+        return {"country": "Brasil"}
+
+    def many(self, ips):
+        self.calls.extend(ips)
+        return {ip: {"country": "Brasil"} for ip in ips}
+
+def test_equivalent_spellings_share_one_entry():
+    cache, fetch = create_geo_cache(path=""), _Fetch()
+    for ip in (" 8.8.8.8", "8.8.8.8", "8.8.8.8\n"):
+        assert lookup_cached(cache, ip, fetch) == {"country": "Brasil"}
+    assert lookup_cached(cache, "2001:4860:4860::8888", fetch) == {"country": "Brasil"}
+    assert lookup_cached(cache, "2001:4860:4860:0:0:0:0:8888", fetch) == {"country": "Brasil"}
+    assert fetch.calls == ["8.8.8.8", "2001:4860:4860::8888"]
+
+def test_returned_dicts_are_copies():
+    cache, fetch = create_geo_cache(path=""), _Fetch()
+    lookup_cached(cache, "8.8.8.8", fetch)["country"] = "Alterado"
+    assert lookup_cached(cache, "8.8.8.8", fetch) == {"country": "Brasil"}
+    lookup_many_cached(cache, ["8.8.8.8"], fetch.many)["8.8.8.8"]["country"] = "Alterado"
+    assert lookup_cached(cache, "8.8.8.8", fetch) == {"country": "Brasil"}
+
+def test_batch_keys_results_by_the_given_text_and_fetches_canonical_once():
+    cache, fetch = create_geo_cache(path=""), _Fetch()
+    results = lookup_many_cached(cache, [" 1.1.1.1", "1.1.1.1", "10.0.0.1", "lixo"], fetch.many)
+    assert results[" 1.1.1.1"] == results["1.1.1.1"] == {"country": "Brasil"}
+    assert results["10.0.0.1"] == results["lixo"] == {"status": "fail"}
+    assert fetch.calls == ["1.1.1.1"]
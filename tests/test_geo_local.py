@@ -0,0 +1,79 @@
+# tests/test_geo_local.py
+"""Base GeoIP local: compilação do CSV, consultas e faixas sobrepostas."""
+import os
+
+from ip_tracker.geo_local import FAILED_LOOKUP, LocalGeoIPDatabase, compile_csv
+
+def _open(tmp_path, lines) -> LocalGeoIPDatabase:
+    csv_path = tmp_path / "geo.csv"
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return LocalGeoIPDatabase.open(str(csv_path))
+
+def test_cidr_and_start_end_rows_are_compiled_and_looked_up(tmp_path):
+    db = _open(tmp_path, [
+        "# comentário",
+        "rede,pais",
+        "1.0.0.0/24,Austrália",
+        "16777472,16777727,China",  # 1.0.1.0 - 1.0.1.255 como inteiros
+        "2.0.0.0,2.0.0.255,França",
+        "2001:db8::/32,Chile",
+    ])
+    try:
+        assert len(db) == 4
+        assert db.lookup("1.0.0.7") == {"country": "Austrália"}
+        assert db.lookup_country("1.0.1.255") == "China"
+        assert db.lookup_country(" 2.0.0.1") == "França"
+        assert db.lookup_country("2001:DB8::1") == "Chile"
+        assert db.lookup_country("2001:db9::1") is None
+        assert db.lookup("3.0.0.1") == FAILED_LOOKUP
+        assert db.lookup("não é ip") == FAILED_LOOKUP
+    finally:
+        db.close()
+
+def test_nested_ranges_resolve_to_the_most_specific_one(tmp_path):
+    db = _open(tmp_path, [
+        "10.0.0.0/8,AA",
+        "10.1.0.0/16,BB",
+        "10.1.2.0/24,CC",
+        "2001:db8::/32,V6A",
+        "2001:db8:1::/48,V6B",
+    ])
+    try:
+        assert db.lookup_country("10.2.0.1") == "AA"
+        assert db.lookup_country("10.1.2.3") == "CC"
+        assert db.lookup_country("10.1.3.3") == "BB"
+        assert db.lookup_country("10.255.255.255") == "AA"
+        assert db.lookup_country("11.0.0.1") is None
+        assert db.lookup_country("2001:db8:2::1") == "V6A"
+        assert db.lookup_country("2001:db8:1::1") == "V6B"
+        # 10.0.0.0-10.0.255.255 | 10.1.0.0-10.1.1.255 | 10.1.2.0/24 | ... | 10.2.0.0-10.255.255.255
+        assert len(db) == 5 + 3
+    finally:
+        db.close()
+
+def test_ranges_of_the_same_size_let_the_later_row_win(tmp_path):
+    db = _open(tmp_path, ["10.0.0.0/24,Antigo", "10.0.0.0,10.0.0.255,Novo", "10.0.0.128/25,Menor"])
+    try:
+        assert db.lookup_country("10.0.0.1") == "Novo"
+        assert db.lookup_country("10.0.0.200") == "Menor"
+    finally:
+        db.close()
+
+def test_open_recompiles_a_stale_or_foreign_index(tmp_path):
+    csv_path = tmp_path / "geo.csv"
+    csv_path.write_text("10.0.0.0/8,AA\n", encoding="utf-8")
+    index_path = f"{csv_path}.idx"
+    assert compile_csv(str(csv_path), index_path) == 1
+
+    with open(index_path, "r+b") as f:
+        f.write(b"IPGEOv1\x00")  # índice de uma versão anterior do formato
+    db = LocalGeoIPDatabase.open(str(csv_path))
+    assert db.lookup_country("10.0.0.1") == "AA"
+    db.close()
+
+    csv_path.write_text("10.0.0.0/8,BB\n", encoding="utf-8")
+    stamp = os.path.getmtime(index_path) + 10
+    os.utime(csv_path, (stamp, stamp))
+    db = LocalGeoIPDatabase.open(str(csv_path))
+    assert db.lookup_country("10.0.0.1") == "BB"
+    db.close()
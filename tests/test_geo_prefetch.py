@@ -0,0 +1,90 @@
+# tests/test_geo_prefetch.py
+"""GeoPrefetcher: debounce, substituição pelo IP mais recente e cancelamento."""
+import threading
+import time
+
+from ip_tracker.geo_prefetch import GeoPrefetcher
+
+class _Lookup:
+    """Consulta falsa que registra os IPs e pode segurar a resposta até `release`."""
+
+    def __init__(self, block: bool = False):
+        self.calls = []
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+        self._lock = threading.Lock()
+
+    def __call__(self, ip):
+        with self._lock:
+            self.calls.append(ip)
+        self.release.wait(5)
+        return {"country": f"país de {ip}"}
+
+def test_typing_only_looks_up_the_last_ip_after_the_debounce():
+    lookup = _Lookup()
+    prefetcher = GeoPrefetcher(lookup, delay=0.05)
+    for text in ("10.0.0.1", "10.0.0.12", "10.0.0.123"):
+        assert prefetcher.schedule(text)
+    time.sleep(0.2)
+    assert lookup.calls == ["10.0.0.123"]
+    assert prefetcher.result(" 10.0.0.123 ") == {"country": "país de 10.0.0.123"}
+    assert lookup.calls == ["10.0.0.123"]
+
+def test_result_does_not_wait_for_the_debounce():
+    lookup = _Lookup()
+    prefetcher = GeoPrefetcher(lookup, delay=10)
+    prefetcher.schedule("10.0.0.1")
+    start = time.perf_counter()
+    assert prefetcher.result("10.0.0.1")["country"] == "país de 10.0.0.1"
+    assert time.perf_counter() - start < 1
+    assert lookup.calls == ["10.0.0.1"]
+
+def test_a_new_ip_supersedes_the_scheduled_one_and_invalid_text_cancels():
+    lookup = _Lookup()
+    prefetcher = GeoPrefetcher(lookup, delay=0.05)
+    prefetcher.schedule("10.0.0.1")
+    prefetcher.schedule("10.0.0.2", delay=0)
+    assert prefetcher.result("10.0.0.2")["country"] == "país de 10.0.0.2"
+    assert not prefetcher.schedule("10.0.0.")  # apagando o campo
+    time.sleep(0.15)
+    assert lookup.calls == ["10.0.0.2"]
+    # Sem consulta antecipada do IP pedido: consulta na hora
+    assert prefetcher.result("10.0.0.1")["country"] == "país de 10.0.0.1"
+    assert lookup.calls == ["10.0.0.2", "10.0.0.1"]
+
+def test_in_flight_lookup_is_reused_and_cancel_drops_it():
+    lookup = _Lookup(block=True)
+    prefetcher = GeoPrefetcher(lookup, delay=0)
+    prefetcher.schedule("10.0.0.1")
+    deadline = time.monotonic() + 5
+    while not lookup.calls and time.monotonic() < deadline:
+        time.sleep(0.005)
+    threading.Timer(0.05, lookup.release.set).start()
+    assert prefetcher.result("10.0.0.1")["country"] == "país de 10.0.0.1"
+    assert lookup.calls == ["10.0.0.1"]
+
+    prefetcher.delay = 10
+    prefetcher.schedule("10.0.0.2")
+    prefetcher.cancel()
+    assert prefetcher.result("10.0.0.2")["country"] == "país de 10.0.0.2"  # consultado na hora
+    assert lookup.calls == ["10.0.0.1", "10.0.0.2"]
+
+def test_a_consumed_or_failed_lookup_is_not_reused():
+    results = iter([RuntimeError("API fora do ar"), {"country": "Brasil"}, {"country": "Chile"}])
+
+    def lookup(ip):
+        value = next(results)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    prefetcher = GeoPrefetcher(lookup, delay=0)
+    prefetcher.schedule("10.0.0.1")
+    time.sleep(0.1)
+    # A falha terminada não segura o IP: agendar de novo consulta outra vez
+    assert prefetcher.schedule("10.0.0.1")
+    time.sleep(0.1)
+    assert prefetcher.result("10.0.0.1") == {"country": "Brasil"}
+    # Já consumido: a próxima pergunta vai à consulta (e ao cache dela), não ao valor guardado
+    assert prefetcher.result("10.0.0.1") == {"country": "Chile"}
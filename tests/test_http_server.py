@@ -0,0 +1,100 @@
+# tests/test_http_server.py
+"""Rotas do servidor HTTP e o MicroBatcher."""
+import json
+import threading
+from http.client import HTTPConnection
+
+import pytest
+
+from ip_tracker.geo_cache import create_geo_cache
+from ip_tracker.http_server import IPHTTPApp, MicroBatcher, make_server
+from ip_tracker.ip_extractor import IPExtractor
+from ip_tracker.ip_service import IPService
+from ip_tracker.sqlite_backend import SQLiteBackend
+
+@pytest.fixture
+def server():
+    service = IPService(IPExtractor(), geo_cache=create_geo_cache(path=""), storage=SQLiteBackend(":memory:"))
+    lookups = []
+
+    def details_many(ips):
+        lookups.append(list(ips))
+        return {ip: {"country": "Brasil"} for ip in ips}
+
+    service.get_ip_details_many = details_many
+    app = IPHTTPApp(service, window=0.005)
+    httpd = make_server(app, "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd, app, lookups
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        app.close()
+
+def _request(httpd, method, path, body=None):
+    conn = HTTPConnection("127.0.0.1", httpd.server_port, timeout=5)
+    try:
+        conn.request(method, path, body=None if body is None else json.dumps(body),
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+def test_batch_enriches_missing_countries_in_one_lookup_and_uses_the_write_batcher(server):
+    httpd, app, lookups = server
+    status, report = _request(httpd, "POST", "/ip/batch", [
+        {"ip_address": "10.0.0.1", "mobile_code": "m1"},
+        {"ip_address": "10.0.0.2", "country": "Chile"},
+        {"ip_address": "não é ip"},
+        "texto solto",
+        {"ip": "2001:DB8::1"},
+    ])
+    assert status == 200
+    assert [entry["status"] for entry in report] == ["inserted", "inserted", "rejected", "rejected", "inserted"]
+    assert report[2] == {"ip_address": "não é ip", "status": "rejected", "reason": "IP inválido"}
+    assert lookups == [["10.0.0.1", "2001:db8::1"]]
+    assert app.service.search_ip("10.0.0.1")["country"] == "Brasil"
+    assert app.service.search_ip("10.0.0.2")["country"] == "Chile"
+    assert app.writes.stats()["items"] == 3
+
+def test_get_ip_accepts_query_strings_and_percent_encoded_ipv6(server):
+    httpd, app, _ = server
+    app.service.register_ip("1.2.3.4", None, "Peru", "Revisão")
+    app.service.register_ip("2001:db8::1", None, "Chile", "Revisão")
+    status, record = _request(httpd, "GET", "/ip/1.2.3.4?x=1")
+    assert status == 200 and record["country"] == "Peru"
+    status, record = _request(httpd, "GET", "/ip/2001%3Adb8%3A%3A1")
+    assert status == 200 and record["country"] == "Chile"
+    assert _request(httpd, "GET", "/ip/1.2.3.999")[0] == 400
+    assert _request(httpd, "GET", "/metrics?format=json&x=1")[0] == 200
+
+def test_batcher_fails_futures_left_without_a_result():
+    batcher = MicroBatcher(lambda items: items[:1], window=0.05, workers=1)
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        assert futures[0].result(timeout=5) == 0
+        for future in futures[1:]:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+        assert batcher.stats()["errors"] == 1
+    finally:
+        batcher.close()
+
+def test_submit_after_close_fails_instead_of_hanging():
+    batcher = MicroBatcher(lambda items: items, window=0.001)
+    assert batcher("a", timeout=5) == "a"
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit("b").result(timeout=1)
+    batcher.close()  # fechar de novo não trava
+
+def test_database_outage_is_a_503_for_single_and_batch_writes(server):
+    httpd, app, _ = server
+    app.service.storage.close()  # toda gravação em lote volta como 'failed'
+    status, body = _request(httpd, "POST", "/ip", {"ip_address": "10.0.0.9", "country": "Peru"})
+    assert status == 503 and "error" in body
+    status, _ = _request(httpd, "POST", "/ip/batch", [{"ip_address": "10.0.0.9", "country": "Peru"}])
+    assert status == 503
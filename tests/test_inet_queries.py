@@ -0,0 +1,98 @@
+# tests/test_inet_queries.py
+"""Consultas por rede e faixa do PostgreSQL (coluna INET) e a migração para INET."""
+import re
+from contextlib import contextmanager
+from pathlib import Path
+
+import psycopg2
+import pytest
+
+from ip_tracker import database
+
+MIGRATION = Path(__file__).resolve().parent.parent / "migrations" / "001_inet_ip_address.sql"
+
+class _FakeCursor:
+    """Guarda as consultas e devolve `rows` (a tabela já na forma canônica do inet)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        self.executed.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+@pytest.fixture
+def cursor(monkeypatch):
+    cur = _FakeCursor([{"ip_address": "2001:db8::1", "country": "Chile", "total": 1}])
+
+    class _Connection:
+        def cursor(self):
+            return cur
+
+    @contextmanager
+    def connection():
+        yield _Connection()
+
+    monkeypatch.setattr(database, "db_connection", connection)
+    return cur
+
+def test_cidr_and_range_queries_cast_to_inet_and_order_by_address(cursor):
+    database.search_cidr_in_db(" 10.1.2.3/8 ", limit=5)
+    database.search_range_in_db("10.0.0.1", " 10.0.0.9")
+    database.count_by_country_in_db("2001:DB8::/32")
+    (cidr_sql, cidr_params), (range_sql, range_params), (count_sql, count_params) = cursor.executed
+    assert "ip_address <<= %s::inet ORDER BY ip_address LIMIT 5" in cidr_sql
+    assert cidr_params == ("10.0.0.0/8",)  # rede normalizada, sem strict
+    assert "ip_address BETWEEN %s::inet AND %s::inet ORDER BY ip_address" in range_sql
+    assert range_params == ("10.0.0.1", "10.0.0.9")
+    assert "WHERE ip_address <<= %s::inet GROUP BY country" in count_sql
+    assert count_params == ("2001:db8::/32",)
+
+def test_invalid_networks_and_ranges_fail_before_the_query(cursor):
+    for call in (lambda: database.search_cidr_in_db("10.0.0.0/33"),
+                 lambda: database.search_range_in_db("10.0.0.1", "::1"),
+                 lambda: database.search_range_in_db("10.0.0.9", "10.0.0.1"),
+                 lambda: database.search_cidr_in_db("10.0.0.0/8", limit=0)):
+        with pytest.raises(ValueError):
+            call()
+    assert cursor.executed == []
+
+def test_searches_match_any_spelling_and_skip_text_that_is_not_an_ip(cursor):
+    assert database.search_ip_in_db("lixo") is None
+    assert cursor.executed == []
+    found = database.search_ips_in_db(["2001:DB8::1", "2001:db8:0::1", "lixo"])
+    assert set(found) == {"2001:DB8::1", "2001:db8:0::1"}
+    (sql, (ips,)), = cursor.executed
+    assert "ip_address = ANY(%s::inet[])" in sql and ips == ["2001:db8::1"]
+
+def test_database_errors_are_wrapped(monkeypatch):
+    @contextmanager
+    def broken():
+        raise psycopg2.OperationalError("conexão perdida")
+        yield
+
+    monkeypatch.setattr(database, "db_connection", broken)
+    with pytest.raises(database.DatabaseError):
+        database.search_cidr_in_db("10.0.0.0/8")
+
+def test_migration_checks_for_duplicates_before_altering_the_column():
+    sql = MIGRATION.read_text(encoding="utf-8")
+    body = "\n".join(line for line in sql.splitlines() if not line.lstrip().startswith("--"))
+    begin, guard, alter, commit = (body.index(marker) for marker in
+                                   ("BEGIN;", "DO $$", "ALTER TABLE registered_ips", "COMMIT;"))
+    assert begin < guard < alter < commit  # a verificação roda na mesma transação, antes do ALTER
+    assert re.search(r"GROUP BY trim\(ip_address\)::inet HAVING count\(\*\) > 1", body)
+    assert "RAISE EXCEPTION" in body
+    assert "USING trim(ip_address)::inet" in body
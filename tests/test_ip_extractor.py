@@ -0,0 +1,52 @@
+# tests/test_ip_extractor.py
+"""Extrator em streaming (iter_ips) contra o caminho por regex (find_ip_in_text)."""
+import random
+
+import pytest
+
+from ip_tracker.ip_extractor import find_ip_in_text, iter_ips
+
+PARITY_CASES = [
+    "addr:10.0.0.1 x",
+    "host:1.2.3.4",
+    "client=192.168.0.10, port=22",
+    "from 8.8.8.8 port 52413",
+    "upstream[1.1.1.1]",
+    "ip 10.0.0.1:8080 open",
+    "host 192.168.1.1: up",
+    "host 192.168.1.1:",
+    "fim de frase 172.16.0.1.",
+    "rede 10.1.2.3/24",
+    "1.2.3.4-5",
+    "sem ip aqui",
+    "1.2.3.4.5",
+    "v1.2.3.4",
+    "_1.2.3.4",
+    "1.2.3.256",
+    "999.1.1.1",
+    "T12:34:56.789 ok",
+]
+
+def _first(text: str) -> str | None:
+    return next(iter_ips([text], ipv6=False), None)
+
+@pytest.mark.parametrize("text", PARITY_CASES)
+def test_iter_ips_matches_find_ip_in_text(text):
+    assert _first(text) == find_ip_in_text(text)
+
+def test_parity_on_random_prefixed_lines():
+    rng = random.Random(5)
+    for _ in range(500):
+        ip = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}"
+        text = f"{rng.choice(['', 'x ', 'addr:', 'src=', '(', 'host: '])}{ip}{rng.choice(['', ' ', ':443', ':', ': ', ',', ')'])}"
+        assert _first(text) == find_ip_in_text(text), text
+
+def test_ipv6_after_a_colon_prefix_stays_whole():
+    assert list(iter_ips(["ip:2001:db8::1 e x fe80::1"])) == ["2001:db8::1", "fe80::1"]
+
+def test_ip_split_across_chunks_is_rebuilt():
+    assert list(iter_ips([b"addr:10.0.", b"0.1 e 10.0.0.1"])) == ["10.0.0.1"]
+
+def test_a_trailing_colon_does_not_drop_the_ip():
+    assert list(iter_ips([b"host 192.168.1.1: up"])) == ["192.168.1.1"]
+    assert list(iter_ips([b"a 10.0.0.1:\nb 10.0.0.2:80"])) == ["10.0.0.1", "10.0.0.2"]
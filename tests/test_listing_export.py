@@ -0,0 +1,101 @@
+# tests/test_listing_export.py
+"""Listagem paginada por chave (keyset) e exportação em streaming."""
+import csv
+import io
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+from ip_tracker import database, export
+from ip_tracker.export import EXPORT_FIELDS, export_ips
+from ip_tracker.geo_cache import create_geo_cache
+from ip_tracker.ip_extractor import IPExtractor
+from ip_tracker.ip_service import IPService
+from ip_tracker.sqlite_backend import SQLiteBackend
+
+@pytest.fixture
+def service(tmp_path):
+    storage = SQLiteBackend(str(tmp_path / "ips.db"))
+    # Um lote grava todas as linhas com o mesmo registration_date: só o id desempata
+    storage.register_ips([(f"10.0.0.{i}", None, "Brasil" if i % 3 else "Chile", "Revisão") for i in range(1, 11)])
+    storage.register_ip("10.0.0.5", "m5", "Brasil", "Publicação")
+    yield IPService(IPExtractor(), geo_cache=create_geo_cache(path=""), storage=storage)
+    storage.close()
+
+def test_pages_follow_the_next_cursor_without_gaps_or_repeats(service):
+    seen, after, pages = [], None, 0
+    while True:
+        page = service.list_ips(after=after, page_size=4)
+        seen.extend(row["ip_address"] for row in page["rows"])
+        pages += 1
+        after = page["next"]
+        if after is None:
+            break
+    assert pages == 3
+    assert seen[0] == "10.0.0.5"  # atualizado por último
+    assert sorted(seen) == sorted(f"10.0.0.{i}" for i in range(1, 11))
+    assert seen == [row["ip_address"] for row in service.storage.iter_ips()]
+
+def test_filters_apply_to_every_page(service):
+    page = service.list_ips(country="Chile", page_size=2)
+    assert [row["ip_address"] for row in page["rows"]] == ["10.0.0.9", "10.0.0.6"]
+    rest = service.list_ips(country="Chile", after=page["next"], page_size=2)
+    assert [row["ip_address"] for row in rest["rows"]] == ["10.0.0.3"] and rest["next"] is None
+    assert [row["ip_address"] for row in service.list_ips(record_type="Publicação")["rows"]] == ["10.0.0.5"]
+
+def test_postgres_pages_use_a_keyset_condition_instead_of_offset(monkeypatch):
+    executed = []
+
+    class _Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params):
+            executed.append((" ".join(sql.split()), params))
+
+        def fetchall(self):
+            return []
+
+    class _Connection:
+        def cursor(self):
+            return _Cursor()
+
+    @contextmanager
+    def connection():
+        yield _Connection()
+
+    monkeypatch.setattr(database, "db_connection", connection)
+    last = datetime(2025, 1, 2, 3, 4, 5)
+    database.list_ips_in_db(country="Brasil", after=(last, 42), limit=3)
+    (sql, params), = executed
+    assert "WHERE country = %s AND (registration_date, id) < (%s, %s)" in sql
+    assert sql.endswith("ORDER BY registration_date DESC, id DESC LIMIT 3;")
+    assert "OFFSET" not in sql and params == ["Brasil", last, 42]
+
+def test_export_writes_csv_and_jsonl_from_the_backend(service):
+    out = io.StringIO()
+    assert export_ips(out, "csv", storage=service.storage, country="Chile") == 3
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert tuple(rows[0]) == EXPORT_FIELDS and len(rows) == 4
+
+    out = io.StringIO()
+    assert service.export(out, "jsonl", record_type="Publicação") == 1
+    record = json.loads(out.getvalue())
+    assert record["ip_address"] == "10.0.0.5" and record["mobile_code"] == "m5"
+    datetime.fromisoformat(record["registration_date"])
+
+    with pytest.raises(ValueError):
+        export_ips(io.StringIO(), "xml", storage=service.storage)
+
+def test_export_command_picks_the_format_from_the_file_name(service, tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "create_storage", lambda: service.storage)
+    monkeypatch.setattr(export, "configure_logging", lambda: None)  # não mexe nos logs do processo
+    target = tmp_path / "chile.jsonl"
+    assert export.main(["-o", str(target), "--country", "Chile"]) == 0
+    lines = target.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["ip_address"] for line in lines] == ["10.0.0.9", "10.0.0.6", "10.0.0.3"]
@@ -0,0 +1,96 @@
+# tests/test_metrics.py
+"""Contadores, histogramas e exportação das métricas; logs em JSON."""
+import io
+import json
+import logging
+
+import pytest
+
+from ip_tracker.log import configure_logging
+from ip_tracker.metrics import MetricsRegistry, write_metrics_file
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry(buckets=(0.01, 0.1, 1.0))
+
+def test_counters_and_histograms_are_kept_per_name_and_labels(registry):
+    registry.inc("geo_api_errors_total", endpoint="single")
+    registry.inc("geo_api_errors_total", 2, endpoint="single")
+    registry.inc("geo_api_errors_total", endpoint="batch")
+    for value in (0.005, 0.05, 0.05, 0.5):
+        registry.observe("db_query_seconds", value, op="search_ip")
+    snapshot = registry.snapshot()
+    assert [(c["labels"], c["value"]) for c in snapshot["counters"]] == \
+        [({"endpoint": "batch"}, 1), ({"endpoint": "single"}, 3)]
+    histogram, = snapshot["histograms"]
+    assert histogram["labels"] == {"op": "search_ip"}
+    assert histogram["count"] == 4 and histogram["max"] == 0.5
+    assert histogram["sum"] == pytest.approx(0.605)
+    assert 0.01 <= histogram["p50"] <= 0.1 < histogram["p99"] <= 0.5
+
+def test_timed_measures_blocks_and_functions_and_counts_errors(registry):
+    @registry.timed("ocr_seconds", stage="tesseract")
+    def ocr(fail):
+        if fail:
+            raise RuntimeError("falhou")
+        return "10.0.0.1"
+
+    assert ocr(False) == "10.0.0.1"
+    with pytest.raises(RuntimeError):
+        ocr(True)
+    with registry.timed("ocr_seconds", stage="preprocess"):
+        pass
+    snapshot = registry.snapshot()
+    assert {h["labels"]["stage"]: h["count"] for h in snapshot["histograms"]} == {"tesseract": 2, "preprocess": 1}
+    assert snapshot["counters"] == [{"name": "ocr_errors_total", "labels": {"stage": "tesseract"}, "value": 1}]
+
+def test_prometheus_text_has_cumulative_buckets_and_escaped_labels(registry):
+    registry.inc("http_requests_total", route='/ip/"x"')
+    registry.observe("http_request_seconds", 0.05, route="/ip")
+    registry.observe("http_request_seconds", 2.0, route="/ip")
+    lines = registry.to_prometheus().splitlines()
+    assert "# TYPE http_requests_total counter" in lines
+    assert 'http_requests_total{route="/ip/\\"x\\""} 1' in lines
+    assert "# TYPE http_request_seconds histogram" in lines
+    assert 'http_request_seconds_bucket{route="/ip",le="0.01"} 0' in lines
+    assert 'http_request_seconds_bucket{route="/ip",le="0.1"} 1' in lines
+    assert 'http_request_seconds_bucket{route="/ip",le="+Inf"} 2' in lines
+    assert 'http_request_seconds_count{route="/ip"} 2' in lines
+
+def test_metrics_file_format_follows_the_extension(registry, tmp_path):
+    registry.inc("cache_hits_total", cache="geo")
+    write_metrics_file(str(tmp_path / "metrics.json"), registry)
+    write_metrics_file(str(tmp_path / "metrics.prom"), registry)
+    assert json.loads((tmp_path / "metrics.json").read_text())["counters"][0]["value"] == 1
+    assert 'cache_hits_total{cache="geo"} 1' in (tmp_path / "metrics.prom").read_text()
+
+@pytest.fixture
+def restore_logging():
+    logger = logging.getLogger("ip_tracker")
+    saved = (logger.handlers[:], logger.level, logger.propagate)
+    yield
+    logger.handlers[:], logger.level, logger.propagate = saved
+
+def test_json_logs_carry_the_extra_fields(restore_logging):
+    stream = io.StringIO()
+    configure_logging(level="INFO", fmt="json", stream=stream)
+    logger = logging.getLogger("ip_tracker.geo")
+    logger.debug("não aparece")
+    logger.warning("Erro ao consultar API de IP", extra={"ip": "10.0.0.1", "error": "timeout"})
+    try:
+        raise ValueError("ruim")
+    except ValueError:
+        logger.exception("Falhou")
+    first, second = (json.loads(line) for line in stream.getvalue().splitlines())
+    assert first["level"] == "WARNING" and first["logger"] == "ip_tracker.geo"
+    assert first["msg"] == "Erro ao consultar API de IP"
+    assert (first["ip"], first["error"]) == ("10.0.0.1", "timeout")
+    assert "ts" in first and "exc" not in first
+    assert "ValueError: ruim" in second["exc"]
+
+def test_text_format_is_one_plain_line(restore_logging):
+    stream = io.StringIO()
+    configure_logging(level="INFO", fmt="text", stream=stream)
+    logging.getLogger("ip_tracker").info("Serviço iniciado", extra={"port": 8080})
+    line = stream.getvalue().strip()
+    assert line.endswith("INFO ip_tracker: Serviço iniciado") and "{" not in line
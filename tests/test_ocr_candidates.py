@@ -0,0 +1,69 @@
+# tests/test_ocr_candidates.py
+"""Vários IPs por imagem: candidatos por palavra do OCR, ordenação e lote empilhado."""
+import pytest
+from PIL import Image
+
+from ip_tracker import ip_extractor
+from ip_tracker.ip_extractor import _words_to_candidates, ocr_image_to_candidates, \
+    ocr_images_to_candidates, rank_candidates
+
+def _candidate(ip, confidence, box):
+    return {"ip": ip, "confidence": confidence, "box": box}
+
+def test_words_yield_one_candidate_per_ip_in_original_coordinates():
+    words = [("IP:10.0.0.1,", 91.0, (20, 10, 120, 30)),
+             ("1.2.3.4/5.6.7.8", 80.0, (0, 40, 100, 60)),
+             ("[2001:db8::1]", 70.0, (0, 80, 100, 100)),
+             ("texto", 99.0, (0, 0, 10, 10))]
+    candidates = _words_to_candidates(words, transform=(100, 50, 2.0))
+    assert [c["ip"] for c in candidates] == ["10.0.0.1", "1.2.3.4", "5.6.7.8", "2001:db8::1"]
+    assert candidates[0]["box"] == (110, 55, 160, 65)  # (esq + x / escala, topo + y / escala)
+    assert [c["ip"] for c in _words_to_candidates(words, ipv6=False)] == ["10.0.0.1", "1.2.3.4", "5.6.7.8"]
+
+def test_ranking_prefers_confidence_and_closeness_to_the_cursor():
+    candidates = [_candidate("10.0.0.1", 90.0, (0, 0, 20, 10)),        # canto
+                  _candidate("10.0.0.2", 90.0, (90, 45, 110, 55)),     # centro
+                  _candidate("10.0.0.1", 85.0, (180, 90, 200, 100)),   # de novo, outro canto
+                  _candidate("10.0.0.3", 40.0, (90, 45, 110, 55))]
+    ranked = rank_candidates(candidates, (200, 100), proximity_weight=0.5)
+    assert [c["ip"] for c in ranked] == ["10.0.0.2", "10.0.0.1", "10.0.0.3"]
+    assert ranked[1]["occurrences"] == 2 and ranked[1]["confidence"] == 90.0
+    near_cursor = rank_candidates(candidates, (200, 100), cursor=(190, 95), proximity_weight=0.5)
+    assert near_cursor[0]["ip"] == "10.0.0.1" and near_cursor[0]["box"] == (180, 90, 200, 100)
+    assert rank_candidates(candidates, (200, 100), proximity_weight=0)[0]["score"] == 0.9
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """_image_to_words falso: devolve as palavras da fila `pages`, uma chamada por vez."""
+    calls = []
+
+    def image_to_words(image, config=""):
+        calls.append((image.size, config))
+        return pages.pop(0) if pages else []
+
+    pages = []
+    monkeypatch.setattr(ip_extractor, "_image_to_words", image_to_words)
+    monkeypatch.setattr(ip_extractor, "_tesserocr", lambda: None)
+    return pages, calls
+
+def test_single_image_falls_back_to_the_full_image_when_the_prepared_pass_finds_nothing(fake_ocr, monkeypatch):
+    pages, calls = fake_ocr
+    monkeypatch.setattr(ip_extractor, "OCR_FALLBACK_FULL", True)
+    pages.extend([[("sem", 90.0, (0, 0, 10, 10))],
+                  [("2001:db8::2", 80.0, (40, 40, 60, 50)), ("10.0.0.9", 95.0, (30, 45, 50, 55))]])
+    image = Image.new("RGB", (100, 100), "white")
+    assert [c["ip"] for c in ocr_image_to_candidates(image)] == ["10.0.0.9", "2001:db8::2"]
+    assert len(calls) == 2 and calls[1] == ((100, 100), "")
+
+def test_batch_reads_stacked_images_in_one_call_and_routes_words_back(fake_ocr, monkeypatch):
+    pages, calls = fake_ocr
+    monkeypatch.setattr(ip_extractor, "OCR_FALLBACK_FULL", False)
+    images = [Image.new("RGB", (200, 100), "white") for _ in range(3)]
+    gap = ip_extractor._COMPOSITE_GAP
+    # Uma palavra no meio de cada imagem, em coordenadas da imagem composta
+    pages.append([(f"10.0.0.{i + 1}", 90.0, (10, i * (100 + gap) + 40, 90, i * (100 + gap) + 60))
+                  for i in (0, 2)])
+    results = ocr_images_to_candidates(images)
+    assert len(calls) == 1 and calls[0][0] == (200, 300 + 2 * gap)
+    assert [[c["ip"] for c in result] for result in results] == [["10.0.0.1"], [], ["10.0.0.3"]]
+    assert results[2][0]["box"] == (10, 40, 90, 60)
@@ -0,0 +1,88 @@
+# tests/test_ocr_executor.py
+"""Pool de OCR: pedidos com a mesma chave se substituem."""
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from ip_tracker.ocr_executor import OCRExecutor, OCRQueueFullError
+
+class _Gate:
+    """func do executor que só termina quando liberada."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, image):
+        self.started.set()
+        self.release.wait(5)
+        return f"ip-{image}"
+
+def test_newer_request_with_same_key_supersedes_running_one():
+    gate = _Gate()
+    executor = OCRExecutor(gate, workers=1, max_queue=4)
+    try:
+        old = executor.submit("a", key="main")
+        assert gate.started.wait(5)
+        new = executor.submit("b", key="main")
+        gate.release.set()
+        assert new.result(5) == "ip-b"
+        with pytest.raises(CancelledError):
+            old.result(5)
+    finally:
+        executor.shutdown()
+
+def test_full_queue_keeps_the_previous_request():
+    gate = _Gate()
+    executor = OCRExecutor(gate, workers=1, max_queue=1)
+    try:
+        executor.submit("running")
+        assert gate.started.wait(5)
+        queued = executor.submit("a", key="main")   # ocupa a única vaga da fila
+        rejected = executor.submit("b", key="main")
+        with pytest.raises(OCRQueueFullError):
+            rejected.result(5)
+        assert not queued.cancelled()
+        gate.release.set()
+        assert queued.result(5) == "ip-a"
+    finally:
+        gate.release.set()
+        executor.shutdown()
+
+def test_completed_future_supersedes_running_request():
+    gate = _Gate()
+    executor = OCRExecutor(gate, workers=1, max_queue=4)
+    try:
+        slow = executor.submit("a", key="main")
+        assert gate.started.wait(5)
+        hit = executor.completed("ip-cache", key="main")
+        assert hit.result(0) == "ip-cache"
+        gate.release.set()
+        with pytest.raises(CancelledError):
+            slow.result(5)
+    finally:
+        gate.release.set()
+        executor.shutdown()
+
+def test_cache_hit_paste_supersedes_slow_paste():
+    from PIL import Image
+    from ip_tracker.ip_extractor import IPExtractor
+    from ip_tracker.ocr_cache import OCRCache, image_key
+
+    gate = _Gate()
+    extractor = IPExtractor(ocr_cache=OCRCache(path=""))
+    extractor._executor = OCRExecutor(lambda image, cache_key=None: gate(image), workers=1)
+    try:
+        cached_image = Image.new("L", (8, 8), 255)
+        extractor.ocr_cache.put(image_key(cached_image), "10.0.0.2", 0.1)
+        slow = extractor.extract_from_image_async(Image.new("L", (8, 8), 0), key="main")  # colagem A
+        assert gate.started.wait(5)
+        fast = extractor.extract_from_image_async(cached_image, key="main")             # colagem B
+        assert fast.result(0) == "10.0.0.2"
+        gate.release.set()
+        with pytest.raises(CancelledError):
+            slow.result(5)  # A termina depois, mas não sobrescreve B
+    finally:
+        gate.release.set()
+        extractor.shutdown()
@@ -0,0 +1,92 @@
+# tests/test_record_cache.py
+"""RecordCache indexado pela forma canônica do IP e invalidações via NOTIFY."""
+import socket
+import threading
+from types import SimpleNamespace
+
+from ip_tracker.cache import MISSING
+from ip_tracker.record_cache import RecordCache, RecordCacheListener
+
+def test_different_spellings_of_an_ip_share_one_entry():
+    cache = RecordCache()
+    calls = []
+
+    def loader(ip):
+        calls.append(ip)
+        return {"ip_address": "2001:db8::1", "country": "Chile"}
+
+    assert cache.search(" 2001:DB8::1", loader)["country"] == "Chile"
+    assert cache.search("2001:db8:0::1", loader)["country"] == "Chile"
+    assert calls == [" 2001:DB8::1"]
+    cache.invalidate(["2001:0db8::0001"])
+    assert cache.peek("2001:db8::1") is MISSING
+
+def test_search_many_loads_canonical_keys_and_answers_with_the_callers_text():
+    cache = RecordCache()
+    requested = []
+
+    def loader_many(ips):
+        requested.append(list(ips))
+        return {"10.0.0.1": {"ip_address": "10.0.0.1"}}
+
+    found = cache.search_many(["10.0.0.1", " 10.0.0.1", "10.0.0.2", "lixo"], loader_many)
+    assert requested == [["10.0.0.1", "10.0.0.2"]]
+    assert set(found) == {"10.0.0.1", " 10.0.0.1"}
+    assert cache.search_many(["10.0.0.1 ", "10.0.0.2"], loader_many) == {"10.0.0.1 ": {"ip_address": "10.0.0.1"}}
+    assert len(requested) == 1
+
+class _FakeConnection:
+    """Conexão psycopg2 mínima: entrega as notificações uma vez e depois fica ociosa."""
+
+    def __init__(self, payloads, on_delivered):
+        self._read, self._write = socket.socketpair()
+        self._write.send(b"x")  # select() acorda na primeira volta
+        self._payloads = payloads
+        self._on_delivered = on_delivered
+        self.notifies = []
+
+    def fileno(self):
+        return self._read.fileno()
+
+    def set_isolation_level(self, level):
+        pass
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        pass
+
+    def poll(self):
+        self._read.recv(1)
+        self.notifies.extend(SimpleNamespace(payload=p) for p in self._payloads)
+        self._payloads = []
+        self._on_delivered()
+
+    def close(self):
+        self._read.close()
+        self._write.close()
+
+def test_listener_invalidates_payloads_from_host_and_from_old_text_triggers():
+    cache = RecordCache()
+    for ip in ("1.2.3.4", "2001:db8::1", "5.6.7.8"):
+        cache.store(ip, {"ip_address": ip}, cache.begin_load())
+    delivered = threading.Event()
+    listener = RecordCacheListener(cache, channel="registered_ips_changed",
+                                   connect_func=lambda: _FakeConnection(
+                                       ["1.2.3.4/32", "2001:DB8::1"], delivered.set))
+    listener.start()
+    try:
+        assert delivered.wait(5)
+        listener.stop()  # a invalidação acontece logo depois do poll(), na mesma volta
+        assert cache.peek("1.2.3.4") is MISSING
+        assert cache.peek("2001:db8::1") is MISSING
+        assert cache.peek("5.6.7.8") == {"ip_address": "5.6.7.8"}
+    finally:
+        listener.stop()
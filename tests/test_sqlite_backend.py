@@ -0,0 +1,97 @@
+# tests/test_sqlite_backend.py
+"""SQLiteBackend: operações de storage.StorageBackend e pool de conexões."""
+import threading
+
+import pytest
+
+from ip_tracker.database import DUPLICATE_IN_BATCH_REASON, DatabaseError
+from ip_tracker.sqlite_backend import SQLiteBackend
+
+@pytest.fixture
+def backend(tmp_path):
+    db = SQLiteBackend(str(tmp_path / "ips.db"), pool_size=4)
+    yield db
+    db.close()
+
+def test_register_ips_reports_each_row_and_search_accepts_any_spelling(backend):
+    report = backend.register_ips([
+        ("10.0.0.1", "m1", "Brasil", "Revisão"),
+        {"ip_address": "2001:DB8::1", "mobile_code": None, "country": "Chile", "record_type": None},
+        ("não é ip", None, None, None),
+        (" 10.0.0.1", "m2", "Peru", "Revisão"),
+    ])
+    assert [entry["status"] for entry in report] == ["rejected", "inserted", "rejected", "inserted"]
+    assert report[0]["reason"] == DUPLICATE_IN_BATCH_REASON
+    assert backend.search_ip("10.0.0.1")["country"] == "Peru"
+    assert backend.search_ip("2001:db8:0:0::1")["ip_address"] == "2001:db8::1"
+    assert backend.register_ips([("10.0.0.1", None, "Chile", None)])[0]["status"] == "updated"
+    assert set(backend.search_ips([" 10.0.0.1", "2001:db8::1", "10.9.9.9", "lixo"])) == {" 10.0.0.1", "2001:db8::1"}
+
+def test_cidr_and_range_searches_follow_address_order(backend):
+    backend.register_ips([(f"10.0.{i}.1", None, "Brasil" if i % 2 else "Chile", None) for i in range(10)]
+                         + [("11.0.0.1", None, "Peru", None), ("::ffff:10.0.0.1", None, "Peru", None)])
+    assert [r["ip_address"] for r in backend.search_cidr("10.0.0.0/22")] == \
+        ["10.0.0.1", "10.0.1.1", "10.0.2.1", "10.0.3.1"]
+    assert len(backend.search_cidr("10.0.0.0/8", limit=3)) == 3
+    assert [r["ip_address"] for r in backend.search_range("10.0.8.0", "11.0.0.1")] == \
+        ["10.0.8.1", "10.0.9.1", "11.0.0.1"]
+    with pytest.raises(ValueError):
+        backend.search_range("10.0.0.1", "::1")
+    assert backend.count_by_country("10.0.0.0/8") == {"Brasil": 5, "Chile": 5}
+
+def test_list_pages_and_iter_see_the_same_rows(backend):
+    backend.register_ips([(f"10.0.0.{i}", None, "Brasil", None) for i in range(1, 8)])
+    backend.register_ip("10.0.0.3", None, "Brasil", "Revisão")  # mais recente: vem primeiro
+    pages, after = [], None
+    while True:
+        page = backend.list_ips(country="Brasil", after=after, limit=3)
+        if not page:
+            break
+        pages.extend(page)
+        after = (page[-1]["registration_date"], page[-1]["id"])
+    assert pages[0]["ip_address"] == "10.0.0.3"
+    assert len(pages) == 7
+    assert [r["ip_address"] for r in backend.iter_ips(country="Brasil", itersize=2)] == \
+        [r["ip_address"] for r in pages]
+    assert [r["ip_address"] for r in backend.list_ips(record_type="Revisão")] == ["10.0.0.3"]
+
+def test_short_lived_threads_do_not_leave_connections_behind(backend):
+    backend.register_ip("10.0.0.1", None, "Brasil", "Revisão")
+    errors = []
+
+    def search():
+        try:
+            assert backend.search_ip("10.0.0.1")["country"] == "Brasil"
+        except Exception as e:  # noqa: BLE001 - levado para a thread principal
+            errors.append(e)
+
+    for _ in range(10):
+        threads = [threading.Thread(target=search) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert errors == []
+    stats = backend.stats()
+    assert stats["connections"] <= backend.pool_size
+    assert stats["idle"] == stats["connections"]
+
+def test_checkout_waits_for_a_free_connection_and_then_gives_up(tmp_path):
+    db = SQLiteBackend(str(tmp_path / "ips.db"), busy_timeout=0.05, pool_size=1)
+    try:
+        with db._connection():
+            with pytest.raises(DatabaseError):
+                db.search_ip("10.0.0.1")
+        assert db.search_ip("10.0.0.1") is None  # a conexão voltou ao pool
+        assert db.stats()["connections"] == 1
+    finally:
+        db.close()
+
+def test_a_reingest_without_country_keeps_the_stored_values(backend):
+    backend.register_ips([("10.0.0.1", "m1", "Brasil", "Revisão")])
+    assert backend.register_ips([("10.0.0.1", None, None, "Publicação")])[0]["status"] == "updated"
+    backend.register_ip("10.0.0.1", None, None, "Publicação")
+    record = backend.search_ip("10.0.0.1")
+    assert (record["mobile_code"], record["country"], record["record_type"]) == ("m1", "Brasil", "Publicação")
+    backend.register_ip("10.0.0.1", None, "Chile", "Revisão")
+    assert backend.search_ip("10.0.0.1")["country"] == "Chile"
@@ -0,0 +1,26 @@
+# tests/test_storage.py
+"""Interface StorageBackend e create_storage."""
+import pytest
+
+from ip_tracker.sqlite_backend import SQLiteBackend
+from ip_tracker.storage import PostgresBackend, StorageBackend, create_storage
+
+def test_a_backend_missing_operations_cannot_be_instantiated():
+    class Incomplete(StorageBackend):
+        def register_ip(self, ip_address, mobile_code, country, record_type):
+            return True
+
+    with pytest.raises(TypeError):
+        StorageBackend()
+    with pytest.raises(TypeError, match="search_ip"):
+        Incomplete()
+
+def test_create_storage_builds_the_named_backend(tmp_path):
+    assert isinstance(create_storage("postgres"), PostgresBackend)
+    backend = create_storage(" SQLite ", path=str(tmp_path / "ips.db"))
+    try:
+        assert isinstance(backend, SQLiteBackend)
+    finally:
+        backend.close()
+    with pytest.raises(ValueError):
+        create_storage("mysql")
@@ -0,0 +1,143 @@
+# tests/test_write_behind.py
+"""WriteBehindQueue: rejeições do banco, novas tentativas e recuperação do diário."""
+import json
+import threading
+from contextlib import contextmanager
+
+from ip_tracker import database
+from ip_tracker.database import FAILED_STATUS, prepare_bulk_rows
+from ip_tracker.sqlite_backend import SQLiteBackend
+from ip_tracker.write_behind import WriteBehindQueue
+
+class _FakeDB:
+    """flush_func que rejeita IPs escolhidos e pode simular o banco fora do ar."""
+
+    def __init__(self, reject=(), failures=0):
+        self.reject = set(reject)
+        self.failures = failures
+        self.rows = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, rows):
+        with self._lock:
+            self.calls += 1
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("banco fora do ar")
+            report, _ = prepare_bulk_rows(rows)
+            for entry in report:
+                values = entry.pop("_values", None)
+                if values is None:
+                    continue
+                if values[0] in self.reject:
+                    entry["status"], entry["reason"] = "rejected", "violação de restrição"
+                else:
+                    self.rows[values[0]] = values
+                    entry["status"] = "inserted"
+            return report
+
+def _queue(tmp_path, db, **kwargs) -> WriteBehindQueue:
+    return WriteBehindQueue(db, journal_path=str(tmp_path / "journal.jsonl"), fsync_interval=0.001,
+                            max_backoff=0.05, **kwargs).start()
+
+def test_rejected_rows_go_to_the_dead_letter_file_and_are_not_retried(tmp_path):
+    db = _FakeDB(reject={"10.0.0.2"})
+    queue = _queue(tmp_path, db)
+    for i in range(1, 4):
+        queue.enqueue(f"10.0.0.{i}", None, "Brasil", "Revisão")
+    assert queue.close()
+    assert set(db.rows) == {"10.0.0.1", "10.0.0.3"}
+    assert queue.stats()["rejected"] == 1 and queue.stats()["retries"] == 0
+    lines = (tmp_path / "journal.jsonl.rejected").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    dead = json.loads(lines[0])
+    assert dead["ip_address"] == "10.0.0.2" and dead["reason"] == "violação de restrição"
+    assert queue.pending_record("10.0.0.2") is None
+
+    # O checkpoint já passou da linha rejeitada: não volta na próxima inicialização
+    db.calls = 0
+    reopened = _queue(tmp_path, db)
+    assert reopened.stats()["replayed"] == 0
+    assert reopened.close() and db.calls == 0
+
+def test_database_failures_are_retried_until_the_batch_goes_through(tmp_path):
+    db = _FakeDB(failures=2)
+    queue = _queue(tmp_path, db)
+    queue.enqueue("10.0.0.1", None, "Brasil", "Revisão")
+    assert queue.flush(timeout=5)
+    assert db.rows.keys() == {"10.0.0.1"}
+    assert queue.stats()["retries"] == 2
+    assert not (tmp_path / "journal.jsonl.rejected").exists()
+    queue.close()
+
+def test_a_torn_last_line_is_dropped_so_the_next_row_is_not_glued_to_it(tmp_path):
+    queue = _queue(tmp_path, _FakeDB(failures=10 ** 6))
+    queue.enqueue("10.0.0.1", None, "Brasil", "Revisão")
+    assert not queue.close(timeout=0.1)
+    with open(tmp_path / "journal.jsonl", "ab") as f:
+        f.write(b'{"seq": 2, "ip_addr')  # queda no meio de uma escrita
+
+    queue = _queue(tmp_path, _FakeDB(failures=10 ** 6))
+    assert queue.stats()["replayed"] == 1
+    assert queue.enqueue("10.0.0.2", None, "Chile", "Revisão") == 2
+    assert not queue.close(timeout=0.1)
+
+    db = _FakeDB()
+    reopened = _queue(tmp_path, db)
+    assert reopened.stats()["replayed"] == 2
+    assert reopened.close()
+    assert set(db.rows) == {"10.0.0.1", "10.0.0.2"}
+
+def test_rows_left_in_the_journal_are_replayed_after_a_restart(tmp_path):
+    queue = _queue(tmp_path, _FakeDB(failures=10 ** 6))
+    queue.enqueue("10.0.0.1", None, "Brasil", "Revisão")
+    queue.enqueue("10.0.0.2", None, "Chile", "Revisão")
+    queue.enqueue("10.0.0.1", "m2", "Peru", "Revisão")
+    assert queue.pending_record("10.0.0.1")["country"] == "Peru"
+    assert not queue.close(timeout=0.1)
+
+    db = _FakeDB()
+    reopened = _queue(tmp_path, db, batch_size=2)
+    assert reopened.stats()["replayed"] == 3
+    assert reopened.flush(timeout=5)
+    assert {ip: row[2] for ip, row in db.rows.items()} == {"10.0.0.1": "Peru", "10.0.0.2": "Chile"}
+    assert reopened.pending_record("10.0.0.1") is None
+    assert reopened.enqueue("10.0.0.3", None, "Brasil", "Revisão") == 4  # a sequência continua
+    assert reopened.close()
+    again = _queue(tmp_path, db)
+    assert again.stats()["replayed"] == 0
+    again.close()
+
+def test_a_database_outage_is_retried_instead_of_dead_lettered(tmp_path, monkeypatch):
+    @contextmanager
+    def unavailable():
+        raise database.DatabaseError("Não foi possível conectar ao banco.")
+        yield
+
+    monkeypatch.setattr(database, "db_connection", unavailable)
+    report = database.register_ips_in_db([("10.0.0.1", None, "Brasil", None), ("lixo", None, None, None)])
+    assert [entry["status"] for entry in report] == [FAILED_STATUS, "rejected"]
+
+    outage = threading.Event()
+    outage.set()
+    db = _FakeDB()
+
+    def flush(rows):
+        return database.register_ips_in_db(rows) if outage.is_set() else db(rows)
+
+    queue = _queue(tmp_path, flush)
+    queue.enqueue("10.0.0.1", None, "Brasil", "Revisão")
+    assert not queue.flush(timeout=0.2)
+    stats = queue.stats()
+    assert stats["retries"] >= 1 and stats["rejected"] == 0 and stats["flushed"] == 0
+    assert not (tmp_path / "journal.jsonl.rejected").exists()
+    outage.clear()
+    assert queue.flush(timeout=5)
+    assert db.rows.keys() == {"10.0.0.1"}
+    assert queue.close()
+
+def test_sqlite_reports_a_closed_backend_as_failed_not_rejected(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "ips.db"))
+    backend.close()
+    assert backend.register_ips([("10.0.0.1", None, "Brasil", None)])[0]["status"] == FAILED_STATUS